@@ -0,0 +1,48 @@
+import sys
+sys.path.append('../')
+
+import time
+import tracemalloc
+from typing import Callable
+
+from ouija import Packet, Phase, Codec
+
+
+RATE = 10000
+PAYLOAD = 1024
+
+
+def bench(*, name: str, encoded: list[bytes], decode: Callable[[bytes], object]) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    kept = [decode(data) for data in encoded]
+    elapsed = time.perf_counter() - start
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+
+    print(
+        f'{name:<16}'
+        f'{allocated:>16,}'
+        f'{allocated / len(encoded):>12,.0f}'
+        f'{elapsed / len(encoded) * 1e6:>12.3f}'
+    )
+
+
+def main() -> None:
+    packets = [
+        Packet(phase=Phase.DATA, ack=False, seq=seq, data=bytes([seq % 256]) * PAYLOAD, drain=False)
+        for seq in range(RATE)
+    ]
+    json_encoded = [packet.encode(codec=Codec.JSON) for packet in packets]
+    binary_encoded = [packet.encode(codec=Codec.BINARY) for packet in packets]
+
+    print(f'{RATE:,} packets/s, {PAYLOAD:,} bytes payload - decoded payloads kept alive for 1s')
+    print(f'{"decode":<16}{"bytes/s":>16}{"bytes/pkt":>12}{"us/pkt":>12}')
+    bench(name='json', encoded=json_encoded, decode=lambda data: Packet.decode(data=data).data)
+    bench(name='binary copy', encoded=binary_encoded, decode=lambda data: bytes(Packet.decode(data=data).data))
+    bench(name='binary view', encoded=binary_encoded, decode=lambda data: Packet.decode(data=data).data)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+import sys
+sys.path.append('../')
+
+import os
+import timeit
+
+from ouija import FernetCipher, AESGCMCipher, ChaCha20Poly1305Cipher
+
+
+KEY = 'bdDmN4VexpDvTrs6gw8xTzaFvIBobFg1Cx2McFB1RmI='
+SIZES = (64, 1024, 16 * 1024)
+
+
+def main() -> None:
+    ciphers = (FernetCipher(key=KEY), AESGCMCipher(key=KEY), ChaCha20Poly1305Cipher(key=KEY))
+
+    print(f'{"cipher":<18}{"size":>8}{"overhead":>10}{"encrypt, MB/s":>16}{"decrypt, MB/s":>16}')
+    for size in SIZES:
+        data = os.urandom(size)
+        number = max(1, 2 ** 24 // size)
+        for cipher in ciphers:
+            encrypted = cipher.encrypt(data=data)
+            encrypt = timeit.timeit(lambda: cipher.encrypt(data=data), number=number)
+            decrypt = timeit.timeit(lambda: cipher.decrypt(data=encrypted), number=number)
+            print(
+                f'{cipher.name:<18}{size:>8,}{len(encrypted) - size:>10,}'
+                f'{size * number / encrypt / 2 ** 20:>16,.1f}'
+                f'{size * number / decrypt / 2 ** 20:>16,.1f}'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+import sys
+sys.path.append('../')
+
+import timeit
+
+from ouija import Packet, Phase, Codec
+
+
+NUMBER = 100000
+
+
+def bench(*, name: str, packet: Packet) -> None:
+    for codec in (Codec.JSON, Codec.BINARY):
+        encoded = packet.encode(codec=codec)
+        encode = timeit.timeit(lambda: packet.encode(codec=codec), number=NUMBER)
+        decode = timeit.timeit(lambda: Packet.decode(data=encoded), number=NUMBER)
+        print(
+            f'{name:<12}{codec:<8}'
+            f'{len(encoded):>8,}'
+            f'{encode / NUMBER * 1e6:>12.3f}'
+            f'{decode / NUMBER * 1e6:>12.3f}'
+        )
+
+
+def main() -> None:
+    print(f'{"packet":<12}{"codec":<8}{"bytes":>8}{"encode, us":>12}{"decode, us":>12}')
+    bench(name='data 64', packet=Packet(phase=Phase.DATA, ack=False, seq=1000, data=b'x' * 64, drain=False))
+    bench(name='data 1024', packet=Packet(phase=Phase.DATA, ack=False, seq=1000, data=b'x' * 1024, drain=True))
+    bench(name='data ack', packet=Packet(phase=Phase.DATA, ack=True, seq=1000))
+    bench(name='close', packet=Packet(phase=Phase.CLOSE, ack=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+import sys
+sys.path.append('../')
+
+import json
+import os
+import time
+
+from ouija import Compression, Compressor
+from ouija.compression import available
+
+
+FRAME = 1024
+FRAMES = 4096
+
+
+def text_frames() -> list[bytes]:
+    body = json.dumps([
+        {'id': i, 'name': f'item {i}', 'tags': ['alpha', 'beta'], 'price': i * 1.25, 'available': i % 2 == 0}
+        for i in range(FRAMES * FRAME // 64)
+    ]).encode()
+    return [body[i:i + FRAME] for i in range(0, FRAMES * FRAME, FRAME)]
+
+
+def random_frames() -> list[bytes]:
+    return [os.urandom(FRAME) for _ in range(FRAMES)]
+
+
+def bench(*, name: str, compression: Compression, frames: list[bytes]) -> None:
+    compressor = Compressor(compression=compression)
+    start = time.perf_counter()
+    compressed = [compressor.compress(data=frame) for frame in frames]
+    elapsed = time.perf_counter() - start
+
+    raw_size = sum(len(frame) for frame in frames)
+    compressed_size = sum(len(frame) for frame in compressed)
+    print(
+        f'{name:<10}{compression:<8}'
+        f'{compressed_size / raw_size:>10.3f}'
+        f'{raw_size / elapsed / 2 ** 20:>16,.1f}'
+    )
+
+
+def main() -> None:
+    print(f'{FRAMES:,} frames of {FRAME:,} bytes - random frames model TLS traffic')
+    print(f'{"traffic":<10}{"method":<8}{"ratio":>10}{"compress, MB/s":>16}')
+    for name, frames in (('text', text_frames()), ('random', random_frames())):
+        for compression in (Compression.ZLIB, Compression.ZSTD):
+            if available(compression=compression):
+                bench(name=name, compression=compression, frames=frames)
+
+
+if __name__ == '__main__':
+    main()
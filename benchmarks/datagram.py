@@ -0,0 +1,115 @@
+import sys
+sys.path.append('../')
+
+import asyncio
+import multiprocessing
+import socket
+import time
+
+from ouija import batch
+from ouija.batch import create_datagram_endpoint
+
+
+SIZES = (64, 1024, 1400)
+DURATION = 2.0
+
+
+class CounterProtocol(asyncio.DatagramProtocol):
+    def __init__(self) -> None:
+        self.count = 0
+
+    def datagram_received(self, data, addr) -> None:
+        self.count += 1
+
+
+def blast(port: int, size: int, stop) -> None:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.connect(('127.0.0.1', port))
+    data = b'\x00' * size
+    while not stop.is_set():
+        for _ in range(1000):
+            try:
+                sock.send(data)
+            except OSError:
+                pass
+    sock.close()
+
+
+async def receive(*, engine: str, size: int) -> float:
+    loop = asyncio.get_running_loop()
+    if engine == 'asyncio':
+        transport, protocol = await loop.create_datagram_endpoint(CounterProtocol, local_addr=('127.0.0.1', 0))
+    else:
+        transport, protocol = await create_datagram_endpoint(
+            protocol_factory=CounterProtocol,
+            local_addr=('127.0.0.1', 0),
+        )
+    port = transport.get_extra_info('sockname')[1]
+
+    stop = multiprocessing.Event()
+    sender = multiprocessing.Process(target=blast, args=(port, size, stop))
+    sender.start()
+    await asyncio.sleep(0.2)
+
+    count, start = protocol.count, time.process_time()
+    await asyncio.sleep(DURATION)
+    count, cpu = protocol.count - count, time.process_time() - start
+
+    stop.set()
+    sender.join()
+    transport.close()
+    # packets per CPU second of receiving process - throughput per core
+    return count / cpu if cpu else 0.0
+
+
+async def send(*, engine: str, size: int) -> float:
+    loop = asyncio.get_running_loop()
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(('127.0.0.1', 0))
+    remote_addr = sink.getsockname()
+    if engine == 'asyncio':
+        transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=remote_addr)
+    else:
+        transport, _ = await create_datagram_endpoint(
+            protocol_factory=asyncio.DatagramProtocol,
+            remote_addr=remote_addr,
+        )
+
+    data = b'\x00' * size
+    count, start = 0, time.process_time()
+    while time.process_time() - start < DURATION:
+        for _ in range(batch.BATCH):
+            transport.sendto(data)
+        count += batch.BATCH
+        await asyncio.sleep(0)
+    cpu = time.process_time() - start
+
+    transport.close()
+    sink.close()
+    return count / cpu
+
+
+async def run(*, engine: str, size: int) -> tuple[float, float]:
+    recvmmsg, sendmmsg = batch.recvmmsg, batch.sendmmsg
+    if engine == 'loop':
+        batch.recvmmsg = batch.sendmmsg = None
+    try:
+        return await receive(engine=engine, size=size), await send(engine=engine, size=size)
+    finally:
+        batch.recvmmsg, batch.sendmmsg = recvmmsg, sendmmsg
+
+
+def main() -> None:
+    engines = ['asyncio', 'loop']
+    if batch.recvmmsg and batch.sendmmsg:
+        engines.append('mmsg')
+
+    print(f'{"engine":<16}{"size":>8}{"receive, pps/core":>20}{"send, pps/core":>18}')
+    for size in SIZES:
+        for engine in engines:
+            received, sent = asyncio.run(run(engine=engine, size=size))
+            print(f'{engine:<16}{size:>8,}{received:>20,.0f}{sent:>18,.0f}')
+
+
+if __name__ == '__main__':
+    main()
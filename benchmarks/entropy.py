@@ -0,0 +1,62 @@
+import sys
+sys.path.append('../')
+
+import os
+import timeit
+
+import numpy as np
+
+from ouija import SimpleEntropy
+
+
+RATE = 5
+SIZES = (64, 1024, 16 * 1024, 64 * 1024, 256 * 1024, 1024 * 1024)
+LEGACY_MAX_SIZE = 64 * 1024
+
+
+def legacy_decrease(*, data: bytes, rate: int) -> bytes:
+    array = np.frombuffer(data, dtype='B')
+    values, counts = np.unique(array, return_counts=True)
+    array_dict = {counts[idx]: values[idx:idx + 1] for idx in range(len(values))}
+    filler = array_dict[max(array_dict)].tobytes()
+
+    decreased = b''
+    for idx in range(0, len(data), rate - 1):
+        decreased += data[idx:idx + rate - 1]
+        if len(data) - idx >= rate - 1:
+            decreased += filler
+    return decreased
+
+
+def legacy_increase(*, data: bytes, rate: int) -> bytes:
+    increased = b''
+    for idx in range(0, len(data), rate):
+        increased += data[idx:idx + rate - 1]
+    return increased
+
+
+def bench(*, func, size: int) -> float:
+    number = max(1, 2 ** 20 // size)
+    return timeit.timeit(func, number=number) / number * 1e6
+
+
+def main() -> None:
+    entropy = SimpleEntropy(rate=RATE)
+
+    print(f'{"size":>10}{"decrease, us":>16}{"increase, us":>16}{"legacy decrease, us":>22}{"legacy increase, us":>22}')
+    for size in SIZES:
+        data = os.urandom(size)
+        decreased = entropy.decrease(data=data)
+        decrease = bench(func=lambda: entropy.decrease(data=data), size=size)
+        increase = bench(func=lambda: entropy.increase(data=decreased), size=size)
+        if size <= LEGACY_MAX_SIZE:
+            legacy_decrease_us = bench(func=lambda: legacy_decrease(data=data, rate=RATE), size=size)
+            legacy_increase_us = bench(func=lambda: legacy_increase(data=decreased, rate=RATE), size=size)
+            legacy = f'{legacy_decrease_us:>22,.1f}{legacy_increase_us:>22,.1f}'
+        else:
+            legacy = f'{"-":>22}{"-":>22}'
+        print(f'{size:>10,}{decrease:>16,.1f}{increase:>16,.1f}{legacy}')
+
+
+if __name__ == '__main__':
+    main()
@@ -27,7 +27,6 @@ async def main() -> None:
         udp_timeout=2.0,
         udp_retries=5,
         udp_capacity=10000,
-        udp_resend_sleep=0.25,
     )
     relay = Relay(
         telemetry=Telemetry(),
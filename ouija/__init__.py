@@ -3,7 +3,7 @@ __copyright__ = 'Copyright (c) 2023 Anton Smolin'
 __license__ = 'MIT'
 __version__ = '1.3.1'
 
-from .data import Parser, Message, Phase, Packet
+from .data import Parser, Message, Phase, Packet, Framing, Codec, Acknowledgement, Bundling
 from .telemetry import Telemetry
 from .tuning import StreamTuning, DatagramTuning
 from .ouija import StreamOuija, DatagramOuija
@@ -13,4 +13,7 @@ from .relay import StreamRelay, DatagramRelay
 from .proxy import StreamProxy, DatagramProxy
 from .config import Config, Mode, Protocol
 from .entropy import Entropy, SimpleEntropy
-from .cipher import Cipher, FernetCipher
+from .cipher import Cipher, FernetCipher, AESGCMCipher, ChaCha20Poly1305Cipher
+from .compression import Compression, Compressor
+from .congestion import Congestion, CongestionControl, RenoControl, DelayControl
+from .fec import Fec
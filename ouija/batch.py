@@ -0,0 +1,501 @@
+import asyncio
+import ctypes
+import ctypes.util
+import errno
+import os
+import socket
+import struct
+import sys
+from collections import deque
+from itertools import islice
+from typing import Any, Callable, Optional, Union
+
+
+# Datagrams drained per readable event and sent per system call at most, so busy socket does not starve other
+# callbacks
+BATCH = 32
+# Receive buffer size per datagram - max UDP payload
+SIZE = 65535
+# sockaddr_storage size
+NAME_SIZE = 128
+# Decoded peer addresses kept by receiver at most
+ADDRESS_CACHE = 1024
+UINT = struct.Struct('=I')
+SIZE_T = struct.Struct('@N')
+POINTER = struct.Struct('@P')
+
+Address = Union[tuple[str, int], tuple[str, int, int, int]]
+Datagram = tuple[bytes, Address]
+
+
+class Iovec(ctypes.Structure):
+    _fields_ = [
+        ('iov_base', ctypes.c_void_p),
+        ('iov_len', ctypes.c_size_t),
+    ]
+
+
+class Msghdr(ctypes.Structure):
+    _fields_ = [
+        ('msg_name', ctypes.c_void_p),
+        ('msg_namelen', ctypes.c_uint32),
+        ('msg_iov', ctypes.POINTER(Iovec)),
+        ('msg_iovlen', ctypes.c_size_t),
+        ('msg_control', ctypes.c_void_p),
+        ('msg_controllen', ctypes.c_size_t),
+        ('msg_flags', ctypes.c_int),
+    ]
+
+
+class Mmsghdr(ctypes.Structure):
+    _fields_ = [
+        ('msg_hdr', Msghdr),
+        ('msg_len', ctypes.c_uint),
+    ]
+
+
+def load_recvmmsg() -> Optional[Callable]:
+    """recvmmsg from libc - Linux only
+    :returns: function or None if unavailable"""
+
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        function = libc.recvmmsg
+    except (OSError, AttributeError):
+        return None
+    function.argtypes = (ctypes.c_int, ctypes.POINTER(Mmsghdr), ctypes.c_uint, ctypes.c_int, ctypes.c_void_p)
+    function.restype = ctypes.c_int
+    return function
+
+
+def load_sendmmsg() -> Optional[Callable]:
+    """sendmmsg from libc - Linux only
+    :returns: function or None if unavailable"""
+
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        function = libc.sendmmsg
+    except (OSError, AttributeError):
+        return None
+    function.argtypes = (ctypes.c_int, ctypes.POINTER(Mmsghdr), ctypes.c_uint, ctypes.c_int)
+    function.restype = ctypes.c_int
+    return function
+
+
+recvmmsg = load_recvmmsg()
+sendmmsg = load_sendmmsg()
+
+
+def address(*, name: bytes) -> Address:
+    """Decode sockaddr into address tuple in socket module format
+    :param name: sockaddr bytes
+    :returns: (host, port) for IPv4, (host, port, flowinfo, scope_id) for IPv6"""
+
+    family, = struct.unpack_from('=H', name)
+    port, = struct.unpack_from('!H', name, 2)
+    if family == socket.AF_INET6:
+        flowinfo, = struct.unpack_from('!I', name, 4)
+        scope_id, = struct.unpack_from('=I', name, 24)
+        return socket.inet_ntop(socket.AF_INET6, name[8:24]), port, flowinfo, scope_id
+    return socket.inet_ntop(socket.AF_INET, name[4:8]), port
+
+
+def sockaddr(*, addr: Address, family: int) -> Optional[bytes]:
+    """Encode address tuple into sockaddr - reverse of address
+    :param addr: address in socket module format
+    :param family: socket family
+    :returns: sockaddr bytes or None if address is not numeric address of socket family"""
+
+    try:
+        if family == socket.AF_INET6:
+            host, port, flowinfo, scope_id = addr if len(addr) == 4 else (*addr, 0, 0)
+            return struct.pack('=H', family) + struct.pack('!HI', port, flowinfo) + \
+                socket.inet_pton(family, host) + struct.pack('=I', scope_id)
+        if family == socket.AF_INET and len(addr) == 2:
+            host, port = addr
+            return struct.pack('=H', family) + struct.pack('!H', port) + socket.inet_pton(family, host) + \
+                b'\x00' * 8
+    except (OSError, TypeError, ValueError, struct.error):
+        pass
+    return None
+
+
+class LoopReceiver:
+    """Portable receiver - recvfrom_into loop into preallocated buffer until socket is drained"""
+
+    batch: int
+    buffer: bytearray
+    view: memoryview
+
+    def __init__(self, *, batch: int, size: int) -> None:
+        self.batch = batch
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+
+    def recv(self, *, sock: socket.socket) -> list[Datagram]:
+        datagrams = []
+        for _ in range(self.batch):
+            try:
+                length, addr = sock.recvfrom_into(self.buffer)
+            except (BlockingIOError, InterruptedError):
+                break
+            datagrams.append((bytes(self.view[:length]), addr))
+        return datagrams
+
+
+class MmsgReceiver:
+    """Linux receiver - up to batch datagrams are received with single recvmmsg system call into preallocated
+    buffers, lengths and addresses are read from raw headers, so per datagram cost is slicing only"""
+
+    HEADER = ctypes.sizeof(Mmsghdr)
+    LENGTH = Mmsghdr.msg_len.offset
+    NAME_LENGTH = Mmsghdr.msg_hdr.offset + Msghdr.msg_namelen.offset
+
+    batch: int
+    size: int
+    buffers: ctypes.Array
+    names: ctypes.Array
+    iovecs: ctypes.Array
+    headers: ctypes.Array
+    pristine: bytes
+    view: memoryview
+    names_view: memoryview
+    headers_view: memoryview
+    addresses: dict[bytes, Address]
+
+    def __init__(self, *, batch: int, size: int) -> None:
+        self.batch = batch
+        self.size = size
+        self.buffers = ctypes.create_string_buffer(batch * size)
+        self.names = ctypes.create_string_buffer(batch * NAME_SIZE)
+        self.iovecs = (Iovec * batch)()
+        self.headers = (Mmsghdr * batch)()
+
+        base = ctypes.addressof(self.buffers)
+        names_base = ctypes.addressof(self.names)
+        for idx in range(batch):
+            self.iovecs[idx].iov_base = base + idx * size
+            self.iovecs[idx].iov_len = size
+            header = self.headers[idx].msg_hdr
+            header.msg_name = names_base + idx * NAME_SIZE
+            header.msg_namelen = NAME_SIZE
+            header.msg_iov = ctypes.pointer(self.iovecs[idx])
+            header.msg_iovlen = 1
+
+        # kernel overwrites name lengths - headers are restored from pristine copy with single memmove
+        self.pristine = bytes(self.headers)
+        self.view = memoryview(self.buffers).cast('B')
+        self.names_view = memoryview(self.names).cast('B')
+        self.headers_view = memoryview(self.headers).cast('B')
+        self.addresses = dict()
+
+    def address(self, *, name: bytes) -> Address:
+        addr = self.addresses.get(name)
+        if addr is None:
+            # peers are few for shared socket, cache is reset rather than evicted when it grows
+            if len(self.addresses) >= ADDRESS_CACHE:
+                self.addresses.clear()
+            addr = self.addresses[name] = address(name=name)
+        return addr
+
+    def recv(self, *, sock: socket.socket) -> list[Datagram]:
+        ctypes.memmove(self.headers, self.pristine, len(self.pristine))
+        count = recvmmsg(sock.fileno(), self.headers, self.batch, socket.MSG_DONTWAIT, None)
+        if count < 0:
+            code = ctypes.get_errno()
+            if code in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return []
+            raise OSError(code, os.strerror(code))
+
+        datagrams = []
+        for idx in range(count):
+            offset = idx * self.HEADER
+            length, = UINT.unpack_from(self.headers_view, offset + self.LENGTH)
+            name_length, = UINT.unpack_from(self.headers_view, offset + self.NAME_LENGTH)
+            start = idx * self.size
+            name = idx * NAME_SIZE
+            datagrams.append((
+                bytes(self.view[start:start + length]),
+                self.address(name=bytes(self.names_view[name:name + name_length])),
+            ))
+        return datagrams
+
+
+class LoopSender:
+    """Portable sender - datagram is sent with send or sendto"""
+
+    def send(self, *, sock: socket.socket, queue: deque[tuple[bytes, Optional[Address]]]) -> int:
+        """Send datagrams from head of queue, should raise OSError if the first one is not sent
+        :param sock: socket
+        :param queue: datagrams with peer addresses, None for connected socket
+        :returns: number of datagrams sent"""
+
+        data, addr = queue[0]
+        if addr is None:
+            sock.send(data)
+        else:
+            sock.sendto(data, addr)
+        return 1
+
+
+class MmsgSender(LoopSender):
+    """Linux sender - up to batch datagrams are sent with single sendmmsg system call from preallocated buffers,
+    lengths and addresses are written to raw headers, addresses are encoded once per peer"""
+
+    HEADER = ctypes.sizeof(Mmsghdr)
+    NAME = Mmsghdr.msg_hdr.offset + Msghdr.msg_name.offset
+    NAME_LENGTH = Mmsghdr.msg_hdr.offset + Msghdr.msg_namelen.offset
+    IOVEC = ctypes.sizeof(Iovec)
+    LENGTH = Iovec.iov_len.offset
+
+    batch: int
+    size: int
+    buffers: ctypes.Array
+    names: ctypes.Array
+    iovecs: ctypes.Array
+    headers: ctypes.Array
+    names_base: int
+    view: memoryview
+    names_view: memoryview
+    iovecs_view: memoryview
+    headers_view: memoryview
+    # peer addresses set in headers - encoded addresses are cached, so header is updated on peer change only
+    named: list[bytes]
+    addresses: dict[Address, Optional[bytes]]
+
+    def __init__(self, *, batch: int, size: int) -> None:
+        self.batch = batch
+        self.size = size
+        self.buffers = ctypes.create_string_buffer(batch * size)
+        self.names = ctypes.create_string_buffer(batch * NAME_SIZE)
+        self.iovecs = (Iovec * batch)()
+        self.headers = (Mmsghdr * batch)()
+
+        base = ctypes.addressof(self.buffers)
+        for idx in range(batch):
+            self.iovecs[idx].iov_base = base + idx * size
+            header = self.headers[idx].msg_hdr
+            header.msg_iov = ctypes.pointer(self.iovecs[idx])
+            header.msg_iovlen = 1
+
+        self.names_base = ctypes.addressof(self.names)
+        self.view = memoryview(self.buffers).cast('B')
+        self.names_view = memoryview(self.names).cast('B')
+        self.iovecs_view = memoryview(self.iovecs).cast('B')
+        self.headers_view = memoryview(self.headers).cast('B')
+        self.named = [b''] * batch
+        self.addresses = dict()
+
+    def name(self, *, idx: int, name: bytes) -> None:
+        """Set peer address of header, empty address for connected socket
+        :param idx: header index
+        :param name: sockaddr bytes
+        :returns: None"""
+
+        header = idx * self.HEADER
+        start = idx * NAME_SIZE
+        self.names_view[start:start + len(name)] = name
+        POINTER.pack_into(self.headers_view, header + self.NAME, self.names_base + start if name else 0)
+        UINT.pack_into(self.headers_view, header + self.NAME_LENGTH, len(name))
+        self.named[idx] = name
+
+    def sockaddr(self, *, addr: Address, family: int) -> Optional[bytes]:
+        if addr in self.addresses:
+            return self.addresses[addr]
+
+        # peers are few for shared socket, cache is reset rather than evicted when it grows
+        if len(self.addresses) >= ADDRESS_CACHE:
+            self.addresses.clear()
+        name = self.addresses[addr] = sockaddr(addr=addr, family=family)
+        return name
+
+    def send(self, *, sock: socket.socket, queue: deque[tuple[bytes, Optional[Address]]]) -> int:
+        view, iovecs_view = self.view, self.iovecs_view
+        count = 0
+        for data, addr in islice(queue, self.batch):
+            length = len(data)
+            if length > self.size:
+                # oversized datagram is left to send or sendto to fail
+                break
+            name = b'' if addr is None else self.sockaddr(addr=addr, family=sock.family)
+            if name is None:
+                # address has to be resolved - it is left to sendto
+                break
+            if name is not self.named[count]:
+                self.name(idx=count, name=name)
+            start = count * self.size
+            view[start:start + length] = data
+            SIZE_T.pack_into(iovecs_view, count * self.IOVEC + self.LENGTH, length)
+            count += 1
+
+        if not count:
+            return super().send(sock=sock, queue=queue)
+
+        count = sendmmsg(sock.fileno(), self.headers, count, 0)
+        if count < 0:
+            code = ctypes.get_errno()
+            if code in (errno.EAGAIN, errno.EWOULDBLOCK):
+                raise BlockingIOError(code, os.strerror(code))
+            if code == errno.EINTR:
+                raise InterruptedError(code, os.strerror(code))
+            raise OSError(code, os.strerror(code))
+        return count
+
+
+class BatchedDatagramTransport(asyncio.DatagramTransport):
+    """Datagram transport with batched I/O - socket is drained on every readable event, datagrams sent within one
+    event loop iteration are queued and flushed together"""
+
+    loop: asyncio.AbstractEventLoop
+    sock: socket.socket
+    protocol: asyncio.DatagramProtocol
+    receiver: Union[LoopReceiver, MmsgReceiver]
+    sender: Union[LoopSender, MmsgSender]
+    connected: bool
+    queue: deque[tuple[bytes, Optional[Address]]]
+    # queued bytes
+    size: int
+    flushing: bool
+    closing: bool
+
+    def __init__(
+            self,
+            *,
+            loop: asyncio.AbstractEventLoop,
+            sock: socket.socket,
+            protocol: asyncio.DatagramProtocol,
+            receiver: Union[LoopReceiver, MmsgReceiver],
+            sender: Union[LoopSender, MmsgSender],
+            peername: Optional[Address],
+    ) -> None:
+        super().__init__(extra={'socket': sock, 'sockname': sock.getsockname(), 'peername': peername})
+        self.loop = loop
+        self.sock = sock
+        self.protocol = protocol
+        self.receiver = receiver
+        self.sender = sender
+        self.connected = peername is not None
+        self.queue = deque()
+        self.size = 0
+        self.flushing = False
+        self.closing = False
+
+        self.protocol.connection_made(self)
+        self.loop.add_reader(self.sock.fileno(), self.readable)
+
+    def readable(self) -> None:
+        try:
+            datagrams = self.receiver.recv(sock=self.sock)
+        except OSError as e:
+            self.protocol.error_received(e)
+            return
+
+        for data, addr in datagrams:
+            self.protocol.datagram_received(data, addr)
+
+    def sendto(self, data: bytes, addr: Optional[Address] = None) -> None:
+        if self.closing:
+            return
+
+        self.queue.append((data, None if self.connected else addr))
+        self.size += len(data)
+        if not self.flushing:
+            self.flushing = True
+            self.loop.call_soon(self.flush)
+
+    def flush(self) -> None:
+        while self.queue:
+            try:
+                count = self.sender.send(sock=self.sock, queue=self.queue)
+            except (BlockingIOError, InterruptedError):
+                # socket buffer is full - rest of queue is flushed when socket is writable
+                self.loop.add_writer(self.sock.fileno(), self.writable)
+                return
+            except OSError as e:
+                # the first datagram failed - it is dropped, so the rest are sent
+                self.protocol.error_received(e)
+                count = 1
+            for _ in range(count):
+                data, _ = self.queue.popleft()
+                self.size -= len(data)
+
+        self.flushing = False
+
+    def writable(self) -> None:
+        self.loop.remove_writer(self.sock.fileno())
+        self.flush()
+
+    def get_write_buffer_size(self) -> int:
+        return self.size
+
+    def is_closing(self) -> bool:
+        return self.closing
+
+    def close(self) -> None:
+        if self.closing:
+            return
+
+        self.closing = True
+        self.loop.remove_reader(self.sock.fileno())
+        self.loop.remove_writer(self.sock.fileno())
+        self.queue.clear()
+        self.size = 0
+        self.loop.call_soon(self.lost)
+
+    def abort(self) -> None:
+        self.close()
+
+    def lost(self) -> None:
+        try:
+            self.protocol.connection_lost(None)
+        finally:
+            self.sock.close()
+
+
+async def create_datagram_endpoint(
+        *,
+        protocol_factory: Callable[[], asyncio.DatagramProtocol],
+        local_addr: Optional[tuple[str, int]] = None,
+        remote_addr: Optional[tuple[str, int]] = None,
+        batch: int = BATCH,
+        size: int = SIZE,
+) -> tuple[BatchedDatagramTransport, Any]:
+    """Create datagram endpoint with batched I/O - drop-in replacement of loop.create_datagram_endpoint, requires
+    event loop with add_reader support (any loop but Windows proactor)
+    :param protocol_factory: callable returning protocol
+    :param local_addr: address to bind socket to
+    :param remote_addr: address to connect socket to
+    :param batch: datagrams received per readable event and sent per system call at most
+    :param size: receive and send buffer size per datagram
+    :returns: transport and protocol"""
+
+    loop = asyncio.get_running_loop()
+    host, port = local_addr or remote_addr
+    family, kind, proto, _, sockaddr = (await loop.getaddrinfo(host, port, type=socket.SOCK_DGRAM))[0]
+
+    sock = socket.socket(family, kind, proto)
+    try:
+        sock.setblocking(False)
+        if local_addr:
+            sock.bind(sockaddr)
+        else:
+            sock.connect(sockaddr)
+    except OSError:
+        sock.close()
+        raise
+
+    protocol = protocol_factory()
+    receiver = MmsgReceiver(batch=batch, size=size) if recvmmsg else LoopReceiver(batch=batch, size=size)
+    transport = BatchedDatagramTransport(
+        loop=loop,
+        sock=sock,
+        protocol=protocol,
+        receiver=receiver,
+        sender=MmsgSender(batch=batch, size=size) if sendmmsg else LoopSender(),
+        peername=sock.getpeername() if remote_addr else None,
+    )
+    return transport, protocol
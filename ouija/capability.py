@@ -0,0 +1,111 @@
+from typing import Optional, Sequence, Union
+
+from .cipher import Cipher
+from .compression import Compression, available
+from .data import Framing, Codec, Acknowledgement, Bundling
+from .fec import Fec
+from .tuning import StreamTuning, DatagramTuning
+
+
+Capabilities = dict[str, list[str]]
+
+FRAMING = 'framing'
+CODEC = 'codec'
+CIPHER = 'cipher'
+COMPRESSION = 'compression'
+ACKNOWLEDGEMENT = 'ack'
+FEC = 'fec'
+BUNDLING = 'bundle'
+
+# Options are ordered fastest first, last option is the legacy one - used with peers without negotiation
+FRAMINGS = (Framing.LENGTH, Framing.SEPARATOR)
+CODECS = (Codec.BINARY, Codec.JSON)
+COMPRESSIONS = (Compression.ZSTD, Compression.ZLIB, Compression.NONE)
+ACKNOWLEDGEMENTS = (Acknowledgement.SELECTIVE, Acknowledgement.SINGLE)
+FECS = (Fec.XOR, Fec.NONE)
+BUNDLINGS = (Bundling.BUNDLE, Bundling.NONE)
+
+
+def supported(*, options: Sequence[str], preferred: str) -> list[str]:
+    """Options supported by node - from preferred one down to legacy one
+    :param options: all known options, fastest first
+    :param preferred: fastest option allowed by tuning
+    :returns: list of option names"""
+
+    return list(options[options.index(preferred):])
+
+
+def select(*, offered: Optional[list[str]], supported: Sequence[str], default: str) -> str:
+    """Select first offered option supported by node, default when peer offered nothing
+    :param offered: peer options in peer preference order
+    :param supported: node options
+    :param default: legacy option
+    :returns: option name"""
+
+    for option in offered or ():
+        if option in supported:
+            return option
+    return default
+
+
+def compressions(*, preferred: Compression) -> list[str]:
+    """Compressions supported by node - from preferred one down to no compression, unavailable ones are skipped
+    :param preferred: compression allowed by tuning
+    :returns: list of compression names"""
+
+    return [
+        compression
+        for compression in supported(options=COMPRESSIONS, preferred=preferred)
+        if available(compression=compression)
+    ]
+
+
+def ciphers(*, tuning: Union[StreamTuning, DatagramTuning]) -> dict[str, Cipher]:
+    """Session ciphers supported by node - alternative ciphers in preference order, then handshake cipher
+    :param tuning: StreamTuning/DatagramTuning
+    :returns: dict of cipher name to cipher"""
+
+    options = dict()
+    if tuning.cipher:
+        for cipher in (*tuning.ciphers, tuning.cipher):
+            options.setdefault(cipher.name, cipher)
+    return options
+
+
+def select_cipher(*, offered: Optional[list[str]], tuning: Union[StreamTuning, DatagramTuning]) -> Optional[Cipher]:
+    """Select session cipher, handshake cipher is used with legacy peers
+    :param offered: peer cipher names in peer preference order
+    :param tuning: StreamTuning/DatagramTuning
+    :returns: Cipher or None if encryption is off"""
+
+    if not tuning.cipher:
+        return None
+
+    options = ciphers(tuning=tuning)
+    return options[select(offered=offered, supported=list(options), default=tuning.cipher.name)]
+
+
+def session(
+        *,
+        cipher: Optional[Cipher],
+        salt: bytes,
+        peer_salt: Optional[bytes],
+        initiator: bool,
+        implicit: bool,
+) -> Optional[Cipher]:
+    """Derive session cipher from selected cipher and both salts, static cipher is used with peers without salt
+    :param cipher: selected cipher
+    :param salt: node salt
+    :param peer_salt: peer salt
+    :param initiator: True on connector side
+    :param implicit: True for ordered streams - nonce is not sent
+    :returns: Cipher or None if encryption is off"""
+
+    if not cipher or not peer_salt:
+        return cipher
+
+    return cipher.session(
+        salt=salt + peer_salt if initiator else peer_salt + salt,
+        initiator=initiator,
+        implicit=implicit,
+    )
@@ -1,30 +1,229 @@
 import base64
+import os
+import struct
+import time
+from typing import Optional, Union
 
-from cryptography.fernet import Fernet
+from cryptography.exceptions import InvalidSignature
+from cryptography.fernet import InvalidToken
+from cryptography.hazmat.primitives.ciphers import Cipher as BlockCipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+from cryptography.hazmat.primitives.hashes import SHA256
+from cryptography.hazmat.primitives.hmac import HMAC
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from cryptography.hazmat.primitives.padding import PKCS7
 
 
 class Cipher:
     """Base class for cipher implementation"""
 
+    name: str
+
     def encrypt(self, *, data: bytes) -> bytes:
         raise NotImplementedError
 
     def decrypt(self, *, data: bytes) -> bytes:
         raise NotImplementedError
 
+    def session(self, *, salt: bytes, initiator: bool, implicit: bool) -> 'Cipher':
+        """Derive per-session cipher from static key
+        :param salt: initiator salt followed by responder salt
+        :param initiator: True on connector side
+        :param implicit: True for ordered streams - nonce is not sent
+        :returns: Cipher"""
+
+        raise NotImplementedError
+
+    def accepted(self) -> Optional[int]:
+        """Watermark of explicit message counters - it grows only when message with counter above all accepted before
+        is decrypted, so replayed message never moves it
+        :returns: next counter above accepted ones, None if cipher has no explicit counter"""
+
+        return None
+
 
 class FernetCipher(Cipher):
-    """Fernet cipher"""
+    """Fernet cipher - binary Fernet token (version, timestamp, IV, AES-128-CBC ciphertext, HMAC-SHA256) is built and
+    verified directly, without base64 token text form"""
 
+    VERSION = 0x80
+    HEADER = struct.Struct('!BQ16s')
+    HMAC_SIZE = 32
+
+    name = 'FERNET'
     key: str
-    fernet: Fernet
+    signing_key: bytes
+    encryption_key: bytes
 
     def __init__(self, *, key: str) -> None:
         self.key = key
-        self.fernet = Fernet(self.key)
+        raw = base64.urlsafe_b64decode(self.key)
+        if len(raw) != 32:
+            raise ValueError('Fernet key must be 32 url-safe base64-encoded bytes')
+        self.signing_key = raw[:16]
+        self.encryption_key = raw[16:]
+
+    def sign(self, *, data: bytes) -> HMAC:
+        signature = HMAC(self.signing_key, SHA256())
+        signature.update(data)
+        return signature
 
     def encrypt(self, *, data: bytes) -> bytes:
-        return base64.urlsafe_b64decode(self.fernet.encrypt(data))
+        iv = os.urandom(16)
+        padder = PKCS7(algorithms.AES.block_size).padder()
+        encryptor = BlockCipher(algorithms.AES(self.encryption_key), modes.CBC(iv)).encryptor()
+        ciphertext = encryptor.update(padder.update(data) + padder.finalize()) + encryptor.finalize()
+
+        token = self.HEADER.pack(self.VERSION, int(time.time()), iv) + ciphertext
+        return token + self.sign(data=token).finalize()
 
     def decrypt(self, *, data: bytes) -> bytes:
-        return self.fernet.decrypt(base64.urlsafe_b64encode(data))
+        if len(data) < self.HEADER.size + self.HMAC_SIZE or data[0] != self.VERSION:
+            raise InvalidToken
+
+        try:
+            self.sign(data=data[:-self.HMAC_SIZE]).verify(data[-self.HMAC_SIZE:])
+        except InvalidSignature:
+            raise InvalidToken
+
+        _, _, iv = self.HEADER.unpack_from(data)
+        decryptor = BlockCipher(algorithms.AES(self.encryption_key), modes.CBC(iv)).decryptor()
+        unpadder = PKCS7(algorithms.AES.block_size).unpadder()
+        try:
+            padded = decryptor.update(data[self.HEADER.size:-self.HMAC_SIZE]) + decryptor.finalize()
+            return unpadder.update(padded) + unpadder.finalize()
+        except ValueError:
+            raise InvalidToken
+
+    def session(self, *, salt: bytes, initiator: bool, implicit: bool) -> 'FernetCipher':
+        # Fernet token carries its own IV - session key only
+        hkdf = HKDF(algorithm=SHA256(), length=32, salt=salt, info=b'ouija-fernet-session')
+        return FernetCipher(key=base64.urlsafe_b64encode(hkdf.derive(base64.urlsafe_b64decode(self.key))).decode())
+
+
+class AEADCipher(Cipher):
+    """Base class for AEAD cipher - message is nonce followed by ciphertext with tag, nonce is random per-instance
+    prefix and message counter, so no random bytes are generated per message"""
+
+    NONCE_PREFIX_SIZE = 8
+    NONCE_COUNTER_SIZE = 4
+    NONCE_SIZE = NONCE_PREFIX_SIZE + NONCE_COUNTER_SIZE
+
+    info: bytes
+    algorithm: type[Union[AESGCM, ChaCha20Poly1305]]
+    key: str
+    aead: Union[AESGCM, ChaCha20Poly1305]
+    prefix: bytes
+    counter: int
+
+    def __init__(self, *, key: str) -> None:
+        self.key = key
+        # cipher key is shared with Fernet - derive dedicated key per algorithm
+        hkdf = HKDF(algorithm=SHA256(), length=32, salt=None, info=self.info)
+        self.aead = self.algorithm(hkdf.derive(base64.urlsafe_b64decode(self.key)))
+        self.prefix = os.urandom(self.NONCE_PREFIX_SIZE)
+        self.counter = 0
+
+    def nonce(self) -> bytes:
+        if self.counter >= 2 ** (self.NONCE_COUNTER_SIZE * 8):
+            self.prefix = os.urandom(self.NONCE_PREFIX_SIZE)
+            self.counter = 0
+
+        nonce = self.prefix + self.counter.to_bytes(self.NONCE_COUNTER_SIZE, 'big')
+        self.counter += 1
+        return nonce
+
+    def encrypt(self, *, data: bytes) -> bytes:
+        nonce = self.nonce()
+        return nonce + self.aead.encrypt(nonce, data, None)
+
+    def decrypt(self, *, data: bytes) -> bytes:
+        return self.aead.decrypt(data[:self.NONCE_SIZE], data[self.NONCE_SIZE:], None)
+
+    def session(self, *, salt: bytes, initiator: bool, implicit: bool) -> 'AEADSession':
+        hkdf = HKDF(algorithm=SHA256(), length=64, salt=salt, info=self.info + b'-session')
+        keys = hkdf.derive(base64.urlsafe_b64decode(self.key))
+        # dedicated key per direction, so both sides may count nonces from zero
+        initiator_key, responder_key = keys[:32], keys[32:]
+        return AEADSession(
+            name=self.name,
+            send=self.algorithm(initiator_key if initiator else responder_key),
+            recv=self.algorithm(responder_key if initiator else initiator_key),
+            implicit=implicit,
+        )
+
+
+class AEADSession(Cipher):
+    """AEAD session cipher - nonce is message counter, implicit counter is not sent at all and is used for ordered
+    streams, explicit counter is sent as compact prefix and is used for datagrams, receive counter is next expected
+    one for implicit counter and watermark of accepted ones for explicit counter"""
+
+    NONCE_SIZE = 12
+    COUNTER = struct.Struct('!I')
+
+    send: Union[AESGCM, ChaCha20Poly1305]
+    recv: Union[AESGCM, ChaCha20Poly1305]
+    implicit: bool
+    send_counter: int
+    recv_counter: int
+
+    def __init__(
+            self,
+            *,
+            name: str,
+            send: Union[AESGCM, ChaCha20Poly1305],
+            recv: Union[AESGCM, ChaCha20Poly1305],
+            implicit: bool,
+    ) -> None:
+        self.name = name
+        self.send = send
+        self.recv = recv
+        self.implicit = implicit
+        self.send_counter = 0
+        self.recv_counter = 0
+
+    def encrypt(self, *, data: bytes) -> bytes:
+        counter = self.send_counter
+        if not self.implicit and counter >= 2 ** (self.COUNTER.size * 8):
+            raise ValueError('Session nonce counter exhausted')
+        self.send_counter += 1
+
+        data = self.send.encrypt(counter.to_bytes(self.NONCE_SIZE, 'big'), data, None)
+        return data if self.implicit else self.COUNTER.pack(counter) + data
+
+    def decrypt(self, *, data: bytes) -> bytes:
+        if self.implicit:
+            data = self.recv.decrypt(self.recv_counter.to_bytes(self.NONCE_SIZE, 'big'), data, None)
+            self.recv_counter += 1
+            return data
+
+        counter, = self.COUNTER.unpack_from(data)
+        data = self.recv.decrypt(counter.to_bytes(self.NONCE_SIZE, 'big'), data[self.COUNTER.size:], None)
+        self.recv_counter = max(self.recv_counter, counter + 1)
+        return data
+
+    def accepted(self) -> Optional[int]:
+        return None if self.implicit else self.recv_counter
+
+
+class AESGCMCipher(AEADCipher):
+    """AES-256-GCM cipher"""
+
+    name = 'AESGCM'
+    info = b'ouija-aesgcm'
+    algorithm = AESGCM
+
+
+class ChaCha20Poly1305Cipher(AEADCipher):
+    """ChaCha20-Poly1305 cipher"""
+
+    name = 'CHACHA20POLY1305'
+    info = b'ouija-chacha20poly1305'
+    algorithm = ChaCha20Poly1305
+
+
+CIPHERS: dict[str, type[Cipher]] = {
+    FernetCipher.name: FernetCipher,
+    AESGCMCipher.name: AESGCMCipher,
+    ChaCha20Poly1305Cipher.name: ChaCha20Poly1305Cipher,
+}
@@ -0,0 +1,114 @@
+import zlib
+from enum import StrEnum
+from typing import Union
+
+try:
+    import zstandard
+except ImportError:     # pragma: no cover
+    zstandard = None
+
+
+class Compression(StrEnum):
+    NONE = 'NONE'
+    ZLIB = 'ZLIB'
+    ZSTD = 'ZSTD'
+
+
+# Frame flag - first byte of every frame when compression is negotiated
+RAW = 0x00
+COMPRESSED = 0x01
+
+
+def available(*, compression: Compression) -> bool:
+    """Check if compression is available - zstd requires optional zstandard package
+    :param compression: Compression
+    :returns: bool"""
+
+    return compression != Compression.ZSTD or zstandard is not None
+
+
+class Compressor:
+    """Adaptive streaming compressor for single connection - frames share compression context per direction, so
+    stream must be decompressed in order. Frame which did not shrink enough switches compression off for exponentially
+    growing number of frames, so incompressible streams (e.g. TLS of CONNECT tunnels) are sent raw. Decompressed frame
+    is bounded by limit - peer never sends larger raw frame, so frame expanding above it is rejected"""
+
+    ZLIB_LEVEL = 1
+    ZSTD_LEVEL = 3
+    RATIO = 0.9
+    MAX_SKIP = 64
+    LIMIT = 2 ** 20
+    # zstd decompressor has no output bound - input is fed in chunks, so output above limit is detected early
+    ZSTD_CHUNK = 64
+
+    compression: Compression
+    limit: int
+    compressobj: Union['zlib._Compress', 'zstandard.ZstdCompressionObj']
+    decompressobj: Union['zlib._Decompress', 'zstandard.ZstdDecompressionObj']
+    flush_mode: int
+    skip: int
+    backoff: int
+
+    def __init__(self, *, compression: Compression, limit: int = LIMIT) -> None:
+        self.compression = compression
+        self.limit = limit
+        match compression:
+            case Compression.ZSTD:
+                self.compressobj = zstandard.ZstdCompressor(level=self.ZSTD_LEVEL).compressobj()
+                self.decompressobj = zstandard.ZstdDecompressor().decompressobj()
+                self.flush_mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+            case Compression.ZLIB:
+                self.compressobj = zlib.compressobj(self.ZLIB_LEVEL)
+                self.decompressobj = zlib.decompressobj()
+                self.flush_mode = zlib.Z_SYNC_FLUSH
+            case _:
+                raise ValueError(f'Unsupported compression: {compression}')
+        self.skip = 0
+        self.backoff = 1
+
+    def compress(self, *, data: bytes) -> bytes:
+        """Compress frame - frame is flushed, so it may be decompressed as soon as it is received
+        :param data: raw frame
+        :returns: flag followed by raw or compressed frame"""
+
+        if self.skip:
+            self.skip -= 1
+            return bytes((RAW,)) + data
+
+        # frame is sent compressed even if it did not shrink - compression context must match on both sides
+        compressed = self.compressobj.compress(data) + self.compressobj.flush(self.flush_mode)
+        if len(compressed) > len(data) * self.RATIO:
+            self.skip = self.backoff
+            self.backoff = min(self.backoff * 2, self.MAX_SKIP)
+        else:
+            self.backoff = 1
+
+        return bytes((COMPRESSED,)) + compressed
+
+    def decompress(self, *, data: Union[bytes, memoryview]) -> Union[bytes, memoryview]:
+        """Decompress frame, should raise ValueError if frame expands above limit
+        :param data: flag followed by raw or compressed frame
+        :returns: raw frame"""
+
+        if data[0] == RAW:
+            return data[1:]
+        if data[0] != COMPRESSED:
+            raise ValueError(f'Unknown compression flag: {data[0]}')
+
+        match self.compression:
+            case Compression.ZSTD:
+                chunks = []
+                size = 0
+                for idx in range(1, len(data), self.ZSTD_CHUNK):
+                    chunk = self.decompressobj.decompress(data[idx:idx + self.ZSTD_CHUNK])
+                    size += len(chunk)
+                    if size > self.limit:
+                        raise ValueError(f'Decompressed frame exceeds limit: {self.limit}')
+                    chunks.append(chunk)
+                return b''.join(chunks)
+            case _:
+                # one byte above limit - frame of exactly limit size is not mistaken for truncated output
+                decompressed = self.decompressobj.decompress(data[1:], self.limit + 1)
+                if len(decompressed) > self.limit or self.decompressobj.unconsumed_tail:
+                    raise ValueError(f'Decompressed frame exceeds limit: {self.limit}')
+                return decompressed
@@ -1,7 +1,12 @@
 import json
+import warnings
 from enum import StrEnum
 from typing import Optional
 
+from .compression import Compression
+from .congestion import Congestion
+from .data import Framing, Codec, Acknowledgement, Bundling
+
 
 class Mode(StrEnum):
     RELAY = 'RELAY'
@@ -20,23 +25,43 @@ class Config:
     mode: Mode
     debug: bool
     monitor: bool
+    entropy_sampling: int
+    entropy_budget: int
     relay_host: Optional[str]
     relay_port: Optional[int]
     proxy_host: str
     proxy_port: int
     cipher_key: Optional[str]
+    cipher: str
+    ciphers: list[str]
+    compression: Compression
     entropy_rate: Optional[int]
     token: str
     serving_timeout: float
     tcp_buffer: int
     tcp_timeout: float
     message_timeout: Optional[float]
+    framing: Framing
     udp_min_payload: Optional[int]
     udp_max_payload: Optional[int]
     udp_timeout: Optional[float]
     udp_retries: Optional[int]
     udp_capacity: Optional[int]
-    udp_resend_sleep: Optional[float]
+    codec: Codec
+    acknowledgement: Acknowledgement
+    bundling: Bundling
+    udp_ack_count: int
+    udp_ack_delay: float
+    udp_min_timeout: float
+    udp_max_timeout: float
+    congestion: Congestion
+    udp_pacing: bool
+    udp_rate: int
+    udp_burst: int
+    udp_pacing_delay: float
+    udp_fec: int
+    udp_cid: bool
+    udp_batch: bool
 
     def __init__(self, *, path: str) -> None:
         with open(path, 'r') as fp:
@@ -46,6 +71,8 @@ class Config:
         self.mode = Mode(json_dict.get('mode'))
         self.debug = json_dict.get('debug')
         self.monitor = json_dict.get('monitor')
+        self.entropy_sampling = json_dict.get('entropy_sampling', 1)
+        self.entropy_budget = json_dict.get('entropy_budget', 0)
 
         self.relay_host = json_dict.get('relay_host', None)
         self.relay_port = json_dict.get('relay_port', None)
@@ -53,15 +80,36 @@ class Config:
         self.proxy_port = json_dict.get('proxy_port')
 
         self.cipher_key = json_dict.get('cipher_key', None)
+        self.cipher = json_dict.get('cipher', 'FERNET')
+        self.ciphers = json_dict.get('ciphers', [])
+        self.compression = Compression(json_dict.get('compression', Compression.NONE))
         self.entropy_rate = json_dict.get('entropy_rate', None)
         self.token = json_dict.get('token')
         self.serving_timeout = json_dict.get('serving_timeout')
         self.tcp_buffer = json_dict.get('tcp_buffer')
         self.tcp_timeout = json_dict.get('tcp_timeout')
         self.message_timeout = json_dict.get('message_timeout', None)
+        self.framing = Framing(json_dict.get('framing', Framing.LENGTH))
         self.udp_min_payload = json_dict.get('udp_min_payload', None)
         self.udp_max_payload = json_dict.get('udp_max_payload', None)
         self.udp_timeout = json_dict.get('udp_timeout', None)
         self.udp_retries = json_dict.get('udp_retries', None)
         self.udp_capacity = json_dict.get('udp_capacity', None)
-        self.udp_resend_sleep = json_dict.get('udp_resend_sleep', None)
+        self.codec = Codec(json_dict.get('codec', Codec.BINARY))
+        self.acknowledgement = Acknowledgement(json_dict.get('acknowledgement', Acknowledgement.SELECTIVE))
+        self.bundling = Bundling(json_dict.get('bundling', Bundling.BUNDLE))
+        self.udp_ack_count = json_dict.get('udp_ack_count', 2)
+        self.udp_ack_delay = json_dict.get('udp_ack_delay', 0.01)
+        self.udp_min_timeout = json_dict.get('udp_min_timeout', 0.05)
+        self.udp_max_timeout = json_dict.get('udp_max_timeout', 10.0)
+        self.congestion = Congestion(json_dict.get('congestion', Congestion.RENO))
+        self.udp_pacing = json_dict.get('udp_pacing', True)
+        self.udp_rate = json_dict.get('udp_rate', 0)
+        self.udp_burst = json_dict.get('udp_burst', 10)
+        self.udp_pacing_delay = json_dict.get('udp_pacing_delay', 0.25)
+        self.udp_fec = json_dict.get('udp_fec', 0)
+        self.udp_cid = json_dict.get('udp_cid', False)
+        self.udp_batch = json_dict.get('udp_batch', False)
+
+        if 'udp_resend_sleep' in json_dict:
+            warnings.warn('udp_resend_sleep is deprecated and ignored', FutureWarning, stacklevel=2)
@@ -0,0 +1,102 @@
+from enum import StrEnum
+from typing import Optional
+
+
+class Congestion(StrEnum):
+    RENO = 'RENO'
+    DELAY = 'DELAY'
+
+
+class CongestionControl:
+    """Base class for congestion control - congestion window limits packets in flight, window is reduced once per
+    window of data on loss"""
+
+    INITIAL = 10
+    MINIMUM = 2
+
+    cwnd: float
+    ssthresh: float
+    maximum: int
+    recover: int
+
+    def __init__(self, *, maximum: int) -> None:
+        self.maximum = maximum
+        self.cwnd = self.bound(value=self.INITIAL)
+        self.ssthresh = float(maximum)
+        self.recover = 0
+
+    @property
+    def window(self) -> int:
+        return int(self.cwnd)
+
+    def bound(self, *, value: float) -> float:
+        return float(min(max(value, self.MINIMUM), self.maximum))
+
+    def ack(self, *, acked: int, rtt: Optional[float]) -> None:
+        """Grow window on acknowledgement - should be overridden with algorithm implementation
+        :param acked: number of newly acknowledged packets
+        :param rtt: RTT sample, None if acknowledged packets were retransmitted
+        :returns: None"""
+
+        raise NotImplementedError
+
+    def loss(self, *, seq: int, sent_seq: int, timeout: bool) -> bool:
+        """Shrink window on loss - losses of packets sent before previous reduction belong to the same congestion
+        event and are ignored
+        :param seq: lost packet seq
+        :param sent_seq: next seq to be sent
+        :param timeout: True if loss was detected by retransmission timeout
+        :returns: True if window was reduced"""
+
+        if seq < self.recover:
+            return False
+
+        self.recover = sent_seq
+        self.ssthresh = self.bound(value=self.cwnd / 2)
+        self.cwnd = self.bound(value=self.MINIMUM) if timeout else self.ssthresh
+        return True
+
+
+class RenoControl(CongestionControl):
+    """AIMD congestion control (NewReno) - slow start below threshold, then one packet per window per RTT, window is
+    halved on loss"""
+
+    def ack(self, *, acked: int, rtt: Optional[float]) -> None:
+        if self.cwnd < self.ssthresh:
+            self.cwnd = self.bound(value=self.cwnd + acked)
+        else:
+            self.cwnd = self.bound(value=self.cwnd + acked / self.cwnd)
+
+
+class DelayControl(CongestionControl):
+    """Delay-based congestion control (Vegas) - packets queued on path are estimated from RTT growth over min RTT,
+    window grows while queue is short and shrinks when it is long, before loss happens"""
+
+    ALPHA = 2
+    BETA = 4
+
+    base_rtt: Optional[float]
+
+    def __init__(self, *, maximum: int) -> None:
+        super().__init__(maximum=maximum)
+        self.base_rtt = None
+
+    def ack(self, *, acked: int, rtt: Optional[float]) -> None:
+        if rtt is None:
+            return
+
+        self.base_rtt = rtt if self.base_rtt is None else min(self.base_rtt, rtt)
+        queued = self.cwnd * (1 - self.base_rtt / rtt) if rtt > 0 else 0.0
+        if queued > self.BETA:
+            self.cwnd = self.bound(value=self.cwnd - acked / self.cwnd)
+            self.ssthresh = min(self.ssthresh, self.cwnd)
+        elif self.cwnd < self.ssthresh:
+            self.cwnd = self.bound(value=self.cwnd + acked)
+        elif queued < self.ALPHA:
+            self.cwnd = self.bound(value=self.cwnd + acked / self.cwnd)
+
+
+CONGESTIONS: dict[Congestion, type[CongestionControl]] = {
+    Congestion.RENO: RenoControl,
+    Congestion.DELAY: DelayControl,
+}
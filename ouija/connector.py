@@ -1,11 +1,18 @@
 import asyncio
+import os
 import uuid
+from collections import deque
 from typing import Optional
 
 from .exception import TokenError, OnOpenError, SendRetryError, OnServeError
-from .data import Message, SEPARATOR, CONNECTION_ESTABLISHED, Packet, Phase
+from .data import Message, SEPARATOR, CONNECTION_ESTABLISHED, VERSION, SALT_SIZE, CID_SIZE, Packet, Phase, Framing, \
+    Codec, Acknowledgement, Bundling
 from .log import logger
 from .ouija import StreamOuija, DatagramOuija
+from .congestion import CONGESTIONS
+from .pacing import TokenBucket
+from .rtt import RTTEstimator
+from .reorder import ReorderBuffer
 from .telemetry import Telemetry
 from .tuning import StreamTuning, DatagramTuning
 
@@ -53,11 +60,22 @@ class StreamConnector(StreamOuija):
         self.target_writer = None
         self.opened = asyncio.Event()
         self.sync = asyncio.Event()
+        self.framing = Framing.SEPARATOR
+        self.cipher = tuning.cipher
+        self.salt = os.urandom(SALT_SIZE)
+        self.compressor = None
 
     async def on_serve(self) -> None:
         self.target_reader, self.target_writer = await asyncio.open_connection(self.proxy_host, self.proxy_port)
 
-        message = Message(token=self.tuning.token, host=self.remote_host, port=self.remote_port)
+        message = Message(
+            token=self.tuning.token,
+            host=self.remote_host,
+            port=self.remote_port,
+            version=VERSION,
+            caps=self.capabilities(),
+            salt=self.salt,
+        )
         data = message.binary(cipher=self.tuning.cipher, entropy=self.tuning.entropy)
         self.target_writer.write(data)
         await self.target_writer.drain()
@@ -70,6 +88,7 @@ class StreamConnector(StreamOuija):
         message = Message.message(data=data, cipher=self.tuning.cipher, entropy=self.tuning.entropy)
         if message.token != self.tuning.token:
             raise TokenError
+        self.negotiate(caps=message.caps, salt=message.salt, initiator=True)
 
         if self.https:
             self.writer.write(data=CONNECTION_ESTABLISHED)
@@ -87,6 +106,7 @@ class DatagramConnector(DatagramOuija, asyncio.DatagramProtocol):
     transport: Optional[asyncio.DatagramTransport]
     relay: 'DatagramRelay'
     uid: str
+    cid: bytes
     proxy_host: str
     proxy_port: int
     https: bool
@@ -110,6 +130,7 @@ class DatagramConnector(DatagramOuija, asyncio.DatagramProtocol):
         self.tuning = tuning
         self.relay = relay
         self.uid = uuid.uuid4().hex
+        self.cid = os.urandom(CID_SIZE)
         self.reader = reader
         self.writer = writer
         self.proxy_host = proxy_host
@@ -121,19 +142,44 @@ class DatagramConnector(DatagramOuija, asyncio.DatagramProtocol):
         self.sync = asyncio.Event()
         self.sent_buf = dict()
         self.sent_seq = 0
+        self.sent_ack = 0
+        self.acked_high = 0
         self.read_closed = asyncio.Event()
-        self.recv_buf = dict()
+        self.recv_buf = ReorderBuffer(capacity=tuning.udp_capacity)
         self.recv_seq = 0
         self.write_closed = asyncio.Event()
+        self.codec = Codec.JSON
+        self.acknowledgement = Acknowledgement.SINGLE
+        self.bundling = Bundling.NONE
+        self.ack_pending = 0
+        self.ack_timer = None
+        self.rtt = RTTEstimator(
+            initial=tuning.udp_timeout,
+            minimum=tuning.udp_min_timeout,
+            maximum=tuning.udp_max_timeout,
+        )
+        self.scheduler = relay.scheduler
+        self.wakeup = asyncio.Event()
+        self.congestion = CONGESTIONS[tuning.congestion](maximum=tuning.udp_capacity)
+        self.window_open = asyncio.Event()
+        self.peer_window = None
+        self.pacer = TokenBucket(rate=None, burst=tuning.udp_burst * tuning.udp_max_payload)
+        self.limiter = relay.limiter
+        self.fec_encoder = None
+        self.fec_decoder = None
+        self.inbox = deque()
+        self.inbox_ready = asyncio.Event()
+        self.consumer = None
+        self.closer = None
+        self.cipher = tuning.cipher
+        self.salt = os.urandom(SALT_SIZE)
+        self.compressor = None
 
     def connection_made(self, transport) -> None:
         self.transport = transport
 
-    async def datagram_received_async(self, *, data, addr) -> None:
-        await self.process(data=data)
-
     def datagram_received(self, data, addr) -> None:
-        asyncio.create_task(self.datagram_received_async(data=data, addr=addr))
+        self.feed(data=data)
 
     def error_received(self, exc) -> None:
         logger.error(exc)   # pragma: no cover
@@ -141,12 +187,13 @@ class DatagramConnector(DatagramOuija, asyncio.DatagramProtocol):
     def connection_lost(self, exc) -> None:
         asyncio.create_task(self.close())
 
-    async def on_send(self, *, data: bytes) -> None:
-        self.transport.sendto(data)
+    def on_send(self, *, data: bytes) -> None:
+        self.transport.sendto(self.cid + data if self.tuning.udp_cid else data)
 
     async def on_open(self, *, packet: Packet) -> None:
         if not packet.ack or self.opened.is_set():
             raise OnOpenError
+        self.negotiate(caps=packet.caps, salt=packet.salt, initiator=True)
 
         if self.https:
             self.writer.write(data=CONNECTION_ESTABLISHED)
@@ -156,8 +203,13 @@ class DatagramConnector(DatagramOuija, asyncio.DatagramProtocol):
         self.relay.connectors[self.uid] = self
 
     async def on_serve(self) -> None:
-        loop = asyncio.get_event_loop()
-        await loop.create_datagram_endpoint(lambda: self, remote_addr=(self.proxy_host, self.proxy_port))
+        if self.tuning.udp_cid:
+            # replies are demultiplexed by relay shared socket
+            self.transport = self.relay.transport
+            self.relay.routes[self.cid] = self
+        else:
+            loop = asyncio.get_event_loop()
+            await loop.create_datagram_endpoint(lambda: self, remote_addr=(self.proxy_host, self.proxy_port))
 
         open_packet = Packet(
             phase=Phase.OPEN,
@@ -165,6 +217,9 @@ class DatagramConnector(DatagramOuija, asyncio.DatagramProtocol):
             token=self.tuning.token,
             host=self.remote_host,
             port=self.remote_port,
+            version=VERSION,
+            caps=self.capabilities(),
+            salt=self.salt,
         )
         try:
             await self.send_retry(packet=open_packet, event=self.opened)
@@ -172,6 +227,8 @@ class DatagramConnector(DatagramOuija, asyncio.DatagramProtocol):
             raise OnServeError
 
     async def on_close(self) -> None:
-        if isinstance(self.transport, asyncio.DatagramTransport) and not self.transport.is_closing():
+        if self.tuning.udp_cid:
+            self.relay.routes.pop(self.cid, None)
+        elif isinstance(self.transport, asyncio.DatagramTransport) and not self.transport.is_closing():
             self.transport.close()
         self.relay.connectors.pop(self.uid, None)
@@ -1,21 +1,40 @@
 import base64
 import re
+import struct
 import time
 from dataclasses import dataclass, field
-from enum import IntEnum
-from typing import Optional
+from enum import IntEnum, StrEnum
+from typing import Optional, Union
 
 import pbjson
 
 from .cipher import Cipher
+from .compression import Compressor
 from .entropy import Entropy
+from .exception import DecodeError
+from .scheduler import Timer
 
 
 HTTP_PORT = 80
 HTTPS_PORT = 443
 CONNECT = 'CONNECT'
 SEPARATOR = b'\r\n\r\n'
+LENGTH = struct.Struct('!I')
+# length-framed body limit - tcp_buffer read expands by compression, cipher and entropy overhead, frame limit is the
+# floor, so peer with larger tcp_buffer is still accepted
+FRAME_FACTOR = 4
+FRAME_OVERHEAD = 1024
+FRAME_LIMIT = 2 ** 20
+# UDP payload size limit - datagram of any peer fits in it
+UDP_SIZE = 65535
 CONNECTION_ESTABLISHED = b'HTTP/1.1 200 Connection Established\r\n\r\n'
+# Wire protocol version, sent with capabilities in handshake - legacy peers send neither
+VERSION = 2
+# Random salt sent in handshake by each side, session key is derived from static key and both salts
+SALT_SIZE = 16
+# Random connection ID which precedes every UDP datagram when connection IDs are on - relay demultiplexes replies on
+# shared socket by it, proxy keys links by it
+CID_SIZE = 8
 
 
 class Parser:
@@ -58,6 +77,47 @@ class Parser:
         return str(dict(URI=self.uri, HOST=self.host, PORT=self.port, METHOD=self.method))
 
 
+class Framing(StrEnum):
+    SEPARATOR = 'SEPARATOR'
+    LENGTH = 'LENGTH'
+
+
+class Codec(StrEnum):
+    JSON = 'JSON'
+    BINARY = 'BINARY'
+
+
+class Acknowledgement(StrEnum):
+    SINGLE = 'SINGLE'
+    SELECTIVE = 'SELECTIVE'
+
+
+class Bundling(StrEnum):
+    NONE = 'NONE'
+    BUNDLE = 'BUNDLE'
+
+
+# Binary packet codec: version, phase, flags, seq, payload length - followed by raw payload
+BINARY_VERSION = 1
+HEADER = struct.Struct('!BBBIH')
+FLAG_ACK = 0x01
+FLAG_DRAIN = 0x02
+FLAG_SEQ = 0x04
+FLAG_DATA = 0x08
+FLAG_SACK = 0x10
+FLAG_WINDOW = 0x20
+FLAG_PARITY = 0x40
+# Selective ACK range - [start, end) sequence numbers, payload of binary ACK with FLAG_SACK
+SACK_RANGE = struct.Struct('!II')
+SACK_LIMIT = 16
+# Packet is considered lost when this many packets sent after it are acknowledged
+DUPTHRESH = 3
+# Receive window - seq beyond the last one receiver accepts, precedes payload of binary ACK with FLAG_WINDOW
+WINDOW = struct.Struct('!I')
+# Parity group size - data packets from seq covered by FEC parity packet, precedes payload with FLAG_PARITY
+PARITY = struct.Struct('!H')
+
+
 MAPPING = {
     'phase': 'pe',
     'ack': 'ak',
@@ -67,6 +127,12 @@ MAPPING = {
     'seq': 'sq',
     'data': 'da',
     'drain': 'dn',
+    'version': 'vn',
+    'caps': 'cs',
+    'salt': 'st',
+    'sack': 'sk',
+    'window': 'wn',
+    'parity': 'py',
 }
 
 
@@ -77,6 +143,9 @@ class Message:
     token: str
     host: Optional[str] = None
     port: Optional[int] = None
+    version: Optional[int] = None
+    caps: Optional[dict[str, list[str]]] = None
+    salt: Optional[bytes] = None
 
     def binary(self, *, cipher: Optional[Cipher], entropy: Optional[Entropy]) -> bytes:
         json_dict = {MAPPING[k]: v for k, v in self.__dict__.items() if v is not None}
@@ -105,27 +174,62 @@ class Message:
             token=json_dict.get(MAPPING['token']),
             host=json_dict.get(MAPPING['host'], None),
             port=json_dict.get(MAPPING['port'], None),
+            version=json_dict.get(MAPPING['version'], None),
+            caps=json_dict.get(MAPPING['caps'], None),
+            salt=json_dict.get(MAPPING['salt'], None),
         )
 
     @staticmethod
-    def encrypt(*, data: bytes, cipher: Optional[Cipher], entropy: Optional[Entropy]) -> bytes:
+    def encrypt(
+            *,
+            data: bytes,
+            cipher: Optional[Cipher],
+            entropy: Optional[Entropy],
+            framing: Framing = Framing.SEPARATOR,
+            compressor: Optional[Compressor] = None,
+    ) -> bytes:
+        if compressor:
+            data = compressor.compress(data=data)
         if cipher:
             data = cipher.encrypt(data=data)
-        data = base64.urlsafe_b64encode(data)
-        if entropy:
-            data = entropy.decrease(data=data)
 
-        return data + SEPARATOR
+        match framing:
+            case Framing.LENGTH:
+                if entropy:
+                    data = entropy.decrease(data=data)
+                return LENGTH.pack(len(data)) + data
+            case _:
+                data = base64.urlsafe_b64encode(data)
+                if entropy:
+                    data = entropy.decrease(data=data)
+                return data + SEPARATOR
 
     @staticmethod
-    def decrypt(*, data: bytes, cipher: Optional[Cipher], entropy: Optional[Entropy]) -> bytes:
-        data = data[:-len(SEPARATOR)]
+    def decrypt(
+            *,
+            data: bytes,
+            cipher: Optional[Cipher],
+            entropy: Optional[Entropy],
+            framing: Framing = Framing.SEPARATOR,
+            compressor: Optional[Compressor] = None,
+    ) -> bytes:
+        """Decrypt framed message - separator-framed data includes SEPARATOR, length-framed data is the frame body
+        without LENGTH header"""
+
+        match framing:
+            case Framing.LENGTH:
+                if entropy:
+                    data = entropy.increase(data=data)
+            case _:
+                data = data[:-len(SEPARATOR)]
+                if entropy:
+                    data = entropy.increase(data=data)
+                data = base64.urlsafe_b64decode(data)
 
-        if entropy:
-            data = entropy.increase(data=data)
-        data = base64.urlsafe_b64decode(data)
         if cipher:
             data = cipher.decrypt(data=data)
+        if compressor:
+            data = compressor.decompress(data=data)
 
         return data
 
@@ -146,26 +250,55 @@ class Packet:
     host: Optional[str] = None
     port: Optional[int] = None
     seq: Optional[int] = None
-    data: Optional[bytes] = None
+    data: Optional[Union[bytes, memoryview]] = None
     drain: Optional[bool] = None
+    version: Optional[int] = None
+    caps: Optional[dict[str, list[str]]] = None
+    salt: Optional[bytes] = None
+    # ACK with sack is cumulative - seq is next expected seq, sack holds received ranges above it, ACK without sack
+    # acknowledges single seq
+    sack: Optional[list[list[int]]] = None
+    # receive window advertised in ACK - sender should not send seq equal to or above it
+    window: Optional[int] = None
+    # FEC parity packet - data is XOR of parity group blocks, parity is group size
+    parity: Optional[int] = None
+
+    def encode(self, *, codec: Codec) -> bytes:
+        """Serialize packet, open packets are always JSON-encoded to stay readable by any peer
+        :param codec: Codec
+        :returns: bytes"""
+
+        if codec == Codec.BINARY and self.phase != Phase.OPEN:
+            flags = FLAG_ACK if self.ack else 0
+            if self.seq is not None:
+                flags |= FLAG_SEQ
+            if self.data is not None:
+                flags |= FLAG_DATA | (FLAG_DRAIN if self.drain else 0)
+            data = self.data or b''
+            if self.sack is not None:
+                flags |= FLAG_SACK
+                data = b''.join(SACK_RANGE.pack(start, end) for start, end in self.sack)
+            window = b''
+            if self.window is not None:
+                flags |= FLAG_WINDOW
+                window = WINDOW.pack(self.window)
+            if self.parity is not None:
+                flags |= FLAG_PARITY
+                window += PARITY.pack(self.parity)
+            return HEADER.pack(BINARY_VERSION, self.phase, flags, self.seq or 0, len(data)) + window + data
 
-    def binary(self, *, cipher: Optional[Cipher], entropy: Optional[Entropy]) -> bytes:
         json_dict = {MAPPING[k]: v for k, v in self.__dict__.items() if v is not None}
-        data = pbjson.dumps(json_dict)
-
-        if cipher:
-            data = cipher.encrypt(data=data)
-        if entropy:
-            data = entropy.decrease(data=data)
-
-        return data
+        return pbjson.dumps(json_dict)
 
     @staticmethod
-    def packet(*, data: bytes, cipher: Optional[Cipher], entropy: Optional[Entropy]) -> 'Packet':
-        if entropy:
-            data = entropy.increase(data=data)
-        if cipher:
-            data = cipher.decrypt(data=data)
+    def decode(*, data: bytes) -> 'Packet':
+        """Deserialize packet - codec is detected by the first byte, binary packet payload is a memoryview slice of
+        data, so payload is never copied
+        :param data: bytes
+        :returns: Packet"""
+
+        if data[0] == BINARY_VERSION:
+            return Packet.decode_frame(data=data, offset=0)[0]
 
         json_dict = pbjson.loads(data)
         return Packet(
@@ -177,17 +310,154 @@ class Packet:
             seq=json_dict.get(MAPPING['seq'], None),
             data=json_dict.get(MAPPING['data'], None),
             drain=json_dict.get(MAPPING['drain'], None),
+            version=json_dict.get(MAPPING['version'], None),
+            caps=json_dict.get(MAPPING['caps'], None),
+            salt=json_dict.get(MAPPING['salt'], None),
+            sack=json_dict.get(MAPPING['sack'], None),
+            window=json_dict.get(MAPPING['window'], None),
+            parity=json_dict.get(MAPPING['parity'], None),
         )
 
+    @staticmethod
+    def decode_frame(*, data: bytes, offset: int) -> tuple['Packet', int]:
+        """Deserialize binary packet at offset, should raise DecodeError if frame is truncated
+        :param data: bytes
+        :param offset: packet offset
+        :returns: Packet and offset of the next packet"""
+
+        if offset + HEADER.size > len(data):
+            raise DecodeError('Truncated frame header')
+        version, phase, flags, seq, length = HEADER.unpack_from(data, offset)
+        if version != BINARY_VERSION:
+            raise DecodeError(f'Unknown frame version {version}')
+        offset += HEADER.size
+        options = (WINDOW.size if flags & FLAG_WINDOW else 0) + (PARITY.size if flags & FLAG_PARITY else 0)
+        if offset + options + length > len(data):
+            raise DecodeError('Truncated frame')
+        window = None
+        if flags & FLAG_WINDOW:
+            window, = WINDOW.unpack_from(data, offset)
+            offset += WINDOW.size
+        parity = None
+        if flags & FLAG_PARITY:
+            parity, = PARITY.unpack_from(data, offset)
+            offset += PARITY.size
+        packet = Packet(
+            phase=Phase(phase),
+            ack=bool(flags & FLAG_ACK),
+            seq=seq if flags & FLAG_SEQ else None,
+            data=memoryview(data)[offset:offset + length] if flags & FLAG_DATA else None,
+            drain=bool(flags & FLAG_DRAIN) if flags & FLAG_DATA else None,
+            sack=[
+                list(sack_range)
+                for sack_range in SACK_RANGE.iter_unpack(data[offset:offset + length])
+            ] if flags & FLAG_SACK else None,
+            window=window,
+            parity=parity,
+        )
+        return packet, offset + length
+
+    @staticmethod
+    def decode_all(*, data: bytes) -> list['Packet']:
+        """Deserialize all packets of datagram - bundle is a sequence of binary packets, JSON packet is never bundled,
+        should raise DecodeError if any frame is truncated or trailing bytes remain
+        :param data: bytes
+        :returns: list of Packet"""
+
+        if data[0] != BINARY_VERSION:
+            return [Packet.decode(data=data)]
+
+        packets = []
+        offset = 0
+        while offset < len(data):
+            packet, offset = Packet.decode_frame(data=data, offset=offset)
+            packets.append(packet)
+        return packets
+
+    def binary(self, *, cipher: Optional[Cipher], entropy: Optional[Entropy], codec: Codec = Codec.JSON) -> bytes:
+        return Packet.wrap(data=self.encode(codec=codec), cipher=cipher, entropy=entropy)
+
+    @staticmethod
+    def bundle(*, packets: list['Packet'], cipher: Optional[Cipher], entropy: Optional[Entropy]) -> bytes:
+        """Serialize packets into single datagram - binary packets are concatenated and encrypted at once
+        :param packets: list of Packet
+        :param cipher: Cipher
+        :param entropy: Entropy
+        :returns: bytes"""
+
+        data = b''.join(packet.encode(codec=Codec.BINARY) for packet in packets)
+        return Packet.wrap(data=data, cipher=cipher, entropy=entropy)
+
+    @staticmethod
+    def wrap(*, data: bytes, cipher: Optional[Cipher], entropy: Optional[Entropy]) -> bytes:
+        if cipher:
+            data = cipher.encrypt(data=data)
+        if entropy:
+            data = entropy.decrease(data=data)
+
+        return data
+
+    @staticmethod
+    def packet(
+            *,
+            data: bytes,
+            cipher: Optional[Cipher],
+            entropy: Optional[Entropy],
+            fallback: Optional[Cipher] = None,
+    ) -> 'Packet':
+        """Decode packet, fallback cipher is tried when cipher fails - handshake packets use handshake cipher, while
+        session cipher may be already negotiated"""
+
+        return Packet.decode(data=Packet.unwrap(data=data, cipher=cipher, entropy=entropy, fallback=fallback))
+
+    @staticmethod
+    def packets(
+            *,
+            data: bytes,
+            cipher: Optional[Cipher],
+            entropy: Optional[Entropy],
+            fallback: Optional[Cipher] = None,
+    ) -> list['Packet']:
+        """Decode all packets of datagram, fallback cipher is tried when cipher fails"""
+
+        return Packet.decode_all(data=Packet.unwrap(data=data, cipher=cipher, entropy=entropy, fallback=fallback))
+
+    @staticmethod
+    def unwrap(
+            *,
+            data: bytes,
+            cipher: Optional[Cipher],
+            entropy: Optional[Entropy],
+            fallback: Optional[Cipher],
+    ) -> bytes:
+        if entropy:
+            data = entropy.increase(data=data)
+        if cipher:
+            try:
+                decrypted = cipher.decrypt(data=data)
+            except Exception:
+                if fallback is None or fallback is cipher:
+                    raise
+                decrypted = fallback.decrypt(data=data)
+            data = decrypted
+
+        return data
+
 
 @dataclass(kw_only=True)
 class Sent:
     data: bytes
-    timestamp: float = field(default_factory=time.time)
+    # monotonic time of first and last transmission
+    timestamp: float = field(default_factory=time.monotonic)
+    resent: float = field(default_factory=time.monotonic)
     retries: int = 1
+    # scheduled retransmission
+    timer: Optional[Timer] = None
+    # monotonic time until which fast retransmission waits for receiver to rebuild packet from FEC parity
+    fec: float = 0.0
 
 
 @dataclass(kw_only=True)
 class Received:
-    data: bytes
+    data: Union[bytes, memoryview]
     drain: bool
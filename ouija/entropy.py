@@ -1,15 +1,41 @@
+import math
+
 import numpy as np
 
 
+# x * log2(x) for byte counts - entropy of histogram without per-call log2
+XLOG2X_SIZE = 2 ** 16
+XLOG2X = np.zeros(XLOG2X_SIZE)
+XLOG2X[1:] = np.arange(1, XLOG2X_SIZE) * np.log2(np.arange(1, XLOG2X_SIZE))
+
+
 class Entropy:
     """Base class for entropy implementation"""
 
+    @staticmethod
+    def histogram(*, data: bytes) -> np.ndarray:
+        return np.bincount(np.frombuffer(data, dtype='B'), minlength=256)
+
+    @staticmethod
+    def estimate(*, counts: np.ndarray) -> float:
+        """Shannon entropy of byte histogram - H = log2(N) - sum(c * log2(c)) / N
+        :param counts: byte histogram
+        :returns: entropy, bits per byte"""
+
+        total = int(counts.sum())
+        if not total:
+            return 0.0
+
+        if total < XLOG2X_SIZE:
+            xlog2x = XLOG2X[counts].sum()
+        else:
+            nonzero = counts[counts > 0]
+            xlog2x = np.dot(nonzero, np.log2(nonzero))
+        return max(math.log2(total) - xlog2x / total, 0.0)
+
     @staticmethod
     def calculate(*, data: bytes) -> float:
-        array = np.frombuffer(data, dtype='B')
-        _, counts = np.unique(array, return_counts=True)
-        probs = counts / array.size
-        return -np.sum(probs * np.log2(probs))
+        return Entropy.estimate(counts=Entropy.histogram(data=data))
 
     def decrease(self, *, data: bytes) -> bytes:
         raise NotImplementedError
@@ -28,22 +54,29 @@ class SimpleEntropy(Entropy):
 
     def decrease(self, *, data: bytes) -> bytes:
         array = np.frombuffer(data, dtype='B')
-        values, counts = np.unique(array, return_counts=True)
-        array_dict = {counts[idx]: values[idx:idx + 1] for idx in range(len(values))}
-        filler = array_dict[max(array_dict)].tobytes()
+        if not array.size:
+            return b''
+
+        # most frequent byte, the greatest one on tie
+        counts = np.bincount(array, minlength=256)
+        filler = 255 - np.argmax(counts[::-1])
 
-        decreased = b''
-        for idx in range(0, len(data), self.rate - 1):
-            decreased += data[idx:idx + self.rate - 1]
-            if len(data) - idx >= self.rate - 1:
-                decreased += filler
+        step = self.rate - 1
+        chunks = array.size // step
+        decreased = np.empty(array.size + chunks, dtype='B')
+        body = decreased[:chunks * self.rate].reshape(chunks, self.rate)
+        body[:, :step] = array[:chunks * step].reshape(chunks, step)
+        body[:, step] = filler
+        decreased[chunks * self.rate:] = array[chunks * step:]
 
-        return decreased
+        return decreased.tobytes()
 
     def increase(self, *, data: bytes) -> bytes:
-        increased = b''
+        array = np.frombuffer(data, dtype='B')
 
-        for idx in range(0, len(data), self.rate):
-            increased += data[idx:idx + self.rate - 1]
+        chunks = array.size // self.rate
+        increased = np.empty(array.size - chunks, dtype='B')
+        increased[:chunks * (self.rate - 1)] = array[:chunks * self.rate].reshape(chunks, self.rate)[:, :-1].ravel()
+        increased[chunks * (self.rate - 1):] = array[chunks * self.rate:]
 
-        return increased
+        return increased.tobytes()
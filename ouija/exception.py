@@ -16,3 +16,7 @@ class BufOverloadError(Exception):
 
 class OnServeError(Exception):
     pass
+
+
+class DecodeError(Exception):
+    pass
@@ -0,0 +1,143 @@
+import struct
+from enum import StrEnum
+from typing import Optional, Union
+
+from .data import Packet, Phase, Received
+from .reorder import ReorderBuffer
+
+
+class Fec(StrEnum):
+    NONE = 'NONE'
+    XOR = 'XOR'
+
+
+# Parity block of data packet - payload length and drain flag followed by payload, blocks of different length are
+# XOR-ed as if zero-padded
+BLOCK = struct.Struct('!HB')
+# Parity packets waiting for more than one lost packet of their group
+PENDING_LIMIT = 16
+
+
+def block(*, data: Union[bytes, memoryview], drain: bool) -> bytes:
+    return BLOCK.pack(len(data), drain) + data
+
+
+class FecEncoder:
+    """XOR parity encoder - parity packet is sent after every group of data packets and after the last packet of
+    client read, so tail of interactive exchange is protected as well"""
+
+    group: int
+    start: int
+    count: int
+    parity: int
+    size: int
+
+    def __init__(self, *, group: int) -> None:
+        self.group = group
+        self.start = 0
+        self.count = 0
+        self.parity = 0
+        self.size = 0
+
+    def add(self, *, seq: int, data: Union[bytes, memoryview], drain: bool) -> Optional[Packet]:
+        """Add data packet to group
+        :param seq: packet seq
+        :param data: packet payload
+        :param drain: packet drain flag
+        :returns: parity packet when group is complete, None otherwise"""
+
+        if not self.count:
+            self.start = seq
+        value = block(data=data, drain=drain)
+        self.parity ^= int.from_bytes(value, 'little')
+        self.size = max(self.size, len(value))
+        self.count += 1
+
+        if self.count < self.group and not drain:
+            return None
+
+        packet = Packet(
+            phase=Phase.DATA,
+            ack=False,
+            seq=self.start,
+            data=self.parity.to_bytes(self.size, 'little'),
+            drain=False,
+            parity=self.count,
+        )
+        self.count = 0
+        self.parity = 0
+        self.size = 0
+        return packet
+
+
+class FecDecoder:
+    """XOR parity decoder - recently received packets are kept in rolling history, so single lost packet of group is
+    rebuilt from parity and the rest of group, parity of group with more lost packets waits for retransmissions.
+    History keeps packets of groups whose parity may still arrive only - older packets are overwritten, so memory per
+    connection is bounded regardless of transfer size"""
+
+    history: ReorderBuffer
+    pending: dict[int, Packet]
+
+    def __init__(self, *, capacity: int) -> None:
+        # history wraps around - put overwrites packet of older group in the same slot
+        self.history = ReorderBuffer(capacity=capacity)
+        self.pending = dict()
+
+    def add(self, *, seq: int, data: Union[bytes, memoryview], drain: bool) -> None:
+        self.history.put(seq=seq, received=Received(data=data, drain=drain))
+
+    def rebuild(self, *, parity: Packet, base: int) -> Optional[Packet]:
+        """Rebuild lost packet of group
+        :param parity: parity packet
+        :param base: next expected seq - packets below it were delivered
+        :returns: rebuilt packet, None if group is complete or it can not be rebuilt yet"""
+
+        missing = [seq for seq in range(parity.seq, parity.seq + parity.parity) if seq not in self.history]
+        if len(missing) != 1 or missing[0] < base:
+            if len(missing) > 1:
+                self.pending[parity.seq] = parity
+            return None
+
+        value = int.from_bytes(parity.data, 'little')
+        for seq in range(parity.seq, parity.seq + parity.parity):
+            if seq != missing[0]:
+                received = self.history.get(seq=seq)
+                value ^= int.from_bytes(block(data=received.data, drain=received.drain), 'little')
+
+        data = value.to_bytes(len(parity.data), 'little')
+        length, drain = BLOCK.unpack_from(data)
+        if BLOCK.size + length > len(data):
+            return None
+        return Packet(
+            phase=Phase.DATA,
+            ack=False,
+            seq=missing[0],
+            data=data[BLOCK.size:BLOCK.size + length],
+            drain=bool(drain),
+        )
+
+    def recover(self, *, parity: Packet, base: int) -> Optional[Packet]:
+        """Process parity packet
+        :param parity: parity packet
+        :param base: next expected seq
+        :returns: rebuilt packet or None"""
+
+        if len(self.pending) >= PENDING_LIMIT:
+            self.pending.pop(next(iter(self.pending)))
+        return self.rebuild(parity=parity, base=base)
+
+    def retry(self, *, base: int) -> list[Packet]:
+        """Retry pending groups after data packet was received
+        :param base: next expected seq
+        :returns: list of rebuilt packets"""
+
+        recovered = []
+        for start, parity in list(self.pending.items()):
+            del self.pending[start]
+            if start + parity.parity <= base:
+                continue
+            packet = self.rebuild(parity=parity, base=base)
+            if packet:
+                recovered.append(packet)
+        return recovered
@@ -1,10 +1,19 @@
 import asyncio
+import os
 import uuid
+from collections import deque
+from typing import Optional, Union
 
-from .exception import TokenError, OnOpenError, OnServeError
-from .data import Message, SEPARATOR, Packet, Phase
+from .capability import Capabilities
+from .exception import TokenError, OnOpenError, OnServeError, DecodeError
+from .data import Message, SEPARATOR, VERSION, SALT_SIZE, Packet, Phase, Framing, Codec, Acknowledgement, Bundling
 from .ouija import StreamOuija, DatagramOuija
+from .congestion import CONGESTIONS
+from .pacing import TokenBucket
+from .rtt import RTTEstimator
+from .reorder import ReorderBuffer
 from .telemetry import Telemetry
+from .log import logger
 from .tuning import StreamTuning, DatagramTuning
 
 from typing import TYPE_CHECKING
@@ -40,6 +49,10 @@ class StreamLink(StreamOuija):
         self.target_writer = None
         self.opened = asyncio.Event()
         self.sync = asyncio.Event()
+        self.framing = Framing.SEPARATOR
+        self.cipher = tuning.cipher
+        self.salt = os.urandom(SALT_SIZE)
+        self.compressor = None
 
     async def on_serve(self) -> None:
         try:
@@ -55,7 +68,13 @@ class StreamLink(StreamOuija):
         self.remote_port = message.port
         self.target_reader, self.target_writer = await asyncio.open_connection(self.remote_host, self.remote_port)
 
-        message = Message(token=self.tuning.token)
+        caps = self.negotiate(caps=message.caps, salt=message.salt)
+        message = Message(
+            token=self.tuning.token,
+            version=VERSION,
+            caps=caps,
+            salt=self.salt if message.salt else None,
+        ) if message.version else Message(token=self.tuning.token)
         data = message.binary(cipher=self.tuning.cipher, entropy=self.tuning.entropy)
         self.writer.write(data)
         await self.writer.drain()
@@ -71,6 +90,8 @@ class DatagramLink(DatagramOuija):
 
     proxy: 'DatagramProxy'
     addr: tuple[str, int]
+    cid: Optional[bytes]
+    caps: Optional[Capabilities]
 
     def __init__(
             self,
@@ -79,11 +100,13 @@ class DatagramLink(DatagramOuija):
             tuning: DatagramTuning,
             proxy: 'DatagramProxy',
             addr: tuple[str, int],
+            cid: Optional[bytes] = None,
     ) -> None:
         self.telemetry = telemetry
         self.tuning = tuning
         self.proxy = proxy
         self.addr = addr
+        self.cid = cid
         self.reader = None
         self.writer = None
         self.remote_host = None
@@ -92,22 +115,91 @@ class DatagramLink(DatagramOuija):
         self.sync = asyncio.Event()
         self.sent_buf = dict()
         self.sent_seq = 0
+        self.sent_ack = 0
+        self.acked_high = 0
         self.read_closed = asyncio.Event()
-        self.recv_buf = dict()
+        self.recv_buf = ReorderBuffer(capacity=tuning.udp_capacity)
         self.recv_seq = 0
         self.write_closed = asyncio.Event()
+        self.codec = Codec.JSON
+        self.acknowledgement = Acknowledgement.SINGLE
+        self.bundling = Bundling.NONE
+        self.ack_pending = 0
+        self.ack_timer = None
+        self.rtt = RTTEstimator(
+            initial=tuning.udp_timeout,
+            minimum=tuning.udp_min_timeout,
+            maximum=tuning.udp_max_timeout,
+        )
+        self.scheduler = proxy.scheduler
+        self.wakeup = asyncio.Event()
+        self.congestion = CONGESTIONS[tuning.congestion](maximum=tuning.udp_capacity)
+        self.window_open = asyncio.Event()
+        self.peer_window = None
+        self.pacer = TokenBucket(rate=None, burst=tuning.udp_burst * tuning.udp_max_payload)
+        self.limiter = proxy.limiter
+        self.fec_encoder = None
+        self.fec_decoder = None
+        self.inbox = deque()
+        self.inbox_ready = asyncio.Event()
+        self.consumer = None
+        self.closer = None
+        self.cipher = tuning.cipher
+        self.salt = os.urandom(SALT_SIZE)
+        self.compressor = None
+        self.caps = None
+
+    @property
+    def key(self) -> Union[tuple[str, int], bytes]:
+        return self.cid or self.addr
+
+    def on_send(self, *, data: bytes) -> None:
+        self.proxy.transport.sendto(self.cid + data if self.cid else data, self.addr)
+
+    def rebind(self, *, data: bytes, addr: tuple[str, int]) -> None:
+        """Process datagram from new peer address - link is switched to it only by datagram which is decrypted with
+        session cipher and carries explicit counter above all accepted before, so connection survives NAT rebinding,
+        while replayed or spoofed datagrams can not redirect it; links without explicit counter are never switched
+        :param data: datagram
+        :param addr: new peer address
+        :returns: None"""
+
+        accepted = self.cipher.accepted() if self.cipher else None
+        try:
+            packets = self.decode(data=data)
+        except DecodeError:
+            logger.error('Decode error')
+            self.telemetry.processing_error()
+            return
+
+        if accepted is None or self.cipher.accepted() <= accepted:
+            # datagram can not be told from replay - it is dropped, new path is taken by the next fresh one
+            return
 
-    async def on_send(self, *, data: bytes) -> None:
-        self.proxy.transport.sendto(data, self.addr)
+        self.addr = addr
+        self.dispatch(packets=packets)
 
     async def on_open(self, *, packet: Packet) -> None:
         if not packet.host or not packet.port:
+            if not self.opened.is_set():
+                # link is registered by proxy on open packet - link without remote is closed and unregistered
+                self.close_nowait()
             raise OnOpenError
 
+        # negotiated once - open retries are answered with the same ack, session keys and nonces are kept
+        if self.caps is None:
+            self.caps = self.negotiate(caps=packet.caps, salt=packet.salt)
         open_ack_packet = Packet(
             phase=Phase.OPEN,
             ack=True,
             token=self.tuning.token,
+            version=VERSION,
+            caps=self.caps,
+            salt=self.salt if packet.salt else None,
+        ) if packet.version else Packet(
+            phase=Phase.OPEN,
+            ack=True,
+            token=self.tuning.token,
         )
         if self.opened.is_set():
             await self.send_packet(packet=open_ack_packet)
@@ -118,11 +210,10 @@ class DatagramLink(DatagramOuija):
         self.reader, self.writer = await asyncio.open_connection(self.remote_host, self.remote_port)
         self.opened.set()
         asyncio.create_task(self.serve())
-        self.proxy.links[self.addr] = self
         await self.send_packet(packet=open_ack_packet)
 
     async def on_serve(self) -> None:   # pragma: no cover
         pass
 
     async def on_close(self) -> None:
-        self.proxy.links.pop(self.addr, None)
+        self.proxy.links.pop(self.key, None)
@@ -1,13 +1,27 @@
 import asyncio
+import inspect
 import time
+from collections import deque
+from functools import partial
 from random import randrange
-from typing import Optional
-
-from .exception import TokenError, SendRetryError, BufOverloadError, OnOpenError, OnServeError
-from .data import Message, SEPARATOR, Sent, Received, Packet, Phase
+from typing import Optional, Union
+
+from .capability import Capabilities, FRAMING, CODEC, CIPHER, COMPRESSION, ACKNOWLEDGEMENT, FEC, BUNDLING, FRAMINGS, \
+    CODECS, ACKNOWLEDGEMENTS, FECS, BUNDLINGS, supported, select, ciphers, select_cipher, session, compressions
+from .cipher import Cipher
+from .compression import Compression, Compressor
+from .congestion import CongestionControl
+from .exception import TokenError, SendRetryError, BufOverloadError, OnOpenError, OnServeError, DecodeError
+from .data import Message, SEPARATOR, LENGTH, FRAME_FACTOR, FRAME_OVERHEAD, FRAME_LIMIT, SACK_LIMIT, DUPTHRESH, \
+    HEADER, WINDOW, SACK_RANGE, UDP_SIZE, Framing, Codec, Acknowledgement, Bundling, Sent, Received, Packet, Phase
 from .telemetry import Telemetry
 from .tuning import StreamTuning, DatagramTuning
 from .log import logger
+from .rtt import RTTEstimator
+from .scheduler import Scheduler, Callback
+from .pacing import TokenBucket, SLOW_START_GAIN, GAIN
+from .reorder import ReorderBuffer
+from .fec import PENDING_LIMIT, Fec, FecEncoder, FecDecoder
 
 
 class StreamOuija:
@@ -24,12 +38,91 @@ class StreamOuija:
     target_writer: Optional[asyncio.StreamWriter]
     opened: asyncio.Event
     sync: asyncio.Event
+    framing: Framing
+    cipher: Optional[Cipher]
+    salt: bytes
+    compressor: Optional[Compressor]
+
+    def capabilities(self) -> Capabilities:
+        """Capabilities offered in handshake
+        :returns: dict of capability to supported options, fastest first"""
+
+        caps = {FRAMING: supported(options=FRAMINGS, preferred=self.tuning.framing)}
+        if self.tuning.cipher:
+            caps[CIPHER] = list(ciphers(tuning=self.tuning))
+        if self.tuning.compression != Compression.NONE:
+            caps[COMPRESSION] = compressions(preferred=self.tuning.compression)
+        return caps
+
+    def negotiate(
+            self,
+            *,
+            caps: Optional[Capabilities],
+            salt: Optional[bytes] = None,
+            initiator: bool = False,
+    ) -> Capabilities:
+        """Select and apply first offered options supported by both sides, legacy options are used when peer
+        offered nothing, session cipher is derived when peer sent its salt
+        :param caps: peer capabilities
+        :param salt: peer salt
+        :param initiator: True on connector side
+        :returns: selected capabilities"""
+
+        caps = caps or dict()
+        self.framing = Framing(select(
+            offered=caps.get(FRAMING),
+            supported=supported(options=FRAMINGS, preferred=self.tuning.framing),
+            default=Framing.SEPARATOR,
+        ))
+        self.cipher = session(
+            cipher=select_cipher(offered=caps.get(CIPHER), tuning=self.tuning),
+            salt=self.salt,
+            peer_salt=salt,
+            initiator=initiator,
+            implicit=True,
+        )
+        compression = Compression(select(
+            offered=caps.get(COMPRESSION),
+            supported=compressions(preferred=self.tuning.compression),
+            default=Compression.NONE,
+        ))
+        # raw frame is a single read of peer tcp_buffer - own buffer is the bound for symmetric tuning
+        self.compressor = Compressor(
+            compression=compression,
+            limit=max(Compressor.LIMIT, self.tuning.tcp_buffer),
+        ) if compression != Compression.NONE else None
+
+        selected = {FRAMING: [self.framing]}
+        if self.cipher:
+            selected[CIPHER] = [self.cipher.name]
+        if self.compressor:
+            selected[COMPRESSION] = [compression]
+        return selected
+
+    async def read_frame(self, *, reader: asyncio.StreamReader) -> bytes:
+        """Read single tunnel frame, timeout of frame start is retried by caller, so frame is never partially consumed,
+        should raise DecodeError if length exceeds frame limit or frame body is not read in time
+        :param reader: asyncio.StreamReader
+        :returns: frame - with SEPARATOR for separator framing, without LENGTH header for length framing"""
+
+        match self.framing:
+            case Framing.LENGTH:
+                header = await asyncio.wait_for(reader.readexactly(LENGTH.size), self.tuning.message_timeout)
+                length, = LENGTH.unpack(header)
+                if length > max(FRAME_LIMIT, self.tuning.tcp_buffer * FRAME_FACTOR + FRAME_OVERHEAD):
+                    raise DecodeError(f'Frame length {length} exceeds limit')
+                try:
+                    return await asyncio.wait_for(reader.readexactly(length), self.tuning.tcp_timeout)
+                except TimeoutError as e:
+                    raise DecodeError('Frame body timeout') from e
+            case _:
+                return await asyncio.wait_for(reader.readuntil(SEPARATOR), self.tuning.message_timeout)
 
     async def forward_wrapped(self, *, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, crypt: bool) -> None:
         while self.sync.is_set():
             try:
                 data = await asyncio.wait_for(reader.read(self.tuning.tcp_buffer), self.tuning.tcp_timeout) if crypt \
-                    else await asyncio.wait_for(reader.readuntil(SEPARATOR), self.tuning.message_timeout)
+                    else await self.read_frame(reader=reader)
             except TimeoutError:
                 continue
             except asyncio.IncompleteReadError:
@@ -40,8 +133,19 @@ class StreamOuija:
 
             if not crypt:
                 self.telemetry.recv(data=data, entropy=self.tuning.entropy)
-            data = Message.encrypt(data=data, cipher=self.tuning.cipher, entropy=self.tuning.entropy) if crypt \
-                else Message.decrypt(data=data, cipher=self.tuning.cipher, entropy=self.tuning.entropy)
+            data = Message.encrypt(
+                data=data,
+                cipher=self.cipher,
+                entropy=self.tuning.entropy,
+                framing=self.framing,
+                compressor=self.compressor,
+            ) if crypt else Message.decrypt(
+                data=data,
+                cipher=self.cipher,
+                entropy=self.tuning.entropy,
+                framing=self.framing,
+                compressor=self.compressor,
+            )
 
             writer.write(data)
             await writer.drain()
@@ -67,6 +171,9 @@ class StreamOuija:
         except ConnectionError as e:
             logger.error(e)
             self.telemetry.connection_error()
+        except DecodeError as e:
+            logger.error(e)
+            self.telemetry.processing_error()
         except Exception as e:
             logger.exception(e)
             self.telemetry.serving_error()
@@ -147,24 +254,191 @@ class DatagramOuija:
     sync: asyncio.Event
     sent_buf: dict[int, Sent]
     sent_seq: int
+    sent_ack: int
+    acked_high: int
     read_closed: asyncio.Event
-    recv_buf: dict[int, Received]
+    recv_buf: ReorderBuffer
     recv_seq: int
     write_closed: asyncio.Event
-
-    async def on_send(self, *, data: bytes) -> None:
-        """Hook - send binary data via UDP
+    codec: Codec
+    cipher: Optional[Cipher]
+    salt: bytes
+    compressor: Optional[Compressor]
+    acknowledgement: Acknowledgement
+    bundling: Bundling
+    ack_pending: int
+    ack_timer: Optional[asyncio.TimerHandle]
+    rtt: RTTEstimator
+    scheduler: Scheduler
+    wakeup: asyncio.Event
+    congestion: CongestionControl
+    window_open: asyncio.Event
+    peer_window: Optional[int]
+    pacer: TokenBucket
+    limiter: TokenBucket
+    fec_encoder: Optional[FecEncoder]
+    fec_decoder: Optional[FecDecoder]
+    inbox: deque[Callback]
+    inbox_ready: asyncio.Event
+    consumer: Optional[asyncio.Task]
+    closer: Optional[asyncio.Task]
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        """Reject coroutine on_send override - hook is called synchronously, so coroutine would never be awaited and
+        datagram would be lost silently"""
+
+        super().__init_subclass__(**kwargs)
+        if inspect.iscoroutinefunction(cls.on_send):
+            raise TypeError(f'{cls.__name__}.on_send must be a plain method, datagram transport never blocks')
+
+    def capabilities(self) -> Capabilities:
+        """Capabilities offered in handshake
+        :returns: dict of capability to supported options, fastest first"""
+
+        caps = {
+            CODEC: supported(options=CODECS, preferred=self.tuning.codec),
+            ACKNOWLEDGEMENT: supported(options=ACKNOWLEDGEMENTS, preferred=self.tuning.acknowledgement),
+            BUNDLING: supported(options=BUNDLINGS, preferred=self.tuning.bundling),
+        }
+        if self.tuning.cipher:
+            caps[CIPHER] = list(ciphers(tuning=self.tuning))
+        if self.tuning.compression != Compression.NONE:
+            caps[COMPRESSION] = compressions(preferred=self.tuning.compression)
+        if self.tuning.udp_fec:
+            caps[FEC] = supported(options=FECS, preferred=Fec.XOR)
+        return caps
+
+    def negotiate(
+            self,
+            *,
+            caps: Optional[Capabilities],
+            salt: Optional[bytes] = None,
+            initiator: bool = False,
+    ) -> Capabilities:
+        """Select and apply first offered options supported by both sides, legacy options are used when peer
+        offered nothing, session cipher is derived when peer sent its salt
+        :param caps: peer capabilities
+        :param salt: peer salt
+        :param initiator: True on connector side
+        :returns: selected capabilities"""
+
+        caps = caps or dict()
+        self.codec = Codec(select(
+            offered=caps.get(CODEC),
+            supported=supported(options=CODECS, preferred=self.tuning.codec),
+            default=Codec.JSON,
+        ))
+        self.acknowledgement = Acknowledgement(select(
+            offered=caps.get(ACKNOWLEDGEMENT),
+            supported=supported(options=ACKNOWLEDGEMENTS, preferred=self.tuning.acknowledgement),
+            default=Acknowledgement.SINGLE,
+        ))
+        # bundle is split by binary packet length, JSON packets are never bundled
+        self.bundling = Bundling(select(
+            offered=caps.get(BUNDLING),
+            supported=supported(options=BUNDLINGS, preferred=self.tuning.bundling),
+            default=Bundling.NONE,
+        )) if self.codec == Codec.BINARY else Bundling.NONE
+        self.cipher = session(
+            cipher=select_cipher(offered=caps.get(CIPHER), tuning=self.tuning),
+            salt=self.salt,
+            peer_salt=salt,
+            initiator=initiator,
+            implicit=False,
+        )
+        compression = Compression(select(
+            offered=caps.get(COMPRESSION),
+            supported=compressions(preferred=self.tuning.compression),
+            default=Compression.NONE,
+        ))
+        # raw payload of any peer fits in single datagram
+        self.compressor = Compressor(
+            compression=compression,
+            limit=UDP_SIZE,
+        ) if compression != Compression.NONE else None
+        fec = Fec(select(
+            offered=caps.get(FEC),
+            supported=supported(options=FECS, preferred=Fec.XOR if self.tuning.udp_fec else Fec.NONE),
+            default=Fec.NONE,
+        ))
+        # parity is sent by both sides - group size is taken from tuning of each side
+        self.fec_encoder = FecEncoder(group=self.tuning.udp_fec) if fec == Fec.XOR else None
+        self.fec_decoder = FecDecoder(
+            capacity=min(self.tuning.udp_capacity, self.tuning.udp_fec * PENDING_LIMIT),
+        ) if fec == Fec.XOR else None
+
+        selected = {CODEC: [self.codec], ACKNOWLEDGEMENT: [self.acknowledgement], BUNDLING: [self.bundling]}
+        if self.cipher:
+            selected[CIPHER] = [self.cipher.name]
+        if self.compressor:
+            selected[COMPRESSION] = [compression]
+        if self.fec_encoder:
+            selected[FEC] = [fec]
+        return selected
+
+    def on_send(self, *, data: bytes) -> None:
+        """Hook - send binary data via UDP, datagram transport never blocks, so hook is a plain method, coroutine
+        override is rejected with TypeError
         :param data: binary data
         :returns: None"""
 
         raise NotImplementedError
 
     async def send(self, *, data: bytes) -> None:
-        await self.on_send(data=data)
+        """Send datagram paced by link rate and global rate cap - datagram waits for its tokens and is never dropped,
+        so control packets and buffered packets always go out, backlog is bounded by wait_pacing
+        :param data: binary data
+        :returns: None"""
+
+        delay = max(self.pacer.reserve(size=len(data)), self.limiter.reserve(size=len(data)))
+        if delay:
+            self.telemetry.pace(delay=delay)
+            await asyncio.sleep(delay)
+
+        self.on_send(data=data)
+        self.telemetry.send(data=data, entropy=self.tuning.entropy)
+
+    def send_nowait(self, *, data: bytes) -> bool:
+        """Send datagram right away if link rate and global rate cap allow it
+        :param data: binary data
+        :returns: False if datagram has to wait for pacing - it is not sent and its tokens are returned"""
+
+        delay = max(self.pacer.reserve(size=len(data)), self.limiter.reserve(size=len(data)))
+        if delay:
+            self.pacer.refund(size=len(data))
+            self.limiter.refund(size=len(data))
+            return False
+
+        self.on_send(data=data)
         self.telemetry.send(data=data, entropy=self.tuning.entropy)
+        return True
+
+    async def wait_pacing(self) -> None:
+        """Wait until pacing backlog is within udp_pacing_delay - new data packet is held before send buffer, so client
+        is slowed down instead of queueing datagrams behind rate limit
+        :returns: None"""
+
+        delay = max(self.pacer.delay(), self.limiter.delay()) - self.tuning.udp_pacing_delay
+        if delay > 0:
+            self.telemetry.pacing_hold()
+            await asyncio.sleep(delay)
+
+    def pace(self) -> None:
+        """Update link pacing rate from congestion window and smoothed RTT
+        :returns: None"""
+
+        if not self.tuning.udp_pacing or not self.rtt.srtt:
+            return
+
+        gain = SLOW_START_GAIN if self.congestion.cwnd < self.congestion.ssthresh else GAIN
+        self.pacer.rate = gain * self.congestion.cwnd * self.tuning.udp_max_payload / self.rtt.srtt
 
     def packet_binary(self, *, packet: Packet) -> bytes:
-        return packet.binary(cipher=self.tuning.cipher, entropy=self.tuning.entropy)
+        return packet.binary(
+            cipher=self.tuning.cipher if packet.phase == Phase.OPEN else self.cipher,
+            entropy=self.tuning.entropy,
+            codec=self.codec,
+        )
 
     async def send_packet(self, *, packet: Packet) -> None:
         await self.send(data=self.packet_binary(packet=packet))
@@ -174,7 +448,7 @@ class DatagramOuija:
             await self.send_packet(packet=packet)
 
             try:
-                await asyncio.wait_for(event.wait(), self.tuning.udp_timeout)
+                await asyncio.wait_for(event.wait(), self.rtt.rto)
             except TimeoutError:
                 continue
             else:
@@ -182,6 +456,200 @@ class DatagramOuija:
 
         raise SendRetryError
 
+    def acknowledge(self, *, packet: Packet) -> None:
+        """Drop acknowledged packets from sent buffer - single seq for legacy ACK, everything below cumulative seq and
+        within SACK ranges for selective ACK, sample RTT, grow congestion window and update peer receive window
+        :param packet: ACK packet
+        :returns: None"""
+
+        if packet.window is not None and (self.peer_window is None or packet.window > self.peer_window):
+            self.peer_window = packet.window
+            self.window_open.set()
+
+        if packet.sack is None:
+            acked = [self.sent_buf.pop(packet.seq, None)]
+            if acked[0] is not None:
+                self.acked_high = max(self.acked_high, packet.seq + 1)
+        else:
+            acked = [self.sent_buf.pop(seq, None) for seq in range(self.sent_ack, min(packet.seq, self.sent_seq))]
+            self.sent_ack = max(self.sent_ack, min(packet.seq, self.sent_seq))
+            self.acked_high = max(self.acked_high, self.sent_ack)
+
+            for start, end in packet.sack:
+                acked.extend(
+                    self.sent_buf.pop(seq, None)
+                    for seq in range(max(start, self.sent_ack), min(end, self.sent_seq))
+                )
+                self.acked_high = max(self.acked_high, min(end, self.sent_seq))
+
+        acked = [sent for sent in acked if sent is not None]
+        if not acked:
+            return
+        for sent in acked:
+            self.scheduler.cancel(timer=sent.timer)
+
+        # Karn's rule - retransmitted packets are ambiguous, the latest packet sent once gives the freshest sample
+        rtt = None
+        timestamps = [sent.timestamp for sent in acked if sent.retries == 1]
+        if timestamps:
+            rtt = time.monotonic() - max(timestamps)
+            self.rtt.sample(rtt=rtt)
+            self.telemetry.rtt(rtt=rtt)
+
+        self.congestion.ack(acked=len(acked), rtt=rtt)
+        self.telemetry.cwnd(cwnd=self.congestion.cwnd)
+        self.pace()
+        self.window_open.set()
+        if not self.sent_buf:
+            self.wakeup.set()
+
+    def lost(self) -> list[int]:
+        """Packets considered lost - at least DUPTHRESH packets sent after them are acknowledged (RFC 6675), packets
+        retransmitted already are left to retransmission timer, packets which FEC parity may still recover are left
+        until parity deadline
+        :returns: list of seqs"""
+
+        # sent buffer keeps seq order - unacknowledged packets below the highest acknowledged one are holes
+        holes = []
+        for seq in self.sent_buf:
+            if seq >= self.acked_high:
+                break
+            holes.append(seq)
+
+        lost = []
+        now = time.monotonic()
+        for idx, seq in enumerate(holes):
+            if self.acked_high - seq - (len(holes) - idx) < DUPTHRESH:
+                break
+            sent = self.sent_buf[seq]
+            if sent.retries == 1 and sent.fec <= now:
+                lost.append(seq)
+        return lost
+
+    async def fast_retransmit(self) -> None:
+        """Retransmit lost packets without waiting for retransmission timeout
+        :returns: None"""
+
+        for seq in self.lost():
+            sent = self.sent_buf.get(seq)
+            if sent is None:
+                continue
+
+            if self.congestion.loss(seq=seq, sent_seq=self.sent_seq, timeout=False):
+                self.telemetry.loss()
+                self.pace()
+            await self.send(data=sent.data)
+            sent.resent = time.monotonic()
+            sent.retries += 1
+            self.telemetry.retransmit()
+            self.telemetry.fast_retransmit()
+
+    def protect(self, *, seqs: Union[range, list[int]]) -> None:
+        """Postpone fast retransmission of packets of FEC group - receiver SACKs gap at once, while lost packet is
+        rebuilt and acknowledged within RTT after parity is sent, group without parity yet is protected until next
+        packet of group or its parity is sent
+        :param seqs: seqs of group sent so far
+        :returns: None"""
+
+        deadline = time.monotonic() + (self.rtt.srtt or self.rtt.rto) + self.tuning.udp_ack_delay
+        for seq in seqs:
+            sent = self.sent_buf.get(seq)
+            if sent is not None:
+                sent.fec = deadline
+
+    def sack(self) -> list[list[int]]:
+        """Received ranges above cumulative seq, ranges beyond SACK_LIMIT are left to retransmission
+        :returns: list of [start, end) ranges"""
+
+        return self.recv_buf.ranges(start=self.recv_seq, limit=SACK_LIMIT)
+
+    async def send_ack(self, *, immediate: bool) -> None:
+        """Acknowledge received packet - selective ACK is sent for every udp_ack_count packets or after udp_ack_delay,
+        whichever comes first, and immediately on gap or duplicate
+        :param immediate: send ACK regardless of pending packets count
+        :returns: None"""
+
+        if self.ack_due(immediate=immediate):
+            await self.flush_ack()
+
+    def ack_due(self, *, immediate: bool) -> bool:
+        """Count received packet for selective ACK, delayed ACK timer is armed for the first one
+        :param immediate: send ACK regardless of pending packets count
+        :returns: True if ACK should be sent now"""
+
+        self.ack_pending += 1
+        if not immediate and self.ack_pending < self.tuning.udp_ack_count:
+            if self.ack_timer is None:
+                self.ack_timer = asyncio.get_running_loop().call_later(self.tuning.udp_ack_delay, self.ack_timeout)
+            return False
+
+        return True
+
+    def ack_packet(self) -> Packet:
+        """Selective ACK for all pending packets - pending ACK state is reset, so ACK should be sent
+        :returns: Packet"""
+
+        if self.ack_timer:
+            self.ack_timer.cancel()
+            self.ack_timer = None
+
+        self.telemetry.ack_saved(count=self.ack_pending - 1)
+        self.ack_pending = 0
+        return Packet(
+            phase=Phase.DATA,
+            ack=True,
+            seq=self.recv_seq,
+            sack=self.sack(),
+            window=self.recv_seq + self.tuning.udp_capacity,
+        )
+
+    async def flush_ack(self) -> None:
+        """Send selective ACK for all pending packets
+        :returns: None"""
+
+        if self.ack_pending:
+            await self.send_packet(packet=self.ack_packet())
+        elif self.ack_timer:
+            self.ack_timer.cancel()
+            self.ack_timer = None
+
+    def piggyback(self, *, size: int) -> list[Packet]:
+        """Pending selective ACK to be bundled with outgoing packet - ACK is not delayed any longer, while both frames
+        with the largest SACK stay within udp_max_payload
+        :param size: outgoing packet payload size, bytes
+        :returns: list of ACK packets, empty if nothing to piggyback"""
+
+        if self.bundling != Bundling.BUNDLE or not self.ack_pending:
+            return []
+
+        # data frame header, ACK frame header, receive window and the largest SACK
+        if size + 2 * HEADER.size + WINDOW.size + SACK_RANGE.size * SACK_LIMIT > self.tuning.udp_max_payload:
+            return []
+
+        self.telemetry.ack_piggybacked()
+        return [self.ack_packet()]
+
+    async def send_packets(self, *, packets: list[Packet]) -> None:
+        """Send packets in single datagram
+        :param packets: list of Packet
+        :returns: None"""
+
+        if len(packets) == 1:
+            await self.send_packet(packet=packets[0])
+        else:
+            await self.send(data=Packet.bundle(packets=packets, cipher=self.cipher, entropy=self.tuning.entropy))
+
+    async def flush_ack_delayed(self) -> None:
+        try:
+            await self.flush_ack()
+        except Exception as e:
+            logger.exception(e)
+            self.telemetry.processing_error()
+
+    def ack_timeout(self) -> None:
+        self.ack_timer = None
+        asyncio.create_task(self.flush_ack_delayed())
+
     async def on_open(self, packet: Packet) -> None:
         """Hook - process phase open packet, should raise OnOpenError if open failed
         :param packet: Packet
@@ -189,10 +657,120 @@ class DatagramOuija:
 
         raise NotImplementedError
 
-    async def process_wrapped(self, *, data: bytes) -> None:
+    def write(self, *, data: Union[bytes, memoryview]) -> None:
+        self.writer.write(self.compressor.decompress(data=data) if self.compressor else data)
+
+    def writable(self) -> bool:
+        """Client writer accepts more data without waiting - drain would return right away
+        :returns: bool"""
+
+        transport = self.writer.transport
+        return not transport.is_closing() and \
+            transport.get_write_buffer_size() <= transport.get_write_buffer_limits()[1]
+
+    def deliver(self, *, packet: Packet) -> bool:
+        """Write in-order packet and buffered successors, client writer is not drained
+        :param packet: Packet with next expected seq
+        :returns: True if any written packet asks for drain"""
+
+        self.write(data=packet.data)
+        drain = packet.drain
+        self.recv_seq += 1
+        while self.recv_buf and (recv := self.recv_buf.pop(seq=self.recv_seq)) is not None:
+            self.write(data=recv.data)
+            drain = drain or recv.drain
+            self.recv_seq += 1
+        return drain
+
+    async def receive(self, *, packet: Packet) -> None:
+        """Process data packet - acknowledge it and write it in order
+        :param packet: Packet
+        :returns: None"""
+
+        if packet.seq - self.recv_seq >= self.tuning.udp_capacity and not self.write_closed.is_set():
+            # beyond receive window - packet is dropped unacknowledged and will be retransmitted
+            self.telemetry.recv_buf_overload()
+            return
+
+        selective = self.acknowledgement == Acknowledgement.SELECTIVE
+        if not selective:
+            data_ack_packet = Packet(
+                phase=Phase.DATA,
+                ack=True,
+                seq=packet.seq,
+            )
+            await self.send_packet(packet=data_ack_packet)
+
+        if self.write_closed.is_set():
+            if selective:
+                # received data is discarded - packet is acknowledged without buffering
+                data_ack_packet = Packet(
+                    phase=Phase.DATA,
+                    ack=True,
+                    seq=self.recv_seq,
+                    sack=[[packet.seq, packet.seq + 1]],
+                    window=self.recv_seq + self.tuning.udp_capacity,
+                )
+                await self.send_packet(packet=data_ack_packet)
+            return
+
+        if self.fec_decoder:
+            self.fec_decoder.add(seq=packet.seq, data=packet.data, drain=packet.drain)
+
+        duplicate = packet.seq < self.recv_seq or packet.seq in self.recv_buf
+        if packet.seq == self.recv_seq:
+            # in-order fast path - packet is written without buffering, then buffered successors
+            if self.deliver(packet=packet):
+                await self.writer.drain()
+        elif packet.seq > self.recv_seq:
+            self.recv_buf.put(seq=packet.seq, received=Received(data=packet.data, drain=packet.drain))
+
+        if selective:
+            await self.send_ack(immediate=duplicate or bool(self.recv_buf))
+
+        if self.fec_decoder and self.fec_decoder.pending:
+            for recovered in self.fec_decoder.retry(base=self.recv_seq):
+                self.telemetry.fec_recover()
+                await self.receive(packet=recovered)
+
+    async def recover(self, *, packet: Packet) -> None:
+        """Process FEC parity packet - rebuild single lost data packet of parity group
+        :param packet: Packet
+        :returns: None"""
+
+        if not self.fec_decoder or self.write_closed.is_set():
+            return
+
+        recovered = self.fec_decoder.recover(parity=packet, base=self.recv_seq)
+        if recovered:
+            self.telemetry.fec_recover()
+            await self.receive(packet=recovered)
+
+    def decode(self, *, data: bytes) -> list[Packet]:
+        """Decode datagram, should raise DecodeError if datagram is malformed
+        :param data: binary datagram
+        :returns: list of Packet - bundled packets in order"""
+
         self.telemetry.recv(data=data, entropy=self.tuning.entropy)
-        packet = Packet.packet(data=data, cipher=self.tuning.cipher, entropy=self.tuning.entropy)
+        try:
+            return Packet.packets(
+                data=data,
+                cipher=self.cipher,
+                entropy=self.tuning.entropy,
+                fallback=self.tuning.cipher,
+            )
+        except Exception as e:
+            raise DecodeError from e
+
+    async def process_wrapped(self, *, data: bytes) -> None:
+        await self.process_packets(packets=self.decode(data=data))
 
+    async def process_packets(self, *, packets: list[Packet]) -> None:
+        # bundled packets are processed in order - piggybacked ACK precedes data
+        for packet in packets:
+            await self.process_packet(packet=packet)
+
+    async def process_packet(self, *, packet: Packet) -> None:
         match packet.phase:
             case Phase.OPEN:
                 if packet.token != self.tuning.token:
@@ -205,33 +783,12 @@ class DatagramOuija:
                     return
 
                 if packet.ack:
-                    self.sent_buf.pop(packet.seq, None)
+                    self.acknowledge(packet=packet)
+                    await self.fast_retransmit()
+                elif packet.parity is not None:
+                    await self.recover(packet=packet)
                 else:
-                    data_ack_packet = Packet(
-                        phase=Phase.DATA,
-                        ack=True,
-                        seq=packet.seq,
-                    )
-                    await self.send_packet(packet=data_ack_packet)
-
-                    if self.write_closed.is_set():
-                        return
-
-                    if packet.seq >= self.recv_seq:
-                        self.recv_buf[packet.seq] = Received(data=packet.data, drain=packet.drain)
-
-                    for seq in sorted(self.recv_buf.keys()):
-                        if seq != self.recv_seq:
-                            continue
-
-                        recv = self.recv_buf.pop(seq)
-                        self.writer.write(recv.data)
-                        if recv.drain:
-                            await self.writer.drain()
-                        self.recv_seq += 1
-
-                    if len(self.recv_buf) >= self.tuning.udp_capacity:
-                        raise BufOverloadError
+                    await self.receive(packet=packet)
             case Phase.CLOSE:
                 if not self.opened.is_set():
                     return
@@ -248,17 +805,21 @@ class DatagramOuija:
             case _:     # pragma: no cover
                 pass
 
-    async def process(self, *, data: bytes) -> None:
-        """Decode and process packet
-        :param data: binary packet
-        :returns: None"""
+    async def guard(self, *, callback: Callback) -> bool:
+        """Run processing callback, errors are counted
+        :param callback: coroutine function without arguments
+        :returns: False if connection should be closed"""
 
         try:
-            await self.process_wrapped(data=data)
+            await callback()
         except TokenError:
             self.telemetry.token_error()
         except OnOpenError:
-            return
+            return True
+        except DecodeError:
+            logger.error('Decode error')
+            self.telemetry.processing_error()
+            return True
         except BufOverloadError:
             self.telemetry.recv_buf_overload()
         except ConnectionError as e:
@@ -268,25 +829,195 @@ class DatagramOuija:
             logger.exception(e)
             self.telemetry.processing_error()
         else:
+            return True
+
+        return False
+
+    async def process(self, *, data: bytes) -> None:
+        """Decode and process packet
+        :param data: binary packet
+        :returns: None"""
+
+        if not await self.guard(callback=partial(self.process_wrapped, data=data)):
+            await self.close()
+
+    def process_nowait(self, *, packet: Packet) -> bool:
+        """Process packet without waiting - ACK and in-order data packet, follow-up work which has to wait (fast
+        retransmission, drain of client writer, paced ACK) is queued for consumer
+        :param packet: Packet
+        :returns: False if packet has to be processed by consumer, nothing is changed then"""
+
+        if packet.phase != Phase.DATA or not self.opened.is_set():
+            return False
+
+        if packet.ack:
+            self.acknowledge(packet=packet)
+            if self.lost():
+                self.enqueue(callback=self.fast_retransmit)
+            return True
+
+        if packet.parity is not None or packet.seq != self.recv_seq or self.write_closed.is_set() or \
+                self.acknowledgement != Acknowledgement.SELECTIVE or (self.fec_decoder and self.fec_decoder.pending):
+            return False
+
+        if self.fec_decoder:
+            self.fec_decoder.add(seq=packet.seq, data=packet.data, drain=packet.drain)
+        drain = self.deliver(packet=packet)
+        immediate = bool(self.recv_buf)
+        if drain and not self.writable():
+            # client is slow - ACK waits for drain, so peer is slowed down as well
+            self.enqueue(callback=self.writer.drain)
+            self.enqueue(callback=partial(self.send_ack, immediate=immediate))
+        elif self.ack_due(immediate=immediate):
+            ack_packet = self.ack_packet()
+            if not self.send_nowait(data=self.packet_binary(packet=ack_packet)):
+                self.enqueue(callback=partial(self.send_packet, packet=ack_packet))
+        return True
+
+    def enqueue(self, *, callback: Callback) -> None:
+        """Queue work for consumer task of connection, task is started once
+        :param callback: coroutine function without arguments
+        :returns: None"""
+
+        self.inbox.append(callback)
+        if self.consumer is None:
+            self.consumer = asyncio.create_task(self.consume())
+        self.inbox_ready.set()
+
+    async def consume(self) -> None:
+        """Consumer task - queued work is run one by one until connection is closed, once work fails, the rest of
+        queue is dropped and connection is closed, consumer goes on, so peer close packets are processed meanwhile
+        :returns: None"""
+
+        while True:
+            while self.inbox:
+                if not await self.guard(callback=self.inbox[0]):
+                    self.inbox.clear()
+                    self.close_nowait()
+                    break
+                self.inbox.popleft()
+
+            self.inbox_ready.clear()
+            await self.inbox_ready.wait()
+
+    def close_nowait(self) -> None:
+        """Close connection in separate task, once only - caller is not blocked by close handshake
+        :returns: None"""
+
+        if self.closer is None:
+            self.closer = asyncio.create_task(self.close())
+
+    def feed(self, *, data: bytes) -> None:
+        """Process datagram in arrival order - packets are processed synchronously, once some work has to wait, it is
+        queued for consumer task along with later datagrams, so datagrams of connection are never processed
+        concurrently, queued datagrams are decoded by consumer, so they are decrypted with negotiated session cipher
+        :param data: binary datagram
+        :returns: None"""
+
+        if self.inbox:
+            self.defer(callback=partial(self.process_wrapped, data=data))
             return
 
-        await self.close()
+        try:
+            packets = self.decode(data=data)
+        except DecodeError:
+            logger.error('Decode error')
+            self.telemetry.processing_error()
+            return
 
-    async def resend_wrapped(self) -> None:
-        while self.sync.is_set() or self.sent_buf:
-            await asyncio.sleep(self.tuning.udp_resend_sleep)
+        self.dispatch(packets=packets)
 
-            for seq in sorted(self.sent_buf.keys()):
-                sent = self.sent_buf[seq]
-                delta = time.time() - sent.timestamp
+    def dispatch(self, *, packets: list[Packet]) -> None:
+        """Process decoded packets of datagram in arrival order
+        :param packets: list of Packet
+        :returns: None"""
 
-                if delta >= self.tuning.udp_timeout * self.tuning.udp_retries:
-                    self.sent_buf.pop(seq, None)
-                    continue
+        if self.inbox:
+            self.defer(callback=partial(self.process_packets, packets=packets))
+            return
 
-                if delta >= self.tuning.udp_timeout * sent.retries:
-                    await self.send(data=sent.data)
-                    sent.retries += 1
+        try:
+            for idx, packet in enumerate(packets):
+                if self.inbox or not self.process_nowait(packet=packet):
+                    self.enqueue(callback=partial(self.process_packets, packets=packets[idx:]))
+                    return
+        except Exception as e:
+            logger.exception(e)
+            self.telemetry.processing_error()
+            asyncio.create_task(self.close())
+
+    def defer(self, *, callback: Callback) -> None:
+        """Queue received datagram behind waiting work, queue is bounded by receive window
+        :param callback: coroutine function without arguments
+        :returns: None"""
+
+        if len(self.inbox) >= self.tuning.udp_capacity:
+            # client writer is stuck - datagram is dropped and will be retransmitted
+            self.telemetry.recv_buf_overload()
+            return
+
+        self.enqueue(callback=callback)
+
+    async def retransmit_wrapped(self, *, seq: int) -> None:
+        sent = self.sent_buf.get(seq)
+        if sent is None or not self.opened.is_set():
+            return
+
+        now = time.monotonic()
+        if now - sent.timestamp >= self.tuning.udp_timeout * self.tuning.udp_retries:
+            # packet was never acknowledged - peer will wait for it forever, so connection is stuck
+            raise BufOverloadError
+
+        due = sent.resent + self.rtt.timeout(retries=sent.retries)
+        if now + Scheduler.RESOLUTION < due:
+            # packet was fast retransmitted meanwhile or timeout grew - timer is restarted
+            sent.timer = self.scheduler.schedule(delay=due - now, callback=partial(self.retransmit, seq=seq))
+            return
+
+        if self.congestion.loss(seq=seq, sent_seq=self.sent_seq, timeout=True):
+            self.telemetry.loss()
+            self.pace()
+        await self.send(data=sent.data)
+        if self.sent_buf.get(seq) is not sent:
+            # packet was acknowledged or dropped while send was paced
+            return
+        sent.resent = time.monotonic()
+        sent.retries += 1
+        self.telemetry.retransmit()
+        sent.timer = self.scheduler.schedule(
+            delay=self.rtt.timeout(retries=sent.retries),
+            callback=partial(self.retransmit, seq=seq),
+        )
+
+    def discard(self) -> None:
+        """Drop sent buffer, scheduled retransmissions are cancelled, so scheduler keeps no reference to connection
+        :returns: None"""
+
+        for sent in self.sent_buf.values():
+            self.scheduler.cancel(timer=sent.timer)
+        self.sent_buf.clear()
+
+    async def retransmit(self, *, seq: int) -> None:
+        """Scheduled retransmission - packet is resent with backed off timeout until it is acknowledged or dropped
+        :param seq: packet seq
+        :returns: None"""
+
+        try:
+            await self.retransmit_wrapped(seq=seq)
+        except BufOverloadError:
+            self.telemetry.send_buf_overload()
+            # scheduled retransmissions of other packets are cancelled, connection is closed once
+            self.discard()
+            asyncio.create_task(self.close())
+        except Exception as e:
+            logger.exception(e)
+            self.telemetry.resending_error()
+
+    async def resend_wrapped(self) -> None:
+        # retransmissions are fired by scheduler - wait until serving is done and sent buffer is drained
+        while self.sync.is_set() or self.sent_buf:
+            await self.wakeup.wait()
+            self.wakeup.clear()
 
         self.sync.clear()
 
@@ -307,6 +1038,24 @@ class DatagramOuija:
 
         raise NotImplementedError
 
+    async def wait_window(self) -> bool:
+        """Wait until congestion window and peer receive window allow one more packet in flight - client stream is not
+        read meanwhile, so client is slowed down instead of send buffer overload
+        :returns: False if serving was stopped while waiting"""
+
+        while len(self.sent_buf) >= self.congestion.window or \
+                (self.peer_window is not None and self.sent_seq >= self.peer_window):
+            if not self.sync.is_set():
+                return False
+
+            self.window_open.clear()
+            try:
+                await asyncio.wait_for(self.window_open.wait(), self.tuning.tcp_timeout)
+            except TimeoutError:
+                continue
+
+        return True
+
     async def serve_wrapped(self) -> None:
         await self.on_serve()
 
@@ -324,24 +1073,57 @@ class DatagramOuija:
 
             idx = 0
             while idx < len(data):
+                if not await self.wait_window():
+                    break
+                await self.wait_pacing()
+
                 c_len = randrange(self.tuning.udp_min_payload, self.tuning.udp_max_payload + 1)
+                # payloads are compressed after split - they are decompressed in order, when written
+                payload = data[idx:idx + c_len]
 
                 data_packet = Packet(
                     phase=Phase.DATA,
                     ack=False,
                     seq=self.sent_seq,
-                    data=data[idx:idx + c_len],
+                    data=self.compressor.compress(data=payload) if self.compressor else payload,
                     drain=True if idx + c_len >= len(data) else False,
                 )
-                self.sent_buf[self.sent_seq] = Sent(data=self.packet_binary(packet=data_packet))
-                await self.send_packet(packet=data_packet)
+                binary = self.packet_binary(packet=data_packet)
+                # timer is armed before send - packet acknowledged while send is paced cancels it
+                sent = Sent(
+                    data=binary,
+                    timer=self.scheduler.schedule(
+                        delay=self.rtt.timeout(retries=1),
+                        callback=partial(self.retransmit, seq=self.sent_seq),
+                    ),
+                )
+                self.sent_buf[self.sent_seq] = sent
+                # packet is encrypted once - stored datagram is sent as is, unless ACK rides on it
+                piggyback = self.piggyback(size=len(data_packet.data))
+                if piggyback:
+                    await self.send_packets(packets=[*piggyback, data_packet])
+                else:
+                    await self.send(data=binary)
+                # pacing delay is neither RTT nor retransmission timeout
+                sent.timestamp = sent.resent = time.monotonic()
+                if self.fec_encoder:
+                    parity_packet = self.fec_encoder.add(
+                        seq=self.sent_seq,
+                        data=data_packet.data,
+                        drain=data_packet.drain,
+                    )
+                    if parity_packet:
+                        await self.send_packet(packet=parity_packet)
+                        self.telemetry.fec_parity()
+                    self.protect(seqs=range(
+                        parity_packet.seq,
+                        parity_packet.seq + parity_packet.parity,
+                    ) if parity_packet else [self.sent_seq])
                 self.sent_seq += 1
                 idx += c_len
 
-                if len(self.sent_buf) >= self.tuning.udp_capacity:
-                    raise BufOverloadError
-
         self.sync.clear()
+        self.wakeup.set()
 
     async def serve(self) -> None:
         """Serve TCP stream with timeout
@@ -374,6 +1156,8 @@ class DatagramOuija:
 
     async def close(self) -> None:
         self.sync.clear()
+        self.wakeup.set()
+        self.window_open.set()
 
         if not self.read_closed.is_set():
             try:
@@ -399,6 +1183,17 @@ class DatagramOuija:
             except Exception:
                 pass
 
+        if self.ack_timer:
+            self.ack_timer.cancel()
+            self.ack_timer = None
+        self.discard()
+
+        # consumer is kept until peer close is processed
+        self.inbox.clear()
+        if self.consumer and self.consumer is not asyncio.current_task():
+            self.consumer.cancel()
+        self.consumer = None
+
         if self.opened.is_set():
             self.opened.clear()
             self.telemetry.close()
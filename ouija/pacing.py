@@ -0,0 +1,56 @@
+import time
+from typing import Optional
+
+
+# Pacing rate is congestion window per smoothed RTT with headroom - more headroom in slow start, so pacing never
+# limits window growth
+SLOW_START_GAIN = 2.0
+GAIN = 1.25
+
+
+class TokenBucket:
+    """Token bucket rate limiter - tokens are bytes refilled at rate up to burst, datagram which finds bucket empty
+    borrows its tokens and waits until they are refilled, so waiting datagrams go out in order and evenly spaced"""
+
+    rate: Optional[float]
+    burst: float
+    tokens: float
+    timestamp: float
+
+    def __init__(self, *, rate: Optional[float], burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.timestamp = time.monotonic()
+
+    def reserve(self, *, size: int) -> float:
+        """Take tokens for datagram
+        :param size: datagram size, bytes
+        :returns: delay before datagram may be sent, seconds - 0.0 when rate is unlimited"""
+
+        if not self.rate:
+            return 0.0
+
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.timestamp) * self.rate)
+        self.timestamp = now
+        self.tokens -= size
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def delay(self) -> float:
+        """Delay of datagram if it was reserved now, tokens are not taken
+        :returns: delay, seconds - 0.0 when rate is unlimited"""
+
+        if not self.rate:
+            return 0.0
+
+        tokens = min(self.burst, self.tokens + (time.monotonic() - self.timestamp) * self.rate)
+        return -tokens / self.rate if tokens < 0 else 0.0
+
+    def refund(self, *, size: int) -> None:
+        """Return tokens of datagram which was not sent
+        :param size: datagram size, bytes
+        :returns: None"""
+
+        if self.rate:
+            self.tokens = min(self.burst, self.tokens + size)
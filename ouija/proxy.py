@@ -5,6 +5,10 @@ from typing import Optional, Union
 from .link import StreamLink, DatagramLink
 from .tuning import StreamTuning, DatagramTuning
 from .telemetry import Telemetry
+from .scheduler import Scheduler
+from .pacing import TokenBucket
+from .batch import create_datagram_endpoint
+from .data import CID_SIZE, Packet, Phase
 from .log import logger
 
 
@@ -15,7 +19,7 @@ class Proxy:
     tuning: Union[StreamTuning, DatagramTuning]
     proxy_host: str
     proxy_port: int
-    links: dict[Union[str, tuple[str, int]], Union[StreamLink, DatagramLink]]
+    links: dict[Union[str, tuple[str, int], bytes], Union[StreamLink, DatagramLink]]
 
     async def serve(self) -> None:
         """Proxy server entry point - should be overridden with protocol-based implementation
@@ -85,9 +89,11 @@ class StreamProxy(Proxy):
 
 
 class DatagramProxy(Proxy, asyncio.DatagramProtocol):
-    """UDP proxy server"""
+    """UDP proxy server - links are keyed by connection ID when connection IDs are on, by peer address otherwise"""
 
     transport: Optional[asyncio.DatagramTransport]
+    scheduler: Scheduler
+    limiter: TokenBucket
 
     def __init__(
             self,
@@ -103,16 +109,53 @@ class DatagramProxy(Proxy, asyncio.DatagramProtocol):
         self.proxy_host = proxy_host
         self.proxy_port = proxy_port
         self.links = dict()
+        self.scheduler = Scheduler()
+        self.limiter = TokenBucket(rate=tuning.udp_rate or None, burst=tuning.udp_burst * tuning.udp_max_payload)
 
     def connection_made(self, transport) -> None:
         self.transport = transport
 
-    async def datagram_received_async(self, *, data, addr) -> None:
-        link = self.links.get(addr, DatagramLink(telemetry=self.telemetry, tuning=self.tuning, proxy=self, addr=addr))
-        await link.process(data=data)
+    def accept(self, *, data: bytes, addr: tuple[str, int], cid: Optional[bytes]) -> Optional[DatagramLink]:
+        """Create link for valid open packet - datagrams of unknown peers are dropped, so link is allocated once per
+        connection, link is registered right away, so open retries are answered by the same link, decoded open packet
+        is passed to link, so it is not decrypted twice
+        :param data: datagram without connection ID
+        :param addr: peer address
+        :param cid: connection ID, None if connection IDs are off
+        :returns: DatagramLink or None if datagram is not a valid open packet"""
+
+        try:
+            packet = Packet.packet(data=data, cipher=self.tuning.cipher, entropy=self.tuning.entropy)
+        except Exception:
+            self.telemetry.processing_error()
+            return None
+
+        if packet.phase != Phase.OPEN or packet.ack:
+            return None
+        if packet.token != self.tuning.token:
+            self.telemetry.token_error()
+            return None
+
+        link = DatagramLink(telemetry=self.telemetry, tuning=self.tuning, proxy=self, addr=addr, cid=cid)
+        self.links[link.key] = link
+        self.telemetry.recv(data=data, entropy=self.tuning.entropy)
+        link.dispatch(packets=[packet])
+        return link
 
     def datagram_received(self, data, addr) -> None:
-        asyncio.create_task(self.datagram_received_async(data=data, addr=addr))
+        cid = None
+        if self.tuning.udp_cid:
+            cid, data = data[:CID_SIZE], data[CID_SIZE:]
+
+        link = self.links.get(cid or addr)
+        if link is None:
+            self.accept(data=data, addr=addr, cid=cid)
+            return
+
+        if link.addr != addr:
+            link.rebind(data=data, addr=addr)
+        else:
+            link.feed(data=data)
 
     def error_received(self, exc) -> None:  # pragma: no cover
         logger.error(exc)
@@ -122,5 +165,8 @@ class DatagramProxy(Proxy, asyncio.DatagramProtocol):
         logger.error(exc)
 
     async def serve(self) -> None:
-        loop = asyncio.get_event_loop()
-        await loop.create_datagram_endpoint(lambda: self, local_addr=(self.proxy_host, self.proxy_port))
+        if self.tuning.udp_batch:
+            await create_datagram_endpoint(protocol_factory=lambda: self, local_addr=(self.proxy_host, self.proxy_port))
+        else:
+            loop = asyncio.get_event_loop()
+            await loop.create_datagram_endpoint(lambda: self, local_addr=(self.proxy_host, self.proxy_port))
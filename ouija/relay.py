@@ -1,11 +1,14 @@
 import asyncio
 import os
-from typing import Union
+from typing import Optional, Union
 
 from .tuning import StreamTuning, DatagramTuning
 from .connector import StreamConnector, DatagramConnector
 from .telemetry import Telemetry
-from .data import Parser, SEPARATOR, HTTP_PORT, HTTPS_PORT, CONNECT
+from .scheduler import Scheduler
+from .pacing import TokenBucket
+from .batch import create_datagram_endpoint
+from .data import Parser, SEPARATOR, HTTP_PORT, HTTPS_PORT, CONNECT, CID_SIZE
 from .log import logger
 
 
@@ -133,8 +136,52 @@ class StreamRelay(Relay):
         await connector.serve()
 
 
-class DatagramRelay(Relay):
-    """UDP relay server"""
+class DatagramRelay(Relay, asyncio.DatagramProtocol):
+    """UDP relay server - with connection IDs all connectors share single UDP socket"""
+
+    transport: Optional[asyncio.DatagramTransport]
+    routes: dict[bytes, DatagramConnector]
+    scheduler: Scheduler
+    limiter: TokenBucket
+
+    def __init__(
+            self,
+            *,
+            telemetry: Telemetry,
+            tuning: DatagramTuning,
+            relay_host: str,
+            relay_port: int,
+            proxy_host: str,
+            proxy_port: int,
+    ) -> None:
+        super().__init__(
+            telemetry=telemetry,
+            tuning=tuning,
+            relay_host=relay_host,
+            relay_port=relay_port,
+            proxy_host=proxy_host,
+            proxy_port=proxy_port,
+        )
+        self.transport = None
+        self.routes = dict()
+        self.scheduler = Scheduler()
+        self.limiter = TokenBucket(rate=tuning.udp_rate or None, burst=tuning.udp_burst * tuning.udp_max_payload)
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data, addr) -> None:
+        connector = self.routes.get(data[:CID_SIZE])
+        if connector is not None:
+            connector.datagram_received(data[CID_SIZE:], addr)
+
+    def error_received(self, exc) -> None:  # pragma: no cover
+        logger.error(exc)
+
+    def connection_lost(self, exc) -> None:
+        for connector in list(self.routes.values()):
+            asyncio.create_task(connector.close())
+        logger.error(exc)
 
     async def request_handler(
             self,
@@ -158,3 +205,12 @@ class DatagramRelay(Relay):
             https=https,
         )
         await connector.serve()
+
+    async def serve(self) -> None:
+        remote_addr = (self.proxy_host, self.proxy_port)
+        if self.tuning.udp_cid and self.tuning.udp_batch:
+            await create_datagram_endpoint(protocol_factory=lambda: self, remote_addr=remote_addr)
+        elif self.tuning.udp_cid:
+            loop = asyncio.get_event_loop()
+            await loop.create_datagram_endpoint(lambda: self, remote_addr=remote_addr)
+        await super().serve()
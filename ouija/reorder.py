@@ -0,0 +1,130 @@
+from bisect import bisect_right
+from operator import itemgetter
+from typing import Iterator, Optional
+
+from .data import Received
+
+
+class ReorderBuffer:
+    """Seq-indexed ring buffer for packets received out of order - slot is seq modulo capacity, so packets are
+    stored, looked up and delivered in O(1) without sorting, window is capacity packets from next expected seq.
+    Buffered seqs are also kept as sorted ranges updated on put and pop, so selective ACK never scans the window"""
+
+    capacity: int
+    slots: list[Optional[Received]]
+    seqs: list[int]
+    count: int
+    spans: list[list[int]]
+
+    def __init__(self, *, capacity: int) -> None:
+        self.capacity = capacity
+        self.slots = [None] * capacity
+        self.seqs = [-1] * capacity
+        self.count = 0
+        self.spans = []
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, seq: int) -> bool:
+        return self.seqs[seq % self.capacity] == seq
+
+    def put(self, *, seq: int, received: Received) -> None:
+        """Store packet, caller should check that seq is within window - otherwise packet of the same slot is
+        overwritten
+        :param seq: packet seq
+        :param received: Received
+        :returns: None"""
+
+        idx = seq % self.capacity
+        if self.seqs[idx] == -1:
+            self.count += 1
+            self.occupy(seq=seq)
+        elif self.seqs[idx] != seq:
+            self.release(seq=self.seqs[idx])
+            self.occupy(seq=seq)
+        self.slots[idx] = received
+        self.seqs[idx] = seq
+
+    def get(self, *, seq: int) -> Optional[Received]:
+        """Look packet up without taking it out of buffer
+        :param seq: packet seq
+        :returns: Received or None if packet was not received yet"""
+
+        idx = seq % self.capacity
+        return self.slots[idx] if self.seqs[idx] == seq else None
+
+    def pop(self, *, seq: int) -> Optional[Received]:
+        """Take packet out of buffer
+        :param seq: packet seq
+        :returns: Received or None if packet was not received yet"""
+
+        idx = seq % self.capacity
+        if self.seqs[idx] != seq:
+            return None
+
+        received = self.slots[idx]
+        self.slots[idx] = None
+        self.seqs[idx] = -1
+        self.count -= 1
+        self.release(seq=seq)
+        return received
+
+    def occupy(self, *, seq: int) -> None:
+        """Add seq missing in buffer to ranges - range is extended or merged with the next one when adjacent
+        :param seq: packet seq
+        :returns: None"""
+
+        idx = bisect_right(self.spans, seq, key=itemgetter(0))
+        following = self.spans[idx] if idx < len(self.spans) else None
+        if idx and self.spans[idx - 1][1] == seq:
+            preceding = self.spans[idx - 1]
+            if following and following[0] == seq + 1:
+                preceding[1] = following[1]
+                del self.spans[idx]
+            else:
+                preceding[1] += 1
+        elif following and following[0] == seq + 1:
+            following[0] = seq
+        else:
+            self.spans.insert(idx, [seq, seq + 1])
+
+    def release(self, *, seq: int) -> None:
+        """Remove buffered seq from ranges - range is shrunk or split
+        :param seq: packet seq
+        :returns: None"""
+
+        idx = bisect_right(self.spans, seq, key=itemgetter(0)) - 1
+        span = self.spans[idx]
+        if span[1] - span[0] == 1:
+            del self.spans[idx]
+        elif span[0] == seq:
+            span[0] += 1
+        elif span[1] == seq + 1:
+            span[1] -= 1
+        else:
+            self.spans.insert(idx + 1, [seq + 1, span[1]])
+            span[1] = seq
+
+    def ranges(self, *, start: int, limit: int) -> list[list[int]]:
+        """Buffered seq ranges in ascending order
+        :param start: next expected seq - window start
+        :param limit: ranges at most
+        :returns: list of [start, end) ranges"""
+
+        ranges = []
+        for first, end in self.spans:
+            if end <= start:
+                continue
+            if len(ranges) == limit:
+                break
+            ranges.append([max(first, start), end])
+        return ranges
+
+    def keys(self, *, start: int) -> Iterator[int]:
+        """Buffered seqs in ascending order
+        :param start: next expected seq - window start
+        :returns: iterator of seqs"""
+
+        for first, end in self.ranges(start=start, limit=len(self.spans)):
+            yield from range(first, end)
@@ -0,0 +1,46 @@
+from typing import Optional
+
+
+class RTTEstimator:
+    """Round-trip time estimator - retransmission timeout is based on smoothed RTT and RTT variation (RFC 6298),
+    bounded by minimum and maximum"""
+
+    ALPHA = 0.125
+    BETA = 0.25
+    K = 4
+
+    srtt: Optional[float]
+    rttvar: Optional[float]
+    rto: float
+    minimum: float
+    maximum: float
+
+    def __init__(self, *, initial: float, minimum: float, maximum: float) -> None:
+        self.srtt = None
+        self.rttvar = None
+        self.minimum = minimum
+        self.maximum = maximum
+        self.rto = self.bound(value=initial)
+
+    def bound(self, *, value: float) -> float:
+        return min(max(value, self.minimum), self.maximum)
+
+    def sample(self, *, rtt: float) -> None:
+        """Update estimation with RTT sample - samples must come from packets sent once only (Karn's rule)
+        :param rtt: RTT sample, seconds
+        :returns: None"""
+
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+        self.rto = self.bound(value=self.srtt + self.K * self.rttvar)
+
+    def timeout(self, *, retries: int) -> float:
+        """Retransmission timeout with exponential backoff
+        :param retries: number of times packet was sent
+        :returns: timeout, seconds"""
+
+        return self.bound(value=self.rto * 2 ** (retries - 1))
@@ -0,0 +1,103 @@
+import asyncio
+import heapq
+import itertools
+from typing import Awaitable, Callable, Optional
+
+from .log import logger
+
+
+Callback = Callable[[], Awaitable[None]]
+
+
+class Timer:
+    """Scheduled callback handle - cancelled timer drops its callback, so heap entry keeps no connection alive"""
+
+    callback: Optional[Callback]
+
+    def __init__(self, *, callback: Callback) -> None:
+        self.callback = callback
+
+    def cancelled(self) -> bool:
+        return self.callback is None
+
+
+class Scheduler:
+    """Process-wide timer scheduler - deadlines of all connections are kept in single min-heap on event loop monotonic
+    clock and single timer is armed for the earliest one, so only due callbacks are fired and idle connections cost
+    nothing. Due callbacks run concurrently, so paced send of one connection does not delay others. Cancelled timers
+    are skipped when due and heap is compacted when most of it is cancelled"""
+
+    RESOLUTION = 0.001
+    # heap is rebuilt when cancelled timers are more than half of it, small heaps are never rebuilt
+    COMPACT = 64
+
+    heap: list[tuple[float, int, Timer]]
+    order: itertools.count
+    timer: Optional[asyncio.TimerHandle]
+    cancelled: int
+
+    def __init__(self) -> None:
+        self.heap = []
+        self.order = itertools.count()
+        self.timer = None
+        self.cancelled = 0
+
+    def __len__(self) -> int:
+        return len(self.heap) - self.cancelled
+
+    def schedule(self, *, delay: float, callback: Callback) -> Timer:
+        """Schedule callback
+        :param delay: delay, seconds
+        :param callback: coroutine function without arguments
+        :returns: Timer - handle to cancel callback"""
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + delay
+        timer = Timer(callback=callback)
+        # order breaks ties, so timers are never compared and equal deadlines are fired in FIFO order
+        heapq.heappush(self.heap, (deadline, next(self.order), timer))
+        if self.timer is None or deadline < self.timer.when():
+            self.arm(loop=loop)
+        return timer
+
+    def cancel(self, *, timer: Optional[Timer]) -> None:
+        """Cancel scheduled callback, cancelled or fired timer is ignored
+        :param timer: Timer
+        :returns: None"""
+
+        if timer is None or timer.cancelled():
+            return
+
+        timer.callback = None
+        self.cancelled += 1
+        if self.cancelled > self.COMPACT and self.cancelled * 2 > len(self.heap):
+            self.heap = [entry for entry in self.heap if not entry[2].cancelled()]
+            heapq.heapify(self.heap)
+            self.cancelled = 0
+
+    def arm(self, *, loop: asyncio.AbstractEventLoop) -> None:
+        if self.timer:
+            self.timer.cancel()
+        self.timer = loop.call_at(self.heap[0][0], self.fire) if self.heap else None
+
+    def fire(self) -> None:
+        loop = asyncio.get_running_loop()
+        # deadlines within resolution are fired together - loop may run timer slightly early
+        now = loop.time() + self.RESOLUTION
+        while self.heap and self.heap[0][0] <= now:
+            timer = heapq.heappop(self.heap)[2]
+            if timer.cancelled():
+                self.cancelled -= 1
+                continue
+            callback, timer.callback = timer.callback, None
+            asyncio.create_task(self.run(callback=callback))
+
+        self.timer = None
+        self.arm(loop=loop)
+
+    @staticmethod
+    async def run(*, callback: Callback) -> None:
+        try:
+            await callback()
+        except Exception as e:
+            logger.exception(e)
@@ -2,7 +2,7 @@ import asyncio
 import logging
 import sys
 
-from .cipher import FernetCipher
+from .cipher import CIPHERS
 from .entropy import SimpleEntropy
 from .tuning import StreamTuning, DatagramTuning
 from .telemetry import Telemetry
@@ -24,7 +24,8 @@ async def main_async() -> None:
         level=logging.DEBUG if config.debug else logging.ERROR,
     )
 
-    cipher = FernetCipher(key=config.cipher_key) if config.cipher_key else None
+    cipher = CIPHERS[config.cipher](key=config.cipher_key) if config.cipher_key else None
+    ciphers = [CIPHERS[name](key=config.cipher_key) for name in config.ciphers] if config.cipher_key else []
     entropy = SimpleEntropy(rate=config.entropy_rate) if config.entropy_rate else None
 
     match config.protocol:
@@ -32,17 +33,22 @@ async def main_async() -> None:
             relay_class, proxy_class = StreamRelay, StreamProxy
             tuning = StreamTuning(
                 cipher=cipher,
+                ciphers=ciphers,
+                compression=config.compression,
                 entropy=entropy,
                 token=config.token,
                 serving_timeout=config.serving_timeout,
                 tcp_buffer=config.tcp_buffer,
                 tcp_timeout=config.tcp_timeout,
                 message_timeout=config.message_timeout,
+                framing=config.framing,
             )
         case Protocol.UDP:
             relay_class, proxy_class = DatagramRelay, DatagramProxy
             tuning = DatagramTuning(
                 cipher=cipher,
+                ciphers=ciphers,
+                compression=config.compression,
                 entropy=entropy,
                 token=config.token,
                 serving_timeout=config.serving_timeout,
@@ -53,15 +59,31 @@ async def main_async() -> None:
                 udp_timeout=config.udp_timeout,
                 udp_retries=config.udp_retries,
                 udp_capacity=config.udp_capacity,
-                udp_resend_sleep=config.udp_resend_sleep,
+                codec=config.codec,
+                acknowledgement=config.acknowledgement,
+                bundling=config.bundling,
+                udp_ack_count=config.udp_ack_count,
+                udp_ack_delay=config.udp_ack_delay,
+                udp_min_timeout=config.udp_min_timeout,
+                udp_max_timeout=config.udp_max_timeout,
+                congestion=config.congestion,
+                udp_pacing=config.udp_pacing,
+                udp_rate=config.udp_rate,
+                udp_burst=config.udp_burst,
+                udp_pacing_delay=config.udp_pacing_delay,
+                udp_fec=config.udp_fec,
+                udp_cid=config.udp_cid,
+                udp_batch=config.udp_batch,
             )
         case _:     # pragma: no cover
             raise NotImplementedError
 
+    telemetry = Telemetry(entropy_sampling=config.entropy_sampling, entropy_budget=config.entropy_budget)
+
     match config.mode:
         case Mode.RELAY:
             server = relay_class(
-                telemetry=Telemetry(),
+                telemetry=telemetry,
                 tuning=tuning,
                 relay_host=config.relay_host,
                 relay_port=config.relay_port,
@@ -70,7 +92,7 @@ async def main_async() -> None:
             )
         case Mode.PROXY:
             server = proxy_class(
-                telemetry=Telemetry(),
+                telemetry=telemetry,
                 tuning=tuning,
                 proxy_host=config.proxy_host,
                 proxy_port=config.proxy_port,
@@ -1,7 +1,10 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import datetime
+import time
 from typing import Optional
 
+import numpy as np
+
 from .entropy import Entropy
 
 
@@ -26,6 +29,12 @@ class Telemetry:
     min_entropy: float = 0.0
     max_entropy: float = 0.0
     avg_entropy: float = 0.0
+    running_entropy: float = 0.0
+    entropy_histogram: np.ndarray = field(default_factory=lambda: np.zeros(256, dtype=np.int64))
+    entropy_sampling: int = 1
+    entropy_budget: int = 0
+    entropy_window: float = 0.0
+    entropy_window_bytes: int = 0
     processing_errors: int = 0
     token_errors: int = 0
     timeout_errors: int = 0
@@ -34,6 +43,27 @@ class Telemetry:
     resending_errors: int = 0
     send_buf_overloads: int = 0
     recv_buf_overloads: int = 0
+    acks_saved: int = 0
+    acks_piggybacked: int = 0
+    rtt_count: int = 0
+    rtt_sum: float = 0.0
+    min_rtt: float = 0.0
+    max_rtt: float = 0.0
+    avg_rtt: float = 0.0
+    retransmits: int = 0
+    fast_retransmits: int = 0
+    losses: int = 0
+    cwnd_count: int = 0
+    cwnd_sum: float = 0.0
+    min_cwnd: float = 0.0
+    max_cwnd: float = 0.0
+    avg_cwnd: float = 0.0
+    paced: int = 0
+    pacing_delay_sum: float = 0.0
+    avg_pacing_delay: float = 0.0
+    pacing_holds: int = 0
+    fec_parities: int = 0
+    fec_recovered: int = 0
 
     def __str__(self) -> str:
         return \
@@ -45,6 +75,15 @@ class Telemetry:
             f'\tmin|avg|max payload size: ' \
             f'{self.min_payload_size:,}|{self.avg_payload_size:,}|{self.max_payload_size:,}\n' \
             f'\tmin|avg|max entropy: {self.min_entropy:.4f}|{self.avg_entropy:.4f}|{self.max_entropy:.4f}\n' \
+            f'\trunning entropy: {self.running_entropy:.4f}\n' \
+            f'\tacks saved|piggybacked: {self.acks_saved:,}|{self.acks_piggybacked:,}\n' \
+            f'\tmin|avg|max rtt, ms: {self.min_rtt * 1000:.1f}|{self.avg_rtt * 1000:.1f}|{self.max_rtt * 1000:.1f}\n' \
+            f'\tretransmits|fast retransmits|losses: ' \
+            f'{self.retransmits:,}|{self.fast_retransmits:,}|{self.losses:,}\n' \
+            f'\tfec parities|recovered: {self.fec_parities:,}|{self.fec_recovered:,}\n' \
+            f'\tmin|avg|max cwnd: {self.min_cwnd:.1f}|{self.avg_cwnd:.1f}|{self.max_cwnd:.1f}\n' \
+            f'\tpaced|pacing holds: {self.paced:,}|{self.pacing_holds:,}\n' \
+            f'\tavg pacing delay, ms: {self.avg_pacing_delay * 1000:.1f}\n' \
             f'\ttoken errors: {self.token_errors:,}\n' \
             f'\tprocessing|resending errors: {self.processing_errors:,}|{self.resending_errors:,}\n' \
             f'\ttimeout|connection|serving errors: ' \
@@ -70,8 +109,9 @@ class Telemetry:
             self.max_payload_size = len(data)
         self.avg_payload_size = int(self.payload_sum / self.payload_count)
 
-        if entropy:
-            value = entropy.calculate(data=data)
+        if entropy and self.sample(data=data):
+            counts = entropy.histogram(data=data)
+            value = entropy.estimate(counts=counts)
             if value < self.min_entropy or self.min_entropy == 0.0:
                 self.min_entropy = value
             if value > self.max_entropy:
@@ -81,6 +121,28 @@ class Telemetry:
             self.entropy_sum += value
             self.avg_entropy = self.entropy_sum / self.entropy_count if self.entropy_count > 0 else 0.0
 
+            self.entropy_histogram += counts
+            self.running_entropy = entropy.estimate(counts=self.entropy_histogram)
+
+    def sample(self, *, data: bytes) -> bool:
+        """Entropy sampling - every Nth payload within byte budget per second
+        :param data: payload
+        :returns: True if payload should be sampled"""
+
+        if self.payload_count % self.entropy_sampling:
+            return False
+
+        if self.entropy_budget:
+            now = time.monotonic()
+            if now - self.entropy_window >= 1.0:
+                self.entropy_window = now
+                self.entropy_window_bytes = 0
+            if self.entropy_window_bytes + len(data) > self.entropy_budget:
+                return False
+            self.entropy_window_bytes += len(data)
+
+        return True
+
     def send(self, *, data: bytes, entropy: Optional[Entropy]) -> None:
         self.payloads_sent += 1
         self.bytes_sent += len(data)
@@ -114,3 +176,52 @@ class Telemetry:
 
     def recv_buf_overload(self) -> None:
         self.recv_buf_overloads += 1
+
+    def ack_saved(self, *, count: int) -> None:
+        self.acks_saved += count
+
+    def ack_piggybacked(self) -> None:
+        self.acks_piggybacked += 1
+
+    def rtt(self, *, rtt: float) -> None:
+        self.rtt_count += 1
+        self.rtt_sum += rtt
+
+        if rtt < self.min_rtt or self.min_rtt == 0.0:
+            self.min_rtt = rtt
+        if rtt > self.max_rtt:
+            self.max_rtt = rtt
+        self.avg_rtt = self.rtt_sum / self.rtt_count
+
+    def retransmit(self) -> None:
+        self.retransmits += 1
+
+    def fast_retransmit(self) -> None:
+        self.fast_retransmits += 1
+
+    def loss(self) -> None:
+        self.losses += 1
+
+    def cwnd(self, *, cwnd: float) -> None:
+        self.cwnd_count += 1
+        self.cwnd_sum += cwnd
+
+        if cwnd < self.min_cwnd or self.min_cwnd == 0.0:
+            self.min_cwnd = cwnd
+        if cwnd > self.max_cwnd:
+            self.max_cwnd = cwnd
+        self.avg_cwnd = self.cwnd_sum / self.cwnd_count
+
+    def pace(self, *, delay: float) -> None:
+        self.paced += 1
+        self.pacing_delay_sum += delay
+        self.avg_pacing_delay = self.pacing_delay_sum / self.paced
+
+    def pacing_hold(self) -> None:
+        self.pacing_holds += 1
+
+    def fec_parity(self) -> None:
+        self.fec_parities += 1
+
+    def fec_recover(self) -> None:
+        self.fec_recovered += 1
@@ -1,7 +1,11 @@
-from dataclasses import dataclass
+import warnings
+from dataclasses import dataclass, field
 from typing import Optional
 
 from .cipher import Cipher
+from .compression import Compression
+from .congestion import Congestion
+from .data import Framing, Codec, Acknowledgement, Bundling
 from .entropy import Entropy
 
 
@@ -16,6 +20,9 @@ class StreamTuning:
     tcp_buffer: int
     tcp_timeout: float
     message_timeout: float
+    framing: Framing = Framing.LENGTH
+    ciphers: list[Cipher] = field(default_factory=list)
+    compression: Compression = Compression.NONE
 
 
 @dataclass(kw_only=True)
@@ -33,4 +40,26 @@ class DatagramTuning:
     udp_timeout: float
     udp_retries: int
     udp_capacity: int
-    udp_resend_sleep: float
+    # deprecated - retransmissions are fired by scheduler when due
+    udp_resend_sleep: Optional[float] = None
+    codec: Codec = Codec.BINARY
+    ciphers: list[Cipher] = field(default_factory=list)
+    compression: Compression = Compression.NONE
+    acknowledgement: Acknowledgement = Acknowledgement.SELECTIVE
+    bundling: Bundling = Bundling.BUNDLE
+    udp_ack_count: int = 2
+    udp_ack_delay: float = 0.01
+    udp_min_timeout: float = 0.05
+    udp_max_timeout: float = 10.0
+    congestion: Congestion = Congestion.RENO
+    udp_pacing: bool = True
+    udp_rate: int = 0
+    udp_burst: int = 10
+    udp_pacing_delay: float = 0.25
+    udp_fec: int = 0
+    udp_cid: bool = False
+    udp_batch: bool = False
+
+    def __post_init__(self) -> None:
+        if self.udp_resend_sleep is not None:
+            warnings.warn('udp_resend_sleep is deprecated and ignored', DeprecationWarning, stacklevel=3)
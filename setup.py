@@ -36,6 +36,7 @@ setup(
     keywords='asyncio http https tcp udp proxy tunnel relay network encrypted cipher security censorship entropy',
     packages=['ouija'],
     install_requires=['cryptography>=41.0.2', 'pbjson>=1.18.0', 'numpy>=1.25.2'],
+    extras_require={'zstd': ['zstandard>=0.21.0']},
     entry_points={
         'console_scripts': [
             'ouija = ouija.server:main',
@@ -1,4 +1,6 @@
 import asyncio
+import os
+from collections import deque
 from typing import Optional
 from unittest.mock import AsyncMock
 
@@ -6,7 +8,12 @@ import pytest
 
 from ouija import Telemetry, StreamTuning, DatagramTuning, StreamOuija, DatagramOuija, StreamConnector, \
     DatagramConnector, StreamLink, DatagramLink, StreamRelay, DatagramRelay, StreamProxy, DatagramProxy, FernetCipher, \
-    SimpleEntropy
+    SimpleEntropy, Framing, Codec, Acknowledgement, Bundling
+from ouija.rtt import RTTEstimator
+from ouija.scheduler import Scheduler
+from ouija.reorder import ReorderBuffer
+from ouija.congestion import CONGESTIONS
+from ouija.pacing import TokenBucket
 
 
 @pytest.fixture
@@ -61,7 +68,6 @@ def datagram_tuning_test(cipher_test, entropy_test, token_test):
         udp_timeout=0.5,
         udp_retries=5,
         udp_capacity=10,
-        udp_resend_sleep=0.1,
     )
 
 
@@ -85,6 +91,10 @@ class StreamOuijaTest(StreamOuija):
         self.target_writer = AsyncMock()
         self.opened = asyncio.Event()
         self.sync = asyncio.Event()
+        self.framing = Framing.SEPARATOR
+        self.cipher = tuning.cipher
+        self.salt = os.urandom(16)
+        self.compressor = None
 
 
 @pytest.fixture
@@ -116,10 +126,38 @@ class DatagramOuijaTest(DatagramOuija):
         self.sync = asyncio.Event()
         self.sent_buf = dict()
         self.sent_seq = 0
+        self.sent_ack = 0
+        self.acked_high = 0
         self.read_closed = asyncio.Event()
-        self.recv_buf = dict()
+        self.recv_buf = ReorderBuffer(capacity=tuning.udp_capacity)
         self.recv_seq = 0
         self.write_closed = asyncio.Event()
+        self.codec = Codec.JSON
+        self.acknowledgement = Acknowledgement.SINGLE
+        self.bundling = Bundling.NONE
+        self.ack_pending = 0
+        self.ack_timer = None
+        self.rtt = RTTEstimator(
+            initial=tuning.udp_timeout,
+            minimum=tuning.udp_min_timeout,
+            maximum=tuning.udp_max_timeout,
+        )
+        self.scheduler = Scheduler()
+        self.wakeup = asyncio.Event()
+        self.congestion = CONGESTIONS[tuning.congestion](maximum=tuning.udp_capacity)
+        self.window_open = asyncio.Event()
+        self.peer_window = None
+        self.pacer = TokenBucket(rate=None, burst=tuning.udp_burst * tuning.udp_max_payload)
+        self.limiter = TokenBucket(rate=None, burst=tuning.udp_burst * tuning.udp_max_payload)
+        self.fec_encoder = None
+        self.fec_decoder = None
+        self.inbox = deque()
+        self.inbox_ready = asyncio.Event()
+        self.consumer = None
+        self.closer = None
+        self.cipher = tuning.cipher
+        self.salt = os.urandom(16)
+        self.compressor = None
 
 
 @pytest.fixture
@@ -251,8 +289,7 @@ def config_dict_test():
         'udp_max_payload': 1024,
         'udp_timeout': 2.0,
         'udp_retries': 5,
-        'udp_capacity': 1000,
-        'udp_resend_sleep': 0.25
+        'udp_capacity': 1000
     }
 
 
@@ -317,8 +354,7 @@ def config_datagram_relay_dict_test():
         'udp_max_payload': 1024,
         'udp_timeout': 2.0,
         'udp_retries': 5,
-        'udp_capacity': 1000,
-        'udp_resend_sleep': 0.25
+        'udp_capacity': 1000
     }
 
 
@@ -341,6 +377,5 @@ def config_datagram_proxy_dict_test():
         'udp_max_payload': 1024,
         'udp_timeout': 2.0,
         'udp_retries': 5,
-        'udp_capacity': 1000,
-        'udp_resend_sleep': 0.25
+        'udp_capacity': 1000
     }
@@ -0,0 +1,225 @@
+import asyncio
+import errno
+import socket
+import struct
+from collections import deque
+from unittest.mock import Mock
+
+import pytest
+from pytest_mock import MockerFixture
+
+from ouija import batch
+from ouija.batch import create_datagram_endpoint, address, sockaddr, LoopSender, MmsgSender
+
+
+class ProtocolTest(asyncio.DatagramProtocol):
+    def __init__(self) -> None:
+        self.transport = None
+        self.datagrams = []
+        self.errors = []
+        self.lost = False
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data, addr) -> None:
+        self.datagrams.append((data, addr))
+
+    def error_received(self, exc) -> None:
+        self.errors.append(exc)
+
+    def connection_lost(self, exc) -> None:
+        self.lost = True
+
+
+async def roundtrip() -> None:
+    server, server_protocol = await create_datagram_endpoint(
+        protocol_factory=ProtocolTest,
+        local_addr=('127.0.0.1', 0),
+    )
+    port = server.get_extra_info('sockname')[1]
+    client, client_protocol = await create_datagram_endpoint(
+        protocol_factory=ProtocolTest,
+        remote_addr=('127.0.0.1', port),
+    )
+
+    for idx in range(batch.BATCH + 5):
+        client.sendto(b'%d' % idx)
+    await asyncio.sleep(0.1)
+
+    assert client_protocol.transport is client
+    assert [data for data, _ in server_protocol.datagrams] == [b'%d' % idx for idx in range(batch.BATCH + 5)]
+    addr = server_protocol.datagrams[0][1]
+    assert addr == client.get_extra_info('sockname')
+
+    server.sendto(b'reply', addr)
+    await asyncio.sleep(0.1)
+
+    assert client_protocol.datagrams == [(b'reply', ('127.0.0.1', port))]
+
+    server.close()
+    client.close()
+    await asyncio.sleep(0)
+
+    assert server.is_closing()
+    assert server_protocol.lost
+    assert client_protocol.lost
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(batch.recvmmsg is None, reason='recvmmsg is not available')
+async def test_create_datagram_endpoint_mmsg():
+    await roundtrip()
+
+
+@pytest.mark.asyncio
+async def test_create_datagram_endpoint_loop(mocker: MockerFixture):
+    mocker.patch('ouija.batch.recvmmsg', None)
+    mocker.patch('ouija.batch.sendmmsg', None)
+
+    await roundtrip()
+
+
+def test_address():
+    ipv4 = struct.pack('=H', socket.AF_INET) + struct.pack('!H', 443) + socket.inet_pton(socket.AF_INET, '10.0.0.1')
+    ipv6 = struct.pack('=H', socket.AF_INET6) + struct.pack('!HI', 443, 0) + \
+        socket.inet_pton(socket.AF_INET6, '::1') + struct.pack('=I', 0)
+
+    assert address(name=ipv4 + b'\x00' * 8) == ('10.0.0.1', 443)
+    assert address(name=ipv6) == ('::1', 443, 0, 0)
+
+
+def test_sockaddr():
+    for addr, family in ((('10.0.0.1', 443), socket.AF_INET), (('::1', 443, 0, 0), socket.AF_INET6)):
+        assert address(name=sockaddr(addr=addr, family=family)) == addr
+
+    # names are left to sendto
+    assert sockaddr(addr=('localhost', 443), family=socket.AF_INET) is None
+    assert sockaddr(addr=('::1', 443, 0, 0), family=socket.AF_INET) is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(batch.sendmmsg is None, reason='sendmmsg is not available')
+async def test_mmsg_sender():
+    server, server_protocol = await create_datagram_endpoint(
+        protocol_factory=ProtocolTest,
+        local_addr=('127.0.0.1', 0),
+    )
+    port = server.get_extra_info('sockname')[1]
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setblocking(False)
+    sender = MmsgSender(batch=2, size=batch.SIZE)
+    queue = deque([
+        (b'0', ('127.0.0.1', port)),
+        (bytearray(b'1'), ('127.0.0.1', port)),
+        (b'2', ('127.0.0.1', port)),
+    ])
+
+    # batch is sent with single system call
+    assert sender.send(sock=sock, queue=queue) == 2
+    queue.popleft()
+    queue.popleft()
+    queue.appendleft((b'3', ('localhost', port)))
+    # address to be resolved is sent alone with sendto, batch is stopped before it
+    assert sender.send(sock=sock, queue=queue) == 1
+    queue.popleft()
+    assert sender.send(sock=sock, queue=queue) == 1
+    sock.connect(('127.0.0.1', port))
+    # peer address is cleared for connected socket
+    assert sender.send(sock=sock, queue=deque([(b'4', None)])) == 1
+    await asyncio.sleep(0.1)
+
+    assert sorted(data for data, _ in server_protocol.datagrams) == [b'0', b'1', b'2', b'3', b'4']
+
+    sock.close()
+    server.close()
+    await asyncio.sleep(0)
+
+
+def test_mmsg_sender_error(mocker: MockerFixture):
+    mocker.patch('ouija.batch.sendmmsg', Mock(return_value=-1))
+    get_errno = mocker.patch('ouija.batch.ctypes.get_errno')
+    sock = Mock()
+    sock.family = socket.AF_INET
+    sock.fileno.return_value = 0
+    sender = MmsgSender(batch=2, size=batch.SIZE)
+    queue = deque([(b'data', None)])
+
+    for code, exception in (
+            (errno.EAGAIN, BlockingIOError),
+            (errno.EINTR, InterruptedError),
+            (errno.EMSGSIZE, OSError),
+    ):
+        get_errno.return_value = code
+        with pytest.raises(exception):
+            sender.send(sock=sock, queue=queue)
+
+
+def test_loop_sender():
+    sock = Mock()
+
+    assert LoopSender().send(sock=sock, queue=deque([(b'data', None), (b'data', None)])) == 1
+    sock.send.assert_called_once_with(b'data')
+    assert LoopSender().send(sock=sock, queue=deque([(b'data', ('127.0.0.1', 9))])) == 1
+    sock.sendto.assert_called_once_with(b'data', ('127.0.0.1', 9))
+
+
+@pytest.mark.asyncio
+async def test_batched_datagram_transport_flush_blocking():
+    transport, protocol = await create_datagram_endpoint(
+        protocol_factory=ProtocolTest,
+        remote_addr=('127.0.0.1', 9),
+    )
+    sender = transport.sender
+    transport.sender = Mock()
+    transport.sender.send.side_effect = BlockingIOError()
+
+    transport.sendto(b'data')
+    transport.sendto(b'data', ('127.0.0.2', 9))
+    await asyncio.sleep(0)
+
+    # datagrams are kept until socket is writable, bytes are counted, connected socket ignores address
+    assert transport.get_write_buffer_size() == 8
+    assert transport.flushing
+    assert list(transport.queue) == [(b'data', None), (b'data', None)]
+
+    transport.sender = Mock()
+    transport.sender.send.side_effect = [1, 1]
+    transport.writable()
+
+    assert transport.get_write_buffer_size() == 0
+    assert not transport.flushing
+
+    transport.sender = sender
+    transport.sendto(b'data')
+    transport.close()
+    await asyncio.sleep(0)
+
+    assert transport.get_write_buffer_size() == 0
+    transport.sendto(b'data')
+    assert transport.get_write_buffer_size() == 0
+
+
+@pytest.mark.asyncio
+async def test_batched_datagram_transport_error():
+    transport, protocol = await create_datagram_endpoint(
+        protocol_factory=ProtocolTest,
+        local_addr=('127.0.0.1', 0),
+    )
+    transport.receiver = Mock()
+    transport.receiver.recv.side_effect = OSError()
+    transport.sender = Mock()
+    transport.sender.send.side_effect = [OSError(), 1]
+
+    transport.readable()
+    transport.sendto(b'data', ('127.0.0.1', 9))
+    transport.sendto(b'data', ('127.0.0.1', 9))
+    await asyncio.sleep(0)
+
+    # failed datagram is dropped, the rest are sent
+    assert len(protocol.errors) == 2
+    assert transport.sender.send.call_count == 2
+    assert not transport.get_write_buffer_size()
+
+    transport.abort()
+    await asyncio.sleep(0)
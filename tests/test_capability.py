@@ -0,0 +1,58 @@
+from pytest_mock import MockerFixture
+
+from ouija import Framing, Codec, FernetCipher, Compression
+from ouija.capability import FRAMINGS, CODECS, supported, select, ciphers, select_cipher, session, \
+    compressions
+
+
+def test_supported():
+    assert supported(options=FRAMINGS, preferred=Framing.LENGTH) == [Framing.LENGTH, Framing.SEPARATOR]
+    assert supported(options=CODECS, preferred=Codec.JSON) == [Codec.JSON]
+
+
+def test_select():
+    assert select(offered=['LENGTH', 'SEPARATOR'], supported=['SEPARATOR'], default='SEPARATOR') == 'SEPARATOR'
+    assert select(offered=['UNKNOWN', 'BINARY', 'JSON'], supported=['BINARY', 'JSON'], default='JSON') == 'BINARY'
+
+
+def test_select_legacy():
+    assert select(offered=None, supported=['LENGTH', 'SEPARATOR'], default='SEPARATOR') == 'SEPARATOR'
+
+
+def test_compressions(mocker: MockerFixture):
+    assert compressions(preferred=Compression.ZLIB) == [Compression.ZLIB, Compression.NONE]
+    assert compressions(preferred=Compression.NONE) == [Compression.NONE]
+
+    mocker.patch('ouija.compression.zstandard', None)
+    assert compressions(preferred=Compression.ZSTD) == [Compression.ZLIB, Compression.NONE]
+
+
+def test_ciphers(stream_tuning_test):
+    alternative = FernetCipher(key='bdDmN4VexpDvTrs6gw8xTzaFvIBobFg1Cx2McFB1RmI=')
+    stream_tuning_test.ciphers = [alternative]
+
+    assert ciphers(tuning=stream_tuning_test) == {'FERNET': alternative}
+
+
+def test_select_cipher(stream_tuning_test):
+    assert select_cipher(offered=['UNKNOWN'], tuning=stream_tuning_test) is stream_tuning_test.cipher
+
+
+def test_select_cipher_none(stream_tuning_test):
+    stream_tuning_test.cipher = None
+
+    assert select_cipher(offered=['FERNET'], tuning=stream_tuning_test) is None
+    assert ciphers(tuning=stream_tuning_test) == dict()
+
+
+def test_session(cipher_test, data_test):
+    initiator = session(cipher=cipher_test, salt=b'a' * 16, peer_salt=b'b' * 16, initiator=True, implicit=True)
+    responder = session(cipher=cipher_test, salt=b'b' * 16, peer_salt=b'a' * 16, initiator=False, implicit=True)
+
+    assert initiator is not cipher_test
+    assert responder.decrypt(data=initiator.encrypt(data=data_test)) == data_test
+
+
+def test_session_legacy(cipher_test):
+    assert session(cipher=cipher_test, salt=b'a' * 16, peer_salt=None, initiator=True, implicit=True) is cipher_test
+    assert session(cipher=None, salt=b'a' * 16, peer_salt=b'b' * 16, initiator=True, implicit=True) is None
@@ -1,6 +1,10 @@
+import base64
+
 import pytest
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet, InvalidToken
 
-from ouija import Cipher
+from ouija import Cipher, AESGCMCipher, ChaCha20Poly1305Cipher
 
 
 @pytest.mark.xfail(raises=NotImplementedError)
@@ -15,8 +19,167 @@ def test_cipher_decrypt(data_test):
     cipher.decrypt(data=data_test)
 
 
+@pytest.mark.xfail(raises=NotImplementedError)
+def test_cipher_session():
+    cipher = Cipher()
+    cipher.session(salt=bytes(32), initiator=True, implicit=True)
+
+
 def test_fernet_cipher(cipher_test, data_test):
     encrypted = cipher_test.encrypt(data=data_test)
     decrypted = cipher_test.decrypt(data=encrypted)
 
     assert decrypted == data_test
+
+
+@pytest.mark.parametrize('data', (b'', b'x', b'x' * 16, b'x' * 1000))
+def test_fernet_cipher_compatible(cipher_test, data):
+    fernet = Fernet(cipher_test.key)
+
+    assert fernet.decrypt(base64.urlsafe_b64encode(cipher_test.encrypt(data=data))) == data
+    assert cipher_test.decrypt(data=base64.urlsafe_b64decode(fernet.encrypt(data))) == data
+
+
+@pytest.mark.xfail(raises=InvalidToken)
+def test_fernet_cipher_tampered(cipher_test, data_test):
+    encrypted = bytearray(cipher_test.encrypt(data=data_test))
+    encrypted[-1] ^= 1
+
+    cipher_test.decrypt(data=bytes(encrypted))
+
+
+@pytest.mark.xfail(raises=InvalidToken)
+def test_fernet_cipher_version(cipher_test, data_test):
+    encrypted = bytearray(cipher_test.encrypt(data=data_test))
+    encrypted[0] = 0x81
+
+    cipher_test.decrypt(data=bytes(encrypted))
+
+
+@pytest.mark.xfail(raises=InvalidToken)
+def test_fernet_cipher_short(cipher_test):
+    cipher_test.decrypt(data=b'\x80' * 32)
+
+
+@pytest.mark.parametrize('cipher_class', (AESGCMCipher, ChaCha20Poly1305Cipher))
+def test_aead_cipher(cipher_class, data_test):
+    cipher = cipher_class(key='bdDmN4VexpDvTrs6gw8xTzaFvIBobFg1Cx2McFB1RmI=')
+    peer = cipher_class(key='bdDmN4VexpDvTrs6gw8xTzaFvIBobFg1Cx2McFB1RmI=')
+
+    encrypted = cipher.encrypt(data=data_test)
+
+    assert len(encrypted) == cipher.NONCE_SIZE + len(data_test) + 16
+    assert peer.decrypt(data=encrypted) == data_test
+
+
+@pytest.mark.parametrize('cipher_class', (AESGCMCipher, ChaCha20Poly1305Cipher))
+def test_aead_cipher_nonce(cipher_class, data_test):
+    cipher = cipher_class(key='bdDmN4VexpDvTrs6gw8xTzaFvIBobFg1Cx2McFB1RmI=')
+
+    first = cipher.encrypt(data=data_test)
+    second = cipher.encrypt(data=data_test)
+
+    assert first[:cipher.NONCE_SIZE] != second[:cipher.NONCE_SIZE]
+    assert first[cipher.NONCE_SIZE:] != second[cipher.NONCE_SIZE:]
+
+
+def test_aead_cipher_nonce_wrap():
+    cipher = AESGCMCipher(key='bdDmN4VexpDvTrs6gw8xTzaFvIBobFg1Cx2McFB1RmI=')
+    prefix = cipher.prefix
+    cipher.counter = 2 ** 32
+
+    nonce = cipher.nonce()
+
+    assert nonce[:cipher.NONCE_PREFIX_SIZE] != prefix
+    assert nonce[cipher.NONCE_PREFIX_SIZE:] == bytes(cipher.NONCE_COUNTER_SIZE)
+
+
+@pytest.mark.xfail(raises=InvalidTag)
+def test_aead_cipher_tampered(data_test):
+    cipher = AESGCMCipher(key='bdDmN4VexpDvTrs6gw8xTzaFvIBobFg1Cx2McFB1RmI=')
+    encrypted = bytearray(cipher.encrypt(data=data_test))
+    encrypted[-1] ^= 1
+
+    cipher.decrypt(data=bytes(encrypted))
+
+
+@pytest.mark.xfail(raises=InvalidTag)
+def test_aead_cipher_algorithm_key(data_test):
+    encrypted = AESGCMCipher(key='bdDmN4VexpDvTrs6gw8xTzaFvIBobFg1Cx2McFB1RmI=').encrypt(data=data_test)
+
+    ChaCha20Poly1305Cipher(key='bdDmN4VexpDvTrs6gw8xTzaFvIBobFg1Cx2McFB1RmI=').decrypt(data=encrypted)
+
+
+def test_fernet_cipher_session(cipher_test, data_test):
+    initiator = cipher_test.session(salt=bytes(32), initiator=True, implicit=True)
+    responder = cipher_test.session(salt=bytes(32), initiator=False, implicit=True)
+
+    assert initiator.key != cipher_test.key
+    assert responder.decrypt(data=initiator.encrypt(data=data_test)) == data_test
+    assert initiator.decrypt(data=responder.encrypt(data=data_test)) == data_test
+
+
+@pytest.mark.parametrize('cipher_class', (AESGCMCipher, ChaCha20Poly1305Cipher))
+def test_aead_session_implicit(cipher_class, data_test):
+    cipher = cipher_class(key='bdDmN4VexpDvTrs6gw8xTzaFvIBobFg1Cx2McFB1RmI=')
+    initiator = cipher.session(salt=bytes(32), initiator=True, implicit=True)
+    responder = cipher.session(salt=bytes(32), initiator=False, implicit=True)
+
+    for _ in range(3):
+        encrypted = initiator.encrypt(data=data_test)
+        assert len(encrypted) == len(data_test) + 16
+        assert responder.decrypt(data=encrypted) == data_test
+        assert initiator.decrypt(data=responder.encrypt(data=data_test)) == data_test
+
+
+def test_aead_session_explicit(data_test):
+    cipher = AESGCMCipher(key='bdDmN4VexpDvTrs6gw8xTzaFvIBobFg1Cx2McFB1RmI=')
+    initiator = cipher.session(salt=bytes(32), initiator=True, implicit=False)
+    responder = cipher.session(salt=bytes(32), initiator=False, implicit=False)
+
+    encrypted = [initiator.encrypt(data=bytes([i]) + data_test) for i in range(3)]
+
+    assert len(encrypted[0]) == len(data_test) + 1 + initiator.COUNTER.size + 16
+    for i in (2, 0, 1, 0):
+        assert responder.decrypt(data=encrypted[i]) == bytes([i]) + data_test
+
+    # watermark is moved by counter above accepted ones only
+    assert responder.accepted() == 3
+    assert initiator.accepted() == 0
+
+
+def test_cipher_accepted(cipher_test):
+    assert cipher_test.accepted() is None
+    assert AESGCMCipher(key='bdDmN4VexpDvTrs6gw8xTzaFvIBobFg1Cx2McFB1RmI=').session(
+        salt=bytes(32),
+        initiator=True,
+        implicit=True,
+    ).accepted() is None
+
+
+@pytest.mark.xfail(raises=InvalidTag)
+def test_aead_session_salt(data_test):
+    cipher = AESGCMCipher(key='bdDmN4VexpDvTrs6gw8xTzaFvIBobFg1Cx2McFB1RmI=')
+    encrypted = cipher.session(salt=bytes(32), initiator=True, implicit=False).encrypt(data=data_test)
+
+    cipher.session(salt=b'\x01' * 32, initiator=False, implicit=False).decrypt(data=encrypted)
+
+
+@pytest.mark.xfail(raises=InvalidTag)
+def test_aead_session_direction(data_test):
+    cipher = AESGCMCipher(key='bdDmN4VexpDvTrs6gw8xTzaFvIBobFg1Cx2McFB1RmI=')
+    encrypted = cipher.session(salt=bytes(32), initiator=True, implicit=False).encrypt(data=data_test)
+
+    cipher.session(salt=bytes(32), initiator=True, implicit=False).decrypt(data=encrypted)
+
+
+@pytest.mark.xfail(raises=ValueError)
+def test_aead_session_exhausted(data_test):
+    session = AESGCMCipher(key='bdDmN4VexpDvTrs6gw8xTzaFvIBobFg1Cx2McFB1RmI=').session(
+        salt=bytes(32),
+        initiator=True,
+        implicit=False,
+    )
+    session.send_counter = 2 ** 32
+
+    session.encrypt(data=data_test)
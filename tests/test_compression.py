@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+from ouija import Compression, Compressor
+from ouija.compression import RAW, COMPRESSED, available
+
+
+def test_available():
+    assert available(compression=Compression.NONE)
+    assert available(compression=Compression.ZLIB)
+
+
+@pytest.mark.xfail(raises=ValueError)
+def test_compressor_none():
+    Compressor(compression=Compression.NONE)
+
+
+def test_compressor(data_test):
+    compressor = Compressor(compression=Compression.ZLIB)
+    peer = Compressor(compression=Compression.ZLIB)
+
+    for _ in range(3):
+        compressed = compressor.compress(data=data_test * 100)
+        assert compressed[0] == COMPRESSED
+        assert len(compressed) < len(data_test) * 100
+        assert peer.decompress(data=compressed) == data_test * 100
+
+
+@pytest.mark.skipif(not available(compression=Compression.ZSTD), reason='zstandard is not installed')
+def test_compressor_zstd(data_test):
+    compressor = Compressor(compression=Compression.ZSTD)
+    peer = Compressor(compression=Compression.ZSTD)
+
+    for _ in range(3):
+        assert peer.decompress(data=compressor.compress(data=data_test * 100)) == data_test * 100
+
+
+def test_compressor_incompressible(data_test):
+    compressor = Compressor(compression=Compression.ZLIB)
+    peer = Compressor(compression=Compression.ZLIB)
+    frames = [os.urandom(1024) for _ in range(8)] + [data_test * 100] * 8
+
+    flags = []
+    for frame in frames:
+        compressed = compressor.compress(data=frame)
+        flags.append(compressed[0])
+        assert peer.decompress(data=compressed) == frame
+
+    # probe, skip 1, probe, skip 2, probe, skip 4 - then compressible frames are probed and compressed again
+    assert flags[:8] == [COMPRESSED, RAW, COMPRESSED, RAW, RAW, COMPRESSED, RAW, RAW]
+    assert flags[-1] == COMPRESSED
+    assert compressor.backoff == 1
+
+
+@pytest.mark.xfail(raises=ValueError)
+def test_compressor_flag(data_test):
+    Compressor(compression=Compression.ZLIB).decompress(data=b'\x02' + data_test)
+
+
+def test_compressor_limit(data_test):
+    compressor = Compressor(compression=Compression.ZLIB)
+    peer = Compressor(compression=Compression.ZLIB, limit=len(data_test) * 100)
+
+    # frame of exactly limit size is accepted
+    assert peer.decompress(data=compressor.compress(data=data_test * 100)) == data_test * 100
+
+
+@pytest.mark.xfail(raises=ValueError)
+def test_compressor_limit_bomb():
+    compressor = Compressor(compression=Compression.ZLIB)
+    peer = Compressor(compression=Compression.ZLIB, limit=1024)
+
+    # small frame expands far above limit
+    peer.decompress(data=compressor.compress(data=bytes(2 ** 24)))
+
+
+@pytest.mark.skipif(not available(compression=Compression.ZSTD), reason='zstandard is not installed')
+@pytest.mark.xfail(raises=ValueError)
+def test_compressor_limit_bomb_zstd():
+    compressor = Compressor(compression=Compression.ZSTD)
+    peer = Compressor(compression=Compression.ZSTD, limit=1024)
+
+    peer.decompress(data=compressor.compress(data=bytes(2 ** 24)))
@@ -1,6 +1,9 @@
+import dataclasses
 import json
 
-from ouija import Config, Protocol, Mode
+import pytest
+
+from ouija import Config, Protocol, Mode, Framing, Codec, Compression, Acknowledgement, Bundling, Congestion
 
 
 def test_config(tmp_path, config_dict_test):
@@ -13,20 +16,55 @@ def test_config(tmp_path, config_dict_test):
     assert config.mode == Mode.RELAY
     assert config.debug == True
     assert config.monitor == True
+    assert config.entropy_sampling == 1
+    assert config.entropy_budget == 0
     assert config.relay_host == '127.0.0.1'
     assert config.relay_port == 9000
     assert config.proxy_host == '127.0.0.1'
     assert config.proxy_port == 50000
     assert config.cipher_key == 'bdDmN4VexpDvTrs6gw8xTzaFvIBobFg1Cx2McFB1RmI='
+    assert config.cipher == 'FERNET'
+    assert config.ciphers == []
+    assert config.compression == Compression.NONE
     assert config.entropy_rate == 5
     assert config.token == '395f249c-343a-4f92-9129-68c6d83b5f55'
     assert config.serving_timeout == 20.0
     assert config.tcp_buffer == 1024
     assert config.tcp_timeout == 1.0
     assert config.message_timeout == 5.0
+    assert config.framing == Framing.LENGTH
     assert config.udp_min_payload == 512
     assert config.udp_max_payload == 1024
     assert config.udp_timeout == 2.0
     assert config.udp_retries == 5
     assert config.udp_capacity == 1000
-    assert config.udp_resend_sleep == 0.25
+    assert config.codec == Codec.BINARY
+    assert config.acknowledgement == Acknowledgement.SELECTIVE
+    assert config.bundling == Bundling.BUNDLE
+    assert config.udp_ack_count == 2
+    assert config.udp_ack_delay == 0.01
+    assert config.udp_min_timeout == 0.05
+    assert config.udp_max_timeout == 10.0
+    assert config.congestion == Congestion.RENO
+    assert config.udp_pacing is True
+    assert config.udp_rate == 0
+    assert config.udp_burst == 10
+    assert config.udp_pacing_delay == 0.25
+    assert config.udp_fec == 0
+    assert config.udp_cid is False
+    assert config.udp_batch is False
+
+
+def test_config_udp_resend_sleep(tmp_path, config_dict_test):
+    path = tmp_path / 'config.json'
+    path.write_text(data=json.dumps({**config_dict_test, 'udp_resend_sleep': 0.25}))
+
+    with pytest.warns(FutureWarning):
+        config = Config(path=str(path))
+
+    assert not hasattr(config, 'udp_resend_sleep')
+
+
+def test_tuning_udp_resend_sleep(datagram_tuning_test):
+    with pytest.warns(DeprecationWarning):
+        dataclasses.replace(datagram_tuning_test, udp_resend_sleep=0.25)
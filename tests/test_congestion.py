@@ -0,0 +1,74 @@
+import pytest
+
+from ouija.congestion import CongestionControl, RenoControl, DelayControl
+
+
+@pytest.mark.xfail(raises=NotImplementedError)
+def test_congestion_control_ack():
+    CongestionControl(maximum=100).ack(acked=1, rtt=0.1)
+
+
+def test_congestion_control_loss():
+    congestion = RenoControl(maximum=100)
+
+    assert congestion.window == CongestionControl.INITIAL
+
+    assert congestion.loss(seq=0, sent_seq=10, timeout=False)
+    assert congestion.cwnd == 5.0
+    assert congestion.ssthresh == 5.0
+
+    # packets sent before reduction belong to the same congestion event
+    assert not congestion.loss(seq=9, sent_seq=12, timeout=True)
+    assert congestion.cwnd == 5.0
+
+    assert congestion.loss(seq=10, sent_seq=12, timeout=True)
+    assert congestion.cwnd == CongestionControl.MINIMUM
+    assert congestion.ssthresh == 2.5
+
+
+def test_congestion_control_bounds():
+    congestion = RenoControl(maximum=4)
+
+    assert congestion.window == 4
+
+    congestion.ack(acked=10, rtt=0.1)
+
+    assert congestion.window == 4
+
+
+def test_reno_control():
+    congestion = RenoControl(maximum=100)
+
+    congestion.ack(acked=4, rtt=0.1)
+
+    # slow start - window grows by acknowledged packets
+    assert congestion.cwnd == 14.0
+
+    congestion.loss(seq=0, sent_seq=20, timeout=False)
+    congestion.ack(acked=7, rtt=0.1)
+
+    # congestion avoidance - window grows by one packet per window
+    assert congestion.cwnd == 8.0
+
+
+def test_delay_control():
+    congestion = DelayControl(maximum=100)
+
+    congestion.ack(acked=2, rtt=0.1)
+
+    assert congestion.base_rtt == 0.1
+    assert congestion.cwnd == 12.0
+
+    congestion.ack(acked=2, rtt=None)
+
+    assert congestion.cwnd == 12.0
+
+    # RTT doubled - half of window is queued on path, window shrinks before loss
+    congestion.ack(acked=6, rtt=0.2)
+
+    assert congestion.cwnd == 11.5
+    assert congestion.ssthresh == 11.5
+
+    congestion.ack(acked=1, rtt=0.1)
+
+    assert congestion.cwnd == pytest.approx(11.5 + 1 / 11.5)
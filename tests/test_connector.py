@@ -4,7 +4,7 @@ from unittest.mock import Mock, AsyncMock
 import pytest
 from pytest_mock import MockerFixture
 
-from ouija import Packet, Phase, Message
+from ouija import Packet, Phase, Message, Framing, Codec
 from ouija.exception import OnOpenError, SendRetryError, OnServeError, TokenError
 
 
@@ -15,22 +15,12 @@ def test_datagram_connector_connection_made(datagram_connector_test):
     assert datagram_connector_test.transport == mock
 
 
-@pytest.mark.asyncio
-async def test_datagram_connector_datagram_received_async(datagram_connector_test, data_test):
-    datagram_connector_test.process = AsyncMock()
-
-    await datagram_connector_test.datagram_received_async(data=data_test, addr='127.0.0.1')
-
-    datagram_connector_test.process.assert_awaited()
-
-
-@pytest.mark.asyncio
-async def test_datagram_connector_datagram_received(datagram_connector_test, data_test):
-    datagram_connector_test.datagram_received_async = AsyncMock()
+def test_datagram_connector_datagram_received(datagram_connector_test, data_test):
+    datagram_connector_test.feed = Mock()
 
     datagram_connector_test.datagram_received(data_test, '127.0.0.1')
 
-    datagram_connector_test.datagram_received_async.assert_called()
+    datagram_connector_test.feed.assert_called_with(data=data_test)
 
 
 @pytest.mark.asyncio
@@ -42,15 +32,23 @@ async def test_datagram_connector_connection_lost(datagram_connector_test):
     datagram_connector_test.close.assert_called()
 
 
-@pytest.mark.asyncio
-async def test_datagram_connector_on_send(datagram_connector_test, data_test):
+def test_datagram_connector_on_send(datagram_connector_test, data_test):
     datagram_connector_test.transport = Mock()
 
-    await datagram_connector_test.on_send(data=data_test)
+    datagram_connector_test.on_send(data=data_test)
 
     datagram_connector_test.transport.sendto.assert_called()
 
 
+def test_datagram_connector_on_send_cid(datagram_connector_test, data_test):
+    datagram_connector_test.tuning.udp_cid = True
+    datagram_connector_test.transport = Mock()
+
+    datagram_connector_test.on_send(data=data_test)
+
+    datagram_connector_test.transport.sendto.assert_called_with(datagram_connector_test.cid + data_test)
+
+
 @pytest.mark.asyncio
 async def test_datagram_connector_on_open(datagram_connector_test, token_test):
     packet = Packet(
@@ -66,6 +64,38 @@ async def test_datagram_connector_on_open(datagram_connector_test, token_test):
     assert datagram_connector_test.opened.is_set()
 
 
+@pytest.mark.asyncio
+async def test_datagram_connector_on_open_caps(datagram_connector_test, token_test):
+    packet = Packet(
+        phase=Phase.OPEN,
+        ack=True,
+        token=token_test,
+        version=2,
+        caps={'codec': ['BINARY'], 'cipher': ['FERNET']},
+    )
+
+    await datagram_connector_test.on_open(packet=packet)
+
+    assert datagram_connector_test.codec == Codec.BINARY
+    assert datagram_connector_test.opened.is_set()
+
+
+@pytest.mark.asyncio
+async def test_datagram_connector_on_open_salt(datagram_connector_test, token_test):
+    packet = Packet(
+        phase=Phase.OPEN,
+        ack=True,
+        token=token_test,
+        version=2,
+        caps={'codec': ['BINARY'], 'cipher': ['FERNET']},
+        salt=b'\x00' * 16,
+    )
+
+    await datagram_connector_test.on_open(packet=packet)
+
+    assert datagram_connector_test.cipher is not datagram_connector_test.tuning.cipher
+
+
 @pytest.mark.asyncio
 @pytest.mark.xfail(raises=OnOpenError)
 async def test_datagram_connector_on_open_not_ack(datagram_connector_test, token_test):
@@ -100,6 +130,15 @@ async def test_datagram_connector_on_serve(datagram_connector_test, token_test):
     await datagram_connector_test.on_serve()
 
     datagram_connector_test.send_retry.assert_awaited()
+    packet = datagram_connector_test.send_retry.call_args.kwargs['packet']
+    assert packet.version == 2
+    assert packet.caps == {
+        'codec': ['BINARY', 'JSON'],
+        'ack': ['SELECTIVE', 'SINGLE'],
+        'bundle': ['BUNDLE', 'NONE'],
+        'cipher': ['FERNET'],
+    }
+    assert packet.salt == datagram_connector_test.salt
 
 
 @pytest.mark.asyncio
@@ -133,6 +172,36 @@ async def test_datagram_connector_on_close_closing(datagram_connector_test, toke
     datagram_connector_test.transport.close.assert_not_called()
 
 
+@pytest.mark.asyncio
+async def test_datagram_connector_on_serve_cid(datagram_connector_test, mocker: MockerFixture):
+    mocked_asyncio = mocker.patch('ouija.connector.asyncio')
+    mocked_loop = AsyncMock()
+    mocked_asyncio.get_event_loop = lambda: mocked_loop
+    datagram_connector_test.tuning.udp_cid = True
+    datagram_connector_test.relay.routes = dict()
+    datagram_connector_test.send_retry = AsyncMock()
+
+    await datagram_connector_test.on_serve()
+
+    # shared relay socket is used instead of own endpoint
+    mocked_loop.create_datagram_endpoint.assert_not_awaited()
+    assert datagram_connector_test.transport is datagram_connector_test.relay.transport
+    assert datagram_connector_test.relay.routes == {datagram_connector_test.cid: datagram_connector_test}
+
+
+@pytest.mark.asyncio
+async def test_datagram_connector_on_close_cid(datagram_connector_test):
+    datagram_connector_test.tuning.udp_cid = True
+    datagram_connector_test.transport = AsyncMock(spec=asyncio.DatagramTransport)
+    datagram_connector_test.transport.is_closing = lambda: False
+    datagram_connector_test.relay.routes = {datagram_connector_test.cid: datagram_connector_test}
+
+    await datagram_connector_test.on_close()
+
+    datagram_connector_test.transport.close.assert_not_called()
+    assert not datagram_connector_test.relay.routes
+
+
 @pytest.mark.asyncio
 async def test_stream_connector_on_serve(
         stream_connector_test,
@@ -154,6 +223,56 @@ async def test_stream_connector_on_serve(
     stream_connector_test.target_writer.drain.assert_awaited()
     stream_connector_test.writer.write.assert_called()
     stream_connector_test.writer.drain.assert_awaited()
+    assert stream_connector_test.framing == Framing.SEPARATOR
+
+
+@pytest.mark.asyncio
+async def test_stream_connector_on_serve_caps(stream_connector_test, token_test, mocker: MockerFixture):
+    mocked_open_connection = mocker.patch('ouija.connector.asyncio.open_connection')
+    mocked_open_connection.return_value = (AsyncMock(), AsyncMock())
+    mocked_wait_for = mocker.patch('ouija.connector.asyncio.wait_for')
+    mocked_wait_for.return_value = Message(
+        token=token_test,
+        version=2,
+        caps={'framing': ['LENGTH'], 'cipher': ['FERNET']},
+    ).binary(
+        cipher=stream_connector_test.tuning.cipher,
+        entropy=stream_connector_test.tuning.entropy,
+    )
+
+    await stream_connector_test.on_serve()
+
+    data, = stream_connector_test.target_writer.write.call_args.args
+    message = Message.message(
+        data=data,
+        cipher=stream_connector_test.tuning.cipher,
+        entropy=stream_connector_test.tuning.entropy,
+    )
+    assert message.version == 2
+    assert message.caps == {'framing': ['LENGTH', 'SEPARATOR'], 'cipher': ['FERNET']}
+    assert message.salt == stream_connector_test.salt
+    assert stream_connector_test.framing == Framing.LENGTH
+    assert stream_connector_test.cipher is stream_connector_test.tuning.cipher
+
+
+@pytest.mark.asyncio
+async def test_stream_connector_on_serve_salt(stream_connector_test, token_test, mocker: MockerFixture):
+    mocked_open_connection = mocker.patch('ouija.connector.asyncio.open_connection')
+    mocked_open_connection.return_value = (AsyncMock(), AsyncMock())
+    mocked_wait_for = mocker.patch('ouija.connector.asyncio.wait_for')
+    mocked_wait_for.return_value = Message(
+        token=token_test,
+        version=2,
+        caps={'framing': ['LENGTH'], 'cipher': ['FERNET']},
+        salt=b'\x00' * 16,
+    ).binary(
+        cipher=stream_connector_test.tuning.cipher,
+        entropy=stream_connector_test.tuning.entropy,
+    )
+
+    await stream_connector_test.on_serve()
+
+    assert stream_connector_test.cipher is not stream_connector_test.tuning.cipher
 
 
 @pytest.mark.asyncio
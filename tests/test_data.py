@@ -1,6 +1,9 @@
 import pytest
+from cryptography.fernet import Fernet
 
-from ouija import Parser, Packet, Phase, Message
+from ouija import Parser, Packet, Phase, Message, Framing, Codec, FernetCipher, Compression, Compressor
+from ouija.data import LENGTH, HEADER
+from ouija.exception import DecodeError
 
 
 def test_parser_connect():
@@ -35,22 +38,143 @@ def test_parser():
 @pytest.mark.parametrize('packet', (
     Packet(phase=Phase.OPEN, ack=False, token='secret', host='example.com', port=443),
     Packet(phase=Phase.OPEN, ack=True, token='secret'),
+    Packet(phase=Phase.OPEN, ack=False, token='secret', host='example.com', port=443, version=2, caps={'codec': []}),
+    Packet(phase=Phase.OPEN, ack=True, token='secret', version=2, caps={'codec': []}, salt=b'\x00' * 16),
     Packet(phase=Phase.DATA, ack=False, seq=0, data=b'test data 1', drain=False),
     Packet(phase=Phase.DATA, ack=False, seq=1, data=b'test data 2', drain=True),
     Packet(phase=Phase.DATA, ack=True, seq=0),
     Packet(phase=Phase.DATA, ack=True, seq=1),
+    Packet(phase=Phase.DATA, ack=True, seq=5, sack=[]),
+    Packet(phase=Phase.DATA, ack=True, seq=5, sack=[[7, 9], [12, 13]]),
+    Packet(phase=Phase.DATA, ack=True, seq=5, sack=[[7, 9]], window=1005),
+    Packet(phase=Phase.DATA, ack=False, seq=4, data=b'\x05\x00\x00parity', drain=False, parity=3),
     Packet(phase=Phase.CLOSE, ack=False),
     Packet(phase=Phase.CLOSE, ack=True),
 ))
-def test_packet(packet, cipher_test, entropy_test):
-    encoded = packet.binary(cipher=cipher_test, entropy=entropy_test)
+@pytest.mark.parametrize('codec', (Codec.JSON, Codec.BINARY))
+def test_packet(packet, codec, cipher_test, entropy_test):
+    encoded = packet.binary(cipher=cipher_test, entropy=entropy_test, codec=codec)
     decoded = Packet.packet(data=encoded, cipher=cipher_test, entropy=entropy_test)
 
     assert decoded == packet
 
 
+def test_packet_encode_binary(data_test):
+    packet = Packet(phase=Phase.DATA, ack=False, seq=7, data=data_test, drain=True)
+
+    encoded = packet.encode(codec=Codec.BINARY)
+
+    assert len(encoded) == HEADER.size + len(data_test)
+    assert encoded[HEADER.size:] == data_test
+    assert len(encoded) < len(packet.encode(codec=Codec.JSON))
+
+
+def test_packet_decode_binary_memoryview(data_test):
+    encoded = Packet(phase=Phase.DATA, ack=False, seq=7, data=data_test, drain=True).encode(codec=Codec.BINARY)
+
+    decoded = Packet.decode(data=encoded)
+
+    assert isinstance(decoded.data, memoryview)
+    assert decoded.data.obj is encoded
+    assert decoded.data == data_test
+
+
+def test_packet_bundle(data_test, cipher_test, entropy_test):
+    packets = [
+        Packet(phase=Phase.DATA, ack=True, seq=5, sack=[[7, 9]], window=1005),
+        Packet(phase=Phase.DATA, ack=False, seq=3, data=data_test, drain=True),
+        Packet(phase=Phase.CLOSE, ack=False),
+    ]
+
+    encoded = Packet.bundle(packets=packets, cipher=cipher_test, entropy=entropy_test)
+    decoded = Packet.packets(data=encoded, cipher=cipher_test, entropy=entropy_test)
+
+    assert decoded == packets
+    # legacy peer decodes the first packet only
+    assert Packet.packet(data=encoded, cipher=cipher_test, entropy=entropy_test) == packets[0]
+
+
+def test_packet_decode_all_truncated(data_test):
+    encoded = b''.join([
+        Packet(phase=Phase.DATA, ack=True, seq=5, sack=[[7, 9]], window=1005).encode(codec=Codec.BINARY),
+        Packet(phase=Phase.DATA, ack=False, seq=3, data=data_test, drain=True).encode(codec=Codec.BINARY),
+    ])
+
+    # payload, options and header cut short
+    for size in (len(encoded) - 1, HEADER.size + 2, HEADER.size - 1):
+        with pytest.raises(DecodeError):
+            Packet.decode_all(data=encoded[:size])
+
+
+def test_packet_decode_all_trailing(data_test):
+    encoded = Packet(phase=Phase.DATA, ack=False, seq=3, data=data_test, drain=True).encode(codec=Codec.BINARY)
+
+    with pytest.raises(DecodeError):
+        Packet.decode_all(data=encoded + b'\x00')
+    with pytest.raises(DecodeError):
+        Packet.decode_all(data=encoded + encoded[:HEADER.size])
+
+
+def test_packet_decode_all_json(data_test):
+    packet = Packet(phase=Phase.DATA, ack=False, seq=3, data=data_test, drain=True)
+
+    assert Packet.decode_all(data=packet.encode(codec=Codec.JSON)) == [packet]
+
+
+def test_packet_encode_binary_open():
+    packet = Packet(phase=Phase.OPEN, ack=False, token='secret', host='example.com', port=443)
+
+    assert packet.encode(codec=Codec.BINARY) == packet.encode(codec=Codec.JSON)
+
+
 def test_message_encrypt_decrypt(data_test, cipher_test, entropy_test):
     encrypted = Message.encrypt(data=data_test, cipher=cipher_test, entropy=entropy_test)
     decrypted = Message.decrypt(data=encrypted, cipher=cipher_test, entropy=entropy_test)
 
     assert decrypted == data_test
+
+
+def test_message_encrypt_decrypt_length(data_test, cipher_test, entropy_test):
+    encrypted = Message.encrypt(data=data_test, cipher=cipher_test, entropy=entropy_test, framing=Framing.LENGTH)
+    length, = LENGTH.unpack(encrypted[:LENGTH.size])
+    decrypted = Message.decrypt(
+        data=encrypted[LENGTH.size:],
+        cipher=cipher_test,
+        entropy=entropy_test,
+        framing=Framing.LENGTH,
+    )
+
+    assert length == len(encrypted) - LENGTH.size
+    assert decrypted == data_test
+
+
+def test_message_encrypt_decrypt_compressor(data_test, cipher_test, entropy_test):
+    compressor = Compressor(compression=Compression.ZLIB)
+    peer = Compressor(compression=Compression.ZLIB)
+
+    for _ in range(2):
+        encrypted = Message.encrypt(
+            data=data_test * 100,
+            cipher=cipher_test,
+            entropy=entropy_test,
+            framing=Framing.LENGTH,
+            compressor=compressor,
+        )
+        decrypted = Message.decrypt(
+            data=encrypted[LENGTH.size:],
+            cipher=cipher_test,
+            entropy=entropy_test,
+            framing=Framing.LENGTH,
+            compressor=peer,
+        )
+
+        assert len(encrypted) < len(data_test) * 100
+        assert decrypted == data_test * 100
+
+
+def test_packet_fallback(cipher_test, entropy_test):
+    packet = Packet(phase=Phase.OPEN, ack=True, token='secret')
+    encoded = packet.binary(cipher=cipher_test, entropy=entropy_test)
+    session = FernetCipher(key=Fernet.generate_key().decode())
+
+    assert Packet.packet(data=encoded, cipher=session, entropy=entropy_test, fallback=cipher_test) == packet
@@ -1,6 +1,9 @@
+import os
+
+import numpy as np
 import pytest
 
-from ouija import Entropy
+from ouija import Entropy, SimpleEntropy
 
 
 @pytest.mark.xfail(raises=NotImplementedError)
@@ -20,3 +23,50 @@ def test_simple_entropy(entropy_test, data_test):
     increased = entropy_test.increase(data=decreased)
 
     assert increased == data_test
+
+
+def reference_decrease(*, data: bytes, rate: int) -> bytes:
+    array = np.frombuffer(data, dtype='B')
+    values, counts = np.unique(array, return_counts=True)
+    array_dict = {counts[idx]: values[idx:idx + 1] for idx in range(len(values))}
+    filler = array_dict[max(array_dict)].tobytes()
+
+    decreased = b''
+    for idx in range(0, len(data), rate - 1):
+        decreased += data[idx:idx + rate - 1]
+        if len(data) - idx >= rate - 1:
+            decreased += filler
+
+    return decreased
+
+
+@pytest.mark.parametrize('rate', (2, 3, 5, 16))
+@pytest.mark.parametrize('data', (
+    b'a',
+    b'abcd',
+    b'abcdefgh',
+    b'aabbccdd' * 10,
+    os.urandom(1021),
+    os.urandom(4096),
+))
+def test_simple_entropy_reference(rate, data):
+    entropy = SimpleEntropy(rate=rate)
+
+    decreased = entropy.decrease(data=data)
+
+    assert decreased == reference_decrease(data=data, rate=rate)
+    assert entropy.increase(data=decreased) == data
+
+
+def test_simple_entropy_empty(entropy_test):
+    assert entropy_test.decrease(data=b'') == b''
+    assert entropy_test.increase(data=b'') == b''
+
+
+@pytest.mark.parametrize('data', (b'a', b'ab', b'aaab' * 30000, os.urandom(1000), os.urandom(100000)))
+def test_entropy_calculate(data):
+    array = np.frombuffer(data, dtype='B')
+    _, counts = np.unique(array, return_counts=True)
+    probs = counts / array.size
+
+    assert Entropy.calculate(data=data) == pytest.approx(-np.sum(probs * np.log2(probs)))
@@ -0,0 +1,110 @@
+from ouija.data import Phase
+from ouija.fec import FecEncoder, FecDecoder, PENDING_LIMIT
+
+
+def test_fec_encoder(data_test):
+    encoder = FecEncoder(group=3)
+
+    assert encoder.add(seq=5, data=data_test, drain=False) is None
+    assert encoder.add(seq=6, data=b'x', drain=False) is None
+    parity = encoder.add(seq=7, data=data_test, drain=False)
+
+    assert parity.phase == Phase.DATA
+    assert not parity.ack
+    assert parity.seq == 5
+    assert parity.parity == 3
+    assert len(parity.data) == 3 + len(data_test)
+    assert not encoder.count
+
+
+def test_fec_encoder_drain(data_test):
+    encoder = FecEncoder(group=3)
+
+    parity = encoder.add(seq=0, data=data_test, drain=True)
+
+    assert parity.seq == 0
+    assert parity.parity == 1
+
+
+def test_fec_decoder(data_test):
+    encoder = FecEncoder(group=3)
+    decoder = FecDecoder(capacity=10)
+    encoder.add(seq=0, data=data_test, drain=False)
+    encoder.add(seq=1, data=data_test, drain=False)
+    parity = encoder.add(seq=2, data=b'x', drain=True)
+    decoder.add(seq=0, data=data_test, drain=False)
+    decoder.add(seq=1, data=data_test, drain=False)
+
+    recovered = decoder.recover(parity=parity, base=2)
+
+    assert recovered.seq == 2
+    assert recovered.data == b'x'
+    assert recovered.drain
+
+
+def test_fec_decoder_complete(data_test):
+    encoder = FecEncoder(group=1)
+    decoder = FecDecoder(capacity=10)
+    parity = encoder.add(seq=0, data=data_test, drain=False)
+    decoder.add(seq=0, data=data_test, drain=False)
+
+    assert decoder.recover(parity=parity, base=1) is None
+    assert not decoder.pending
+
+
+def test_fec_decoder_delivered(data_test):
+    encoder = FecEncoder(group=2)
+    decoder = FecDecoder(capacity=2)
+    encoder.add(seq=0, data=data_test, drain=False)
+    parity = encoder.add(seq=1, data=data_test, drain=False)
+    decoder.add(seq=1, data=data_test, drain=False)
+
+    # packet 0 was delivered and evicted from history
+    assert decoder.recover(parity=parity, base=2) is None
+
+
+def test_fec_decoder_history(data_test):
+    encoder = FecEncoder(group=2)
+    decoder = FecDecoder(capacity=4)
+    for seq in range(100):
+        decoder.add(seq=seq, data=data_test, drain=False)
+    encoder.add(seq=98, data=data_test, drain=False)
+    parity = encoder.add(seq=99, data=data_test, drain=False)
+
+    # rolling history keeps latest packets only
+    assert len(decoder.history) == 4
+    assert 95 not in decoder.history
+    assert decoder.recover(parity=parity, base=98) is None
+
+
+def test_fec_decoder_pending(data_test):
+    encoder = FecEncoder(group=3)
+    decoder = FecDecoder(capacity=10)
+    encoder.add(seq=0, data=data_test, drain=False)
+    encoder.add(seq=1, data=b'x', drain=False)
+    parity = encoder.add(seq=2, data=data_test, drain=False)
+    decoder.add(seq=2, data=data_test, drain=False)
+
+    assert decoder.recover(parity=parity, base=0) is None
+    assert 0 in decoder.pending
+    assert decoder.retry(base=0) == []
+
+    decoder.add(seq=0, data=data_test, drain=False)
+    recovered = decoder.retry(base=1)
+
+    assert [(packet.seq, bytes(packet.data)) for packet in recovered] == [(1, b'x')]
+    assert not decoder.pending
+
+
+def test_fec_decoder_pending_limit(data_test):
+    encoder = FecEncoder(group=2)
+    decoder = FecDecoder(capacity=100)
+
+    for seq in range(0, PENDING_LIMIT * 2 + 2, 2):
+        encoder.add(seq=seq, data=data_test, drain=False)
+        decoder.recover(parity=encoder.add(seq=seq + 1, data=data_test, drain=False), base=0)
+
+    assert len(decoder.pending) == PENDING_LIMIT
+    assert 0 not in decoder.pending
+    assert decoder.retry(base=PENDING_LIMIT * 2 + 2) == []
+    assert not decoder.pending
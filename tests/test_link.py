@@ -1,19 +1,80 @@
-from unittest.mock import AsyncMock
+import asyncio
+from unittest.mock import AsyncMock, Mock
 
 import pytest
 from pytest_mock import MockerFixture
 
-from ouija import Packet, Phase, Message
+from ouija import Packet, Phase, Message, Framing, Codec, AESGCMCipher
 from ouija.exception import OnOpenError, OnServeError, TokenError
 
 
-@pytest.mark.asyncio
-async def test_datagram_link_on_send(datagram_link_test, data_test):
-    await datagram_link_test.on_send(data=data_test)
+def test_datagram_link_on_send(datagram_link_test, data_test):
+    datagram_link_test.on_send(data=data_test)
 
     datagram_link_test.proxy.transport.sendto.assert_called()
 
 
+def test_datagram_link_on_send_cid(datagram_link_test, data_test):
+    datagram_link_test.cid = b'\x01' * 8
+
+    datagram_link_test.on_send(data=data_test)
+
+    datagram_link_test.proxy.transport.sendto.assert_called_with(b'\x01' * 8 + data_test, datagram_link_test.addr)
+
+
+def test_datagram_link_rebind(datagram_link_test, data_test):
+    datagram_link_test.dispatch = Mock()
+    cipher = AESGCMCipher(key='bdDmN4VexpDvTrs6gw8xTzaFvIBobFg1Cx2McFB1RmI=')
+    datagram_link_test.cipher = cipher.session(salt=bytes(32), initiator=False, implicit=False)
+    peer = cipher.session(salt=bytes(32), initiator=True, implicit=False)
+    data = [
+        Packet(phase=Phase.DATA, ack=False, seq=seq, data=data_test, drain=True).binary(
+            cipher=peer,
+            entropy=datagram_link_test.tuning.entropy,
+        )
+        for seq in range(2)
+    ]
+    datagram_link_test.decode(data=data[1])
+
+    # datagram sent before the latest accepted one can not be told from replay
+    datagram_link_test.rebind(data=data[0], addr=('127.0.0.2', 60001))
+    datagram_link_test.rebind(data=data[1], addr=('127.0.0.2', 60001))
+
+    assert datagram_link_test.addr == ('127.0.0.1', 60000)
+    datagram_link_test.dispatch.assert_not_called()
+
+    packet = Packet(phase=Phase.DATA, ack=True, seq=0, sack=[])
+    datagram_link_test.rebind(
+        data=packet.binary(cipher=peer, entropy=datagram_link_test.tuning.entropy),
+        addr=('127.0.0.2', 60001),
+    )
+
+    assert datagram_link_test.addr == ('127.0.0.2', 60001)
+    datagram_link_test.dispatch.assert_called_once()
+
+
+def test_datagram_link_rebind_no_counter(datagram_link_test, data_test):
+    datagram_link_test.dispatch = Mock()
+    packet = Packet(phase=Phase.DATA, ack=False, seq=0, data=data_test, drain=True)
+    data = packet.binary(cipher=datagram_link_test.cipher, entropy=datagram_link_test.tuning.entropy)
+
+    datagram_link_test.rebind(data=data, addr=('127.0.0.2', 60001))
+
+    # Fernet has no explicit counter - link is never switched
+    assert datagram_link_test.addr == ('127.0.0.1', 60000)
+    datagram_link_test.dispatch.assert_not_called()
+
+
+def test_datagram_link_rebind_spoofed(datagram_link_test, data_test):
+    datagram_link_test.dispatch = Mock()
+
+    datagram_link_test.rebind(data=data_test, addr=('127.0.0.2', 60001))
+
+    assert datagram_link_test.addr == ('127.0.0.1', 60000)
+    datagram_link_test.dispatch.assert_not_called()
+    assert datagram_link_test.telemetry.processing_errors == 1
+
+
 @pytest.mark.asyncio
 async def test_datagram_link_on_open(datagram_link_test, token_test, mocker: MockerFixture):
     async def open_connection(*args, **kwargs):
@@ -38,10 +99,69 @@ async def test_datagram_link_on_open(datagram_link_test, token_test, mocker: Moc
     datagram_link_test.send_packet.assert_awaited()
 
 
+@pytest.mark.asyncio
+async def test_datagram_link_on_open_caps(datagram_link_test, token_test, mocker: MockerFixture):
+    async def open_connection(*args, **kwargs):
+        return AsyncMock(), AsyncMock()
+
+    mocked_asyncio = mocker.patch('ouija.link.asyncio')
+    mocked_asyncio.open_connection = open_connection
+    datagram_link_test.serve = AsyncMock()
+    datagram_link_test.send_packet = AsyncMock()
+    packet = Packet(
+        phase=Phase.OPEN,
+        ack=False,
+        token=token_test,
+        host='example.com',
+        port=443,
+        version=2,
+        caps={'codec': ['BINARY', 'JSON'], 'cipher': ['FERNET']},
+    )
+
+    await datagram_link_test.on_open(packet=packet)
+
+    ack_packet = datagram_link_test.send_packet.call_args.kwargs['packet']
+    assert ack_packet.version == 2
+    assert ack_packet.caps == {'codec': ['BINARY'], 'ack': ['SINGLE'], 'bundle': ['NONE'], 'cipher': ['FERNET']}
+    assert datagram_link_test.codec == Codec.BINARY
+
+
+@pytest.mark.asyncio
+async def test_datagram_link_on_open_salt(datagram_link_test, token_test, mocker: MockerFixture):
+    async def open_connection(*args, **kwargs):
+        return AsyncMock(), AsyncMock()
+
+    mocked_asyncio = mocker.patch('ouija.link.asyncio')
+    mocked_asyncio.open_connection = open_connection
+    datagram_link_test.serve = AsyncMock()
+    datagram_link_test.send_packet = AsyncMock()
+    packet = Packet(
+        phase=Phase.OPEN,
+        ack=False,
+        token=token_test,
+        host='example.com',
+        port=443,
+        version=2,
+        caps={'codec': ['BINARY', 'JSON'], 'cipher': ['FERNET']},
+        salt=b'\x00' * 16,
+    )
+
+    await datagram_link_test.on_open(packet=packet)
+    cipher = datagram_link_test.cipher
+    with pytest.raises(OnOpenError):
+        await datagram_link_test.on_open(packet=packet)
+
+    ack_packet = datagram_link_test.send_packet.call_args.kwargs['packet']
+    assert ack_packet.salt == datagram_link_test.salt
+    assert cipher is not datagram_link_test.tuning.cipher
+    assert datagram_link_test.cipher is cipher
+
+
 @pytest.mark.asyncio
 @pytest.mark.xfail(raises=OnOpenError)
 async def test_datagram_link_on_open_empty_remote(datagram_link_test, token_test):
     datagram_link_test.send_packet = AsyncMock()
+    datagram_link_test.close = AsyncMock()
     packet = Packet(
         phase=Phase.OPEN,
         ack=False,
@@ -53,6 +173,26 @@ async def test_datagram_link_on_open_empty_remote(datagram_link_test, token_test
     datagram_link_test.send_packet.assert_not_awaited()
 
 
+@pytest.mark.asyncio
+async def test_datagram_link_on_open_empty_remote_close(datagram_link_test, token_test):
+    datagram_link_test.send_retry = AsyncMock()
+    datagram_link_test.write_closed.set()
+    datagram_link_test.proxy.links = {datagram_link_test.key: datagram_link_test}
+    packet = Packet(
+        phase=Phase.OPEN,
+        ack=False,
+        token=token_test,
+    )
+
+    with pytest.raises(OnOpenError):
+        await datagram_link_test.on_open(packet=packet)
+    await asyncio.sleep(0)
+
+    # link registered on invalid open packet is closed and unregistered
+    assert not datagram_link_test.proxy.links
+    datagram_link_test.send_retry.assert_awaited()
+
+
 @pytest.mark.asyncio
 @pytest.mark.xfail(raises=OnOpenError)
 async def test_datagram_link_on_open_opened(datagram_link_test, token_test):
@@ -80,6 +220,16 @@ async def test_datagram_link_on_close(datagram_link_test, token_test):
     assert not datagram_link_test.proxy.links
 
 
+@pytest.mark.asyncio
+async def test_datagram_link_on_close_cid(datagram_link_test, token_test):
+    datagram_link_test.cid = b'\x01' * 8
+    datagram_link_test.proxy.links = {datagram_link_test.cid: datagram_link_test}
+
+    await datagram_link_test.on_close()
+
+    assert not datagram_link_test.proxy.links
+
+
 @pytest.mark.asyncio
 async def test_stream_link_on_serve(
         stream_link_test,
@@ -101,6 +251,74 @@ async def test_stream_link_on_serve(
     mocked_open_connection.assert_awaited()
     stream_link_test.writer.write.assert_called()
     stream_link_test.writer.drain.assert_awaited()
+    data, = stream_link_test.writer.write.call_args.args
+    message = Message.message(
+        data=data,
+        cipher=stream_link_test.tuning.cipher,
+        entropy=stream_link_test.tuning.entropy,
+    )
+    assert message.version is None
+    assert message.caps is None
+    assert stream_link_test.framing == Framing.SEPARATOR
+
+
+@pytest.mark.asyncio
+async def test_stream_link_on_serve_caps(stream_link_test, token_test, mocker: MockerFixture):
+    mocked_wait_for = mocker.patch('ouija.link.asyncio.wait_for')
+    mocked_wait_for.return_value = Message(
+        token=token_test,
+        host='example.com',
+        port=443,
+        version=2,
+        caps={'framing': ['LENGTH', 'SEPARATOR'], 'cipher': ['FERNET']},
+    ).binary(
+        cipher=stream_link_test.tuning.cipher,
+        entropy=stream_link_test.tuning.entropy,
+    )
+    mocked_open_connection = mocker.patch('ouija.link.asyncio.open_connection')
+    mocked_open_connection.return_value = (AsyncMock(), AsyncMock())
+
+    await stream_link_test.on_serve()
+
+    data, = stream_link_test.writer.write.call_args.args
+    message = Message.message(
+        data=data,
+        cipher=stream_link_test.tuning.cipher,
+        entropy=stream_link_test.tuning.entropy,
+    )
+    assert message.version == 2
+    assert message.caps == {'framing': ['LENGTH'], 'cipher': ['FERNET']}
+    assert message.salt is None
+
+
+@pytest.mark.asyncio
+async def test_stream_link_on_serve_salt(stream_link_test, token_test, mocker: MockerFixture):
+    mocked_wait_for = mocker.patch('ouija.link.asyncio.wait_for')
+    mocked_wait_for.return_value = Message(
+        token=token_test,
+        host='example.com',
+        port=443,
+        version=2,
+        caps={'framing': ['LENGTH', 'SEPARATOR'], 'cipher': ['FERNET']},
+        salt=b'\x00' * 16,
+    ).binary(
+        cipher=stream_link_test.tuning.cipher,
+        entropy=stream_link_test.tuning.entropy,
+    )
+    mocked_open_connection = mocker.patch('ouija.link.asyncio.open_connection')
+    mocked_open_connection.return_value = (AsyncMock(), AsyncMock())
+
+    await stream_link_test.on_serve()
+
+    data, = stream_link_test.writer.write.call_args.args
+    message = Message.message(
+        data=data,
+        cipher=stream_link_test.tuning.cipher,
+        entropy=stream_link_test.tuning.entropy,
+    )
+    assert message.salt == stream_link_test.salt
+    assert stream_link_test.cipher is not stream_link_test.tuning.cipher
+    assert stream_link_test.framing == Framing.LENGTH
 
 
 @pytest.mark.asyncio
@@ -1,26 +1,117 @@
 import asyncio
-from unittest.mock import AsyncMock
+import time
+from functools import partial
+from unittest.mock import AsyncMock, MagicMock, Mock
 
 import pytest
 
-from ouija import Packet, Phase
-from ouija.exception import SendRetryError, TokenError, OnOpenError, OnServeError, BufOverloadError
-from ouija.data import Sent, Message
+from ouija import Packet, Phase, Framing, Codec, AESGCMCipher, Compression, Compressor, Acknowledgement, Bundling, \
+    DatagramOuija
+from ouija.exception import SendRetryError, TokenError, OnOpenError, OnServeError, BufOverloadError, DecodeError
+from ouija.data import Sent, Received, Message, LENGTH, SACK_LIMIT, UDP_SIZE, HEADER, WINDOW, SACK_RANGE
+from ouija.reorder import ReorderBuffer
+from ouija.fec import FecEncoder, FecDecoder, PENDING_LIMIT
+from ouija.pacing import TokenBucket
+from ouija.congestion import RenoControl
 
 
-@pytest.mark.asyncio
 @pytest.mark.xfail(raises=NotImplementedError)
-async def test_datagram_ouija_on_send(datagram_ouija_test, data_test):
-    await datagram_ouija_test.on_send(data=data_test)
+def test_datagram_ouija_on_send(datagram_ouija_test, data_test):
+    datagram_ouija_test.on_send(data=data_test)
+
+
+@pytest.mark.xfail(raises=TypeError)
+def test_datagram_ouija_on_send_coroutine():
+    class DatagramOuijaAsync(DatagramOuija):
+        async def on_send(self, *, data: bytes) -> None:
+            pass
 
 
 @pytest.mark.asyncio
 async def test_datagram_ouija_send(datagram_ouija_test, data_test):
-    datagram_ouija_test.on_send = AsyncMock()
+    datagram_ouija_test.on_send = Mock()
+
+    await datagram_ouija_test.send(data=data_test)
+
+    datagram_ouija_test.on_send.assert_called_with(data=data_test)
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_send_paced(datagram_ouija_test, data_test):
+    datagram_ouija_test.on_send = Mock()
+    datagram_ouija_test.pacer = TokenBucket(rate=len(data_test) * 20, burst=len(data_test))
+
+    await datagram_ouija_test.send(data=data_test)
+    await datagram_ouija_test.send(data=data_test)
+
+    # second datagram waits for its tokens
+    assert datagram_ouija_test.on_send.call_count == 2
+    assert datagram_ouija_test.telemetry.paced == 1
+    assert datagram_ouija_test.telemetry.avg_pacing_delay == pytest.approx(0.05, abs=0.01)
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_send_pacing_delay(datagram_ouija_test, data_test):
+    datagram_ouija_test.on_send = Mock()
+    datagram_ouija_test.tuning.udp_pacing_delay = 0.01
+    datagram_ouija_test.limiter = TokenBucket(rate=len(data_test) * 10, burst=len(data_test))
 
     await datagram_ouija_test.send(data=data_test)
+    await datagram_ouija_test.send(data=data_test)
+
+    # datagram waiting longer than udp_pacing_delay is still sent - it may be control or buffered packet
+    assert datagram_ouija_test.on_send.call_count == 2
+    assert datagram_ouija_test.telemetry.avg_pacing_delay == pytest.approx(0.1, abs=0.02)
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_wait_pacing(datagram_ouija_test, data_test):
+    datagram_ouija_test.tuning.udp_pacing_delay = 0.05
+    datagram_ouija_test.limiter = TokenBucket(rate=len(data_test) * 10, burst=len(data_test))
+
+    await datagram_ouija_test.wait_pacing()
+    assert datagram_ouija_test.telemetry.pacing_holds == 0
+
+    datagram_ouija_test.limiter.reserve(size=len(data_test) * 2)
+    start = asyncio.get_running_loop().time()
+    await datagram_ouija_test.wait_pacing()
+
+    # backlog of 0.1 seconds is held until it is within udp_pacing_delay
+    assert asyncio.get_running_loop().time() - start == pytest.approx(0.05, abs=0.02)
+    assert datagram_ouija_test.telemetry.pacing_holds == 1
+
+
+def test_datagram_ouija_send_nowait(datagram_ouija_test, data_test):
+    datagram_ouija_test.on_send = Mock()
+    datagram_ouija_test.pacer = TokenBucket(rate=len(data_test) * 20, burst=len(data_test))
+
+    assert datagram_ouija_test.send_nowait(data=data_test)
+    assert not datagram_ouija_test.send_nowait(data=data_test)
+
+    # datagram which has to wait is not sent, its tokens are returned
+    datagram_ouija_test.on_send.assert_called_once_with(data=data_test)
+    assert datagram_ouija_test.pacer.tokens == pytest.approx(0.0, abs=1.0)
+
+
+def test_datagram_ouija_pace(datagram_ouija_test):
+    datagram_ouija_test.congestion = RenoControl(maximum=100)
+    datagram_ouija_test.pace()
+
+    assert datagram_ouija_test.pacer.rate is None
 
-    datagram_ouija_test.on_send.assert_awaited_with(data=data_test)
+    datagram_ouija_test.rtt.sample(rtt=0.1)
+    datagram_ouija_test.pace()
+
+    # slow start - rate is twice window per RTT
+    assert datagram_ouija_test.pacer.rate == pytest.approx(
+        2 * datagram_ouija_test.congestion.cwnd * datagram_ouija_test.tuning.udp_max_payload / 0.1
+    )
+
+    datagram_ouija_test.tuning.udp_pacing = False
+    datagram_ouija_test.pacer.rate = None
+    datagram_ouija_test.pace()
+
+    assert datagram_ouija_test.pacer.rate is None
 
 
 @pytest.mark.asyncio
@@ -58,6 +149,124 @@ async def test_datagram_ouija_send_retry_sendretryerror(datagram_ouija_test, dat
     assert not result
 
 
+def test_datagram_ouija_negotiate(datagram_ouija_test):
+    caps = datagram_ouija_test.negotiate(caps=datagram_ouija_test.capabilities())
+
+    assert datagram_ouija_test.codec == Codec.BINARY
+    assert caps == {'codec': ['BINARY'], 'ack': ['SELECTIVE'], 'bundle': ['BUNDLE'], 'cipher': ['FERNET']}
+
+
+def test_datagram_ouija_negotiate_legacy(datagram_ouija_test):
+    datagram_ouija_test.codec = Codec.BINARY
+
+    caps = datagram_ouija_test.negotiate(caps=None)
+
+    assert datagram_ouija_test.codec == Codec.JSON
+    assert datagram_ouija_test.cipher is datagram_ouija_test.tuning.cipher
+    assert caps == {'codec': ['JSON'], 'ack': ['SINGLE'], 'bundle': ['NONE'], 'cipher': ['FERNET']}
+
+
+def test_datagram_ouija_negotiate_bundling_json(datagram_ouija_test):
+    datagram_ouija_test.tuning.codec = Codec.JSON
+
+    caps = datagram_ouija_test.negotiate(caps={'codec': ['JSON'], 'bundle': ['BUNDLE', 'NONE']})
+
+    # JSON packets have no length, so they can not be bundled
+    assert caps['bundle'] == ['NONE']
+    assert datagram_ouija_test.bundling == Bundling.NONE
+
+
+def test_datagram_ouija_negotiate_fec(datagram_ouija_test):
+    datagram_ouija_test.tuning.udp_fec = 4
+
+    caps = datagram_ouija_test.negotiate(caps=datagram_ouija_test.capabilities())
+
+    assert caps['fec'] == ['XOR']
+    assert datagram_ouija_test.fec_encoder.group == 4
+    assert datagram_ouija_test.fec_decoder.history.capacity == datagram_ouija_test.tuning.udp_capacity
+
+
+def test_datagram_ouija_negotiate_fec_history(datagram_ouija_test):
+    datagram_ouija_test.tuning.udp_fec = 4
+    datagram_ouija_test.tuning.udp_capacity = 1000
+
+    datagram_ouija_test.negotiate(caps=datagram_ouija_test.capabilities())
+
+    assert datagram_ouija_test.fec_decoder.history.capacity == 4 * PENDING_LIMIT
+
+
+def test_datagram_ouija_negotiate_fec_legacy(datagram_ouija_test):
+    datagram_ouija_test.tuning.udp_fec = 4
+
+    caps = datagram_ouija_test.negotiate(caps=None)
+
+    assert 'fec' not in caps
+    assert datagram_ouija_test.fec_encoder is None
+    assert datagram_ouija_test.fec_decoder is None
+
+
+def test_datagram_ouija_negotiate_fec_disabled(datagram_ouija_test):
+    caps = datagram_ouija_test.negotiate(caps={'fec': ['XOR', 'NONE']})
+
+    assert 'fec' not in caps
+    assert 'fec' not in datagram_ouija_test.capabilities()
+    assert datagram_ouija_test.fec_encoder is None
+
+
+def test_datagram_ouija_negotiate_salt(datagram_ouija_test, data_test):
+    cipher = AESGCMCipher(key='bdDmN4VexpDvTrs6gw8xTzaFvIBobFg1Cx2McFB1RmI=')
+    datagram_ouija_test.tuning.cipher = cipher
+    peer_salt = b'\x00' * 16
+
+    datagram_ouija_test.negotiate(caps=datagram_ouija_test.capabilities(), salt=peer_salt)
+
+    peer = cipher.session(salt=peer_salt + datagram_ouija_test.salt, initiator=True, implicit=False)
+    assert datagram_ouija_test.cipher is not cipher
+    assert datagram_ouija_test.cipher.decrypt(data=peer.encrypt(data=data_test)) == data_test
+
+
+def test_datagram_ouija_negotiate_compression(datagram_ouija_test):
+    datagram_ouija_test.tuning.compression = Compression.ZLIB
+
+    caps = datagram_ouija_test.negotiate(caps={'compression': ['ZSTD', 'ZLIB', 'NONE']})
+
+    assert caps['compression'] == ['ZLIB']
+    assert datagram_ouija_test.compressor.compression == Compression.ZLIB
+    assert datagram_ouija_test.compressor.limit == UDP_SIZE
+    assert datagram_ouija_test.capabilities()['compression'][-1] == Compression.NONE
+
+
+def test_datagram_ouija_negotiate_compression_legacy(datagram_ouija_test):
+    datagram_ouija_test.tuning.compression = Compression.ZLIB
+
+    caps = datagram_ouija_test.negotiate(caps=None)
+
+    assert 'compression' not in caps
+    assert datagram_ouija_test.compressor is None
+
+
+def test_datagram_ouija_negotiate_preferred(datagram_ouija_test):
+    datagram_ouija_test.tuning.codec = Codec.JSON
+
+    datagram_ouija_test.negotiate(caps={'codec': ['BINARY', 'JSON']})
+
+    assert datagram_ouija_test.codec == Codec.JSON
+
+
+def test_datagram_ouija_packet_binary_open(datagram_ouija_test, token_test):
+    datagram_ouija_test.cipher = AsyncMock()
+    packet = Packet(phase=Phase.OPEN, ack=True, token=token_test)
+
+    data = datagram_ouija_test.packet_binary(packet=packet)
+
+    datagram_ouija_test.cipher.encrypt.assert_not_called()
+    assert Packet.packet(
+        data=data,
+        cipher=datagram_ouija_test.tuning.cipher,
+        entropy=datagram_ouija_test.tuning.entropy,
+    ) == packet
+
+
 @pytest.mark.asyncio
 @pytest.mark.xfail(raises=NotImplementedError)
 async def test_datagram_ouija_on_open(datagram_ouija_test, token_test):
@@ -131,9 +340,9 @@ async def test_datagram_ouija_process_wrapped_open_onopenerror(datagram_ouija_te
 
 
 @pytest.mark.asyncio
-async def test_datagram_ouija_process_wrapped_data_ack(datagram_ouija_test):
+async def test_datagram_ouija_process_wrapped_data_ack(datagram_ouija_test, data_test):
     datagram_ouija_test.opened.set()
-    datagram_ouija_test.sent_buf = AsyncMock()
+    datagram_ouija_test.sent_buf = {0: Sent(data=data_test)}
     packet = Packet(
         phase=Phase.DATA,
         ack=True,
@@ -145,7 +354,9 @@ async def test_datagram_ouija_process_wrapped_data_ack(datagram_ouija_test):
         entropy=datagram_ouija_test.tuning.entropy,
     ))
 
-    datagram_ouija_test.sent_buf.pop.assert_called()
+    assert not datagram_ouija_test.sent_buf
+    assert datagram_ouija_test.rtt.srtt is not None
+    assert datagram_ouija_test.telemetry.rtt_count == 1
 
 
 @pytest.mark.asyncio
@@ -170,6 +381,394 @@ async def test_datagram_ouija_process_wrapped_data(datagram_ouija_test, data_tes
     datagram_ouija_test.writer.drain.assert_awaited()
 
 
+@pytest.mark.asyncio
+async def test_datagram_ouija_process_wrapped_data_binary(datagram_ouija_test, data_test):
+    datagram_ouija_test.opened.set()
+    datagram_ouija_test.send_packet = AsyncMock()
+    packet = Packet(
+        phase=Phase.DATA,
+        ack=False,
+        seq=0,
+        data=data_test,
+        drain=True,
+    )
+
+    await datagram_ouija_test.process_wrapped(data=packet.binary(
+        cipher=datagram_ouija_test.tuning.cipher,
+        entropy=datagram_ouija_test.tuning.entropy,
+        codec=Codec.BINARY,
+    ))
+
+    data, = datagram_ouija_test.writer.write.call_args.args
+    assert isinstance(data, memoryview)
+    assert data == data_test
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_process_wrapped_data_compressor(datagram_ouija_test, data_test):
+    datagram_ouija_test.opened.set()
+    datagram_ouija_test.send_packet = AsyncMock()
+    datagram_ouija_test.compressor = Compressor(compression=Compression.ZLIB)
+    compressor = Compressor(compression=Compression.ZLIB)
+    packets = [
+        Packet(phase=Phase.DATA, ack=False, seq=seq, data=compressor.compress(data=data_test), drain=True)
+        for seq in range(2)
+    ]
+
+    for packet in reversed(packets):
+        await datagram_ouija_test.process_wrapped(data=packet.binary(
+            cipher=datagram_ouija_test.tuning.cipher,
+            entropy=datagram_ouija_test.tuning.entropy,
+            codec=Codec.BINARY,
+        ))
+
+    assert datagram_ouija_test.writer.write.call_count == 2
+    datagram_ouija_test.writer.write.assert_called_with(data_test)
+
+
+def test_datagram_ouija_acknowledge(datagram_ouija_test, data_test):
+    datagram_ouija_test.sent_seq = 10
+    datagram_ouija_test.sent_buf = {seq: Sent(data=data_test) for seq in range(10)}
+
+    datagram_ouija_test.acknowledge(packet=Packet(phase=Phase.DATA, ack=True, seq=3, sack=[[5, 7], [9, 100]]))
+
+    assert list(datagram_ouija_test.sent_buf) == [3, 4, 7, 8]
+    assert datagram_ouija_test.sent_ack == 3
+
+    datagram_ouija_test.acknowledge(packet=Packet(phase=Phase.DATA, ack=True, seq=100, sack=[]))
+
+    assert not datagram_ouija_test.sent_buf
+    assert datagram_ouija_test.sent_ack == 10
+
+
+def test_datagram_ouija_acknowledge_window(datagram_ouija_test, data_test):
+    datagram_ouija_test.sent_seq = 2
+    datagram_ouija_test.sent_buf = {seq: Sent(data=data_test) for seq in range(2)}
+
+    datagram_ouija_test.acknowledge(packet=Packet(phase=Phase.DATA, ack=True, seq=0, sack=[], window=10))
+
+    assert datagram_ouija_test.peer_window == 10
+    assert datagram_ouija_test.window_open.is_set()
+
+    # reordered ACK does not shrink window
+    datagram_ouija_test.acknowledge(packet=Packet(phase=Phase.DATA, ack=True, seq=0, sack=[], window=8))
+
+    assert datagram_ouija_test.peer_window == 10
+
+
+def test_datagram_ouija_acknowledge_karn(datagram_ouija_test, data_test):
+    datagram_ouija_test.sent_seq = 2
+    datagram_ouija_test.sent_buf = {0: Sent(data=data_test, timestamp=0.0, retries=2)}
+
+    datagram_ouija_test.acknowledge(packet=Packet(phase=Phase.DATA, ack=True, seq=2, sack=[]))
+
+    assert datagram_ouija_test.rtt.srtt is None
+    assert datagram_ouija_test.telemetry.rtt_count == 0
+
+
+def test_datagram_ouija_acknowledge_single(datagram_ouija_test, data_test):
+    datagram_ouija_test.sent_seq = 3
+    datagram_ouija_test.sent_buf = {seq: Sent(data=data_test) for seq in range(3)}
+
+    datagram_ouija_test.acknowledge(packet=Packet(phase=Phase.DATA, ack=True, seq=1))
+
+    assert list(datagram_ouija_test.sent_buf) == [0, 2]
+    assert datagram_ouija_test.sent_ack == 0
+
+
+def test_datagram_ouija_lost(datagram_ouija_test, data_test):
+    datagram_ouija_test.sent_seq = 10
+    datagram_ouija_test.sent_buf = {seq: Sent(data=data_test) for seq in range(10)}
+
+    datagram_ouija_test.acknowledge(packet=Packet(phase=Phase.DATA, ack=True, seq=0, sack=[[2, 4]]))
+
+    # two packets above 0 and 1 are acknowledged - not enough to consider them lost
+    assert datagram_ouija_test.acked_high == 4
+    assert datagram_ouija_test.lost() == []
+
+    datagram_ouija_test.acknowledge(packet=Packet(phase=Phase.DATA, ack=True, seq=0, sack=[[2, 4], [5, 7]]))
+
+    # 4 is followed by 2 acknowledged packets only, 0 and 1 by 4
+    assert datagram_ouija_test.lost() == [0, 1]
+
+    datagram_ouija_test.sent_buf[0].retries = 2
+
+    assert datagram_ouija_test.lost() == [1]
+
+
+def test_datagram_ouija_lost_single(datagram_ouija_test, data_test):
+    datagram_ouija_test.sent_seq = 5
+    datagram_ouija_test.sent_buf = {seq: Sent(data=data_test) for seq in range(5)}
+
+    for seq in (1, 2, 3):
+        datagram_ouija_test.acknowledge(packet=Packet(phase=Phase.DATA, ack=True, seq=seq))
+
+    assert datagram_ouija_test.lost() == [0]
+
+
+def test_datagram_ouija_lost_fec(datagram_ouija_test, data_test):
+    datagram_ouija_test.sent_seq = 5
+    datagram_ouija_test.sent_buf = {seq: Sent(data=data_test) for seq in range(5)}
+    datagram_ouija_test.protect(seqs=range(0, 4))
+    datagram_ouija_test.acknowledge(packet=Packet(phase=Phase.DATA, ack=True, seq=0, sack=[[1, 5]]))
+
+    # gap may still be rebuilt from parity
+    assert datagram_ouija_test.lost() == []
+
+    datagram_ouija_test.sent_buf[0].fec = time.monotonic() - 0.001
+
+    assert datagram_ouija_test.lost() == [0]
+
+
+def test_datagram_ouija_protect(datagram_ouija_test, data_test):
+    datagram_ouija_test.sent_buf = {seq: Sent(data=data_test) for seq in range(2)}
+    datagram_ouija_test.rtt.sample(rtt=0.1)
+    now = time.monotonic()
+
+    datagram_ouija_test.protect(seqs=range(0, 4))
+
+    # packets acknowledged already are skipped
+    assert set(datagram_ouija_test.sent_buf) == {0, 1}
+    for sent in datagram_ouija_test.sent_buf.values():
+        assert now + 0.1 + datagram_ouija_test.tuning.udp_ack_delay <= sent.fec < now + 0.2
+    datagram_ouija_test.sent_buf.clear()
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_fast_retransmit(datagram_ouija_test, data_test):
+    datagram_ouija_test.send = AsyncMock()
+    datagram_ouija_test.sent_seq = 5
+    datagram_ouija_test.sent_buf = {seq: Sent(data=bytes((seq,))) for seq in range(5)}
+    datagram_ouija_test.acknowledge(packet=Packet(phase=Phase.DATA, ack=True, seq=0, sack=[[1, 4]]))
+    cwnd = datagram_ouija_test.congestion.cwnd
+
+    await datagram_ouija_test.fast_retransmit()
+    await datagram_ouija_test.fast_retransmit()
+
+    # lost packet is retransmitted once, window is halved
+    datagram_ouija_test.send.assert_awaited_once_with(data=bytes((0,)))
+    assert datagram_ouija_test.sent_buf[0].retries == 2
+    assert datagram_ouija_test.telemetry.fast_retransmits == 1
+    assert datagram_ouija_test.telemetry.losses == 1
+    assert datagram_ouija_test.congestion.cwnd == cwnd / 2
+
+
+def test_datagram_ouija_sack(datagram_ouija_test, data_test):
+    datagram_ouija_test.recv_seq = 2
+    for seq in (9, 3, 4, 7, 5):
+        datagram_ouija_test.recv_buf.put(seq=seq, received=Received(data=data_test, drain=False))
+
+    assert datagram_ouija_test.sack() == [[3, 6], [7, 8], [9, 10]]
+
+    datagram_ouija_test.recv_seq = 0
+    datagram_ouija_test.recv_buf = ReorderBuffer(capacity=100)
+    for seq in range(2, 100, 2):
+        datagram_ouija_test.recv_buf.put(seq=seq, received=Received(data=data_test, drain=False))
+
+    assert len(datagram_ouija_test.sack()) == SACK_LIMIT
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_process_wrapped_data_selective(datagram_ouija_test, data_test):
+    datagram_ouija_test.opened.set()
+    datagram_ouija_test.acknowledgement = Acknowledgement.SELECTIVE
+    datagram_ouija_test.send_packet = AsyncMock()
+
+    for seq in (0, 1, 2, 3, 5):
+        packet = Packet(phase=Phase.DATA, ack=False, seq=seq, data=data_test, drain=False)
+        await datagram_ouija_test.process_wrapped(data=packet.binary(
+            cipher=datagram_ouija_test.tuning.cipher,
+            entropy=datagram_ouija_test.tuning.entropy,
+            codec=Codec.BINARY,
+        ))
+
+    # every second in-order packet is acknowledged, gap is acknowledged immediately
+    ack_packets = [call.kwargs['packet'] for call in datagram_ouija_test.send_packet.call_args_list]
+    assert [(packet.seq, packet.sack) for packet in ack_packets] == [(2, []), (4, []), (4, [[5, 6]])]
+    assert datagram_ouija_test.writer.write.call_count == 4
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_process_wrapped_data_reordered(datagram_ouija_test):
+    datagram_ouija_test.opened.set()
+    datagram_ouija_test.send_packet = AsyncMock()
+
+    for seq in (3, 1, 2, 0, 4):
+        packet = Packet(phase=Phase.DATA, ack=False, seq=seq, data=bytes((seq,)), drain=False)
+        await datagram_ouija_test.process_wrapped(data=packet.binary(
+            cipher=datagram_ouija_test.tuning.cipher,
+            entropy=datagram_ouija_test.tuning.entropy,
+        ))
+
+    # contiguous prefix is delivered as soon as gap is filled, last packet takes in-order fast path
+    written = [call.args[0] for call in datagram_ouija_test.writer.write.call_args_list]
+    assert written == [bytes((seq,)) for seq in range(5)]
+    assert datagram_ouija_test.recv_seq == 5
+    assert not datagram_ouija_test.recv_buf
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_process_wrapped_bundle(datagram_ouija_test, data_test):
+    datagram_ouija_test.opened.set()
+    datagram_ouija_test.send_packet = AsyncMock()
+    datagram_ouija_test.sent_buf[0] = Sent(data=data_test)
+    datagram_ouija_test.sent_seq = 1
+    packets = [
+        Packet(phase=Phase.DATA, ack=True, seq=1, sack=[], window=11),
+        Packet(phase=Phase.DATA, ack=False, seq=0, data=data_test, drain=True),
+    ]
+
+    await datagram_ouija_test.process_wrapped(data=Packet.bundle(
+        packets=packets,
+        cipher=datagram_ouija_test.tuning.cipher,
+        entropy=datagram_ouija_test.tuning.entropy,
+    ))
+
+    assert not datagram_ouija_test.sent_buf
+    assert datagram_ouija_test.peer_window == 11
+    datagram_ouija_test.writer.write.assert_called_once()
+    assert datagram_ouija_test.recv_seq == 1
+    assert datagram_ouija_test.telemetry.payloads_recv == 1
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_process_wrapped_data_fec(datagram_ouija_test):
+    datagram_ouija_test.opened.set()
+    datagram_ouija_test.send_packet = AsyncMock()
+    datagram_ouija_test.fec_decoder = FecDecoder(capacity=datagram_ouija_test.tuning.udp_capacity)
+    encoder = FecEncoder(group=3)
+    packets = [
+        Packet(phase=Phase.DATA, ack=False, seq=seq, data=bytes((seq,)) * (seq + 1), drain=False)
+        for seq in range(3)
+    ]
+    parity = [encoder.add(seq=packet.seq, data=packet.data, drain=packet.drain) for packet in packets][-1]
+
+    # packet 1 is lost
+    for packet in (packets[0], packets[2], parity):
+        await datagram_ouija_test.process_wrapped(data=packet.binary(
+            cipher=datagram_ouija_test.tuning.cipher,
+            entropy=datagram_ouija_test.tuning.entropy,
+            codec=Codec.BINARY,
+        ))
+
+    written = [bytes(call.args[0]) for call in datagram_ouija_test.writer.write.call_args_list]
+    assert written == [packet.data for packet in packets]
+    assert datagram_ouija_test.recv_seq == 3
+    assert datagram_ouija_test.telemetry.fec_recovered == 1
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_process_wrapped_data_fec_pending(datagram_ouija_test):
+    datagram_ouija_test.opened.set()
+    datagram_ouija_test.send_packet = AsyncMock()
+    datagram_ouija_test.fec_decoder = FecDecoder(capacity=datagram_ouija_test.tuning.udp_capacity)
+    encoder = FecEncoder(group=3)
+    packets = [Packet(phase=Phase.DATA, ack=False, seq=seq, data=bytes((seq,)), drain=False) for seq in range(3)]
+    parity = [encoder.add(seq=packet.seq, data=packet.data, drain=packet.drain) for packet in packets][-1]
+
+    # packets 0 and 1 are lost - group is rebuilt when retransmitted packet 0 arrives
+    for packet in (packets[2], parity, packets[0]):
+        await datagram_ouija_test.process_wrapped(data=packet.binary(
+            cipher=datagram_ouija_test.tuning.cipher,
+            entropy=datagram_ouija_test.tuning.entropy,
+            codec=Codec.BINARY,
+        ))
+
+    assert datagram_ouija_test.recv_seq == 3
+    assert datagram_ouija_test.telemetry.fec_recovered == 1
+    assert not datagram_ouija_test.fec_decoder.pending
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_process_wrapped_data_fec_disabled(datagram_ouija_test):
+    datagram_ouija_test.opened.set()
+    datagram_ouija_test.send_packet = AsyncMock()
+    parity = FecEncoder(group=1).add(seq=0, data=b'0', drain=False)
+
+    await datagram_ouija_test.process_wrapped(data=parity.binary(
+        cipher=datagram_ouija_test.tuning.cipher,
+        entropy=datagram_ouija_test.tuning.entropy,
+    ))
+
+    datagram_ouija_test.writer.write.assert_not_called()
+    datagram_ouija_test.send_packet.assert_not_awaited()
+    assert datagram_ouija_test.recv_seq == 0
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_process_wrapped_data_selective_delay(datagram_ouija_test, data_test):
+    datagram_ouija_test.opened.set()
+    datagram_ouija_test.acknowledgement = Acknowledgement.SELECTIVE
+    datagram_ouija_test.send_packet = AsyncMock()
+    packet = Packet(phase=Phase.DATA, ack=False, seq=0, data=data_test, drain=True)
+
+    await datagram_ouija_test.process_wrapped(data=packet.binary(
+        cipher=datagram_ouija_test.tuning.cipher,
+        entropy=datagram_ouija_test.tuning.entropy,
+    ))
+
+    datagram_ouija_test.send_packet.assert_not_awaited()
+    assert datagram_ouija_test.ack_timer
+
+    await asyncio.sleep(datagram_ouija_test.tuning.udp_ack_delay * 5)
+
+    ack_packet = datagram_ouija_test.send_packet.call_args.kwargs['packet']
+    assert ack_packet.seq == 1
+    assert not datagram_ouija_test.ack_timer
+    assert not datagram_ouija_test.ack_pending
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_process_wrapped_data_selective_duplicate(datagram_ouija_test, data_test):
+    datagram_ouija_test.opened.set()
+    datagram_ouija_test.acknowledgement = Acknowledgement.SELECTIVE
+    datagram_ouija_test.tuning.udp_ack_count = 10
+    datagram_ouija_test.send_packet = AsyncMock()
+    packet = Packet(phase=Phase.DATA, ack=False, seq=0, data=data_test, drain=True)
+
+    for _ in range(2):
+        await datagram_ouija_test.process_wrapped(data=packet.binary(
+            cipher=datagram_ouija_test.tuning.cipher,
+            entropy=datagram_ouija_test.tuning.entropy,
+        ))
+
+    # duplicate is acknowledged immediately, together with pending packet
+    datagram_ouija_test.send_packet.assert_awaited_once()
+    assert datagram_ouija_test.telemetry.acks_saved == 1
+    assert not datagram_ouija_test.ack_timer
+    assert datagram_ouija_test.writer.write.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_flush_ack_delayed_exception(datagram_ouija_test):
+    datagram_ouija_test.ack_pending = 1
+    datagram_ouija_test.send_packet = AsyncMock()
+    datagram_ouija_test.send_packet.side_effect = Exception()
+
+    await datagram_ouija_test.flush_ack_delayed()
+
+    assert datagram_ouija_test.telemetry.processing_errors == 1
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_process_wrapped_data_selective_write_closed(datagram_ouija_test, data_test):
+    datagram_ouija_test.opened.set()
+    datagram_ouija_test.write_closed.set()
+    datagram_ouija_test.acknowledgement = Acknowledgement.SELECTIVE
+    datagram_ouija_test.send_packet = AsyncMock()
+    packet = Packet(phase=Phase.DATA, ack=False, seq=3, data=data_test, drain=False)
+
+    await datagram_ouija_test.process_wrapped(data=packet.binary(
+        cipher=datagram_ouija_test.tuning.cipher,
+        entropy=datagram_ouija_test.tuning.entropy,
+    ))
+
+    ack_packet = datagram_ouija_test.send_packet.call_args.kwargs['packet']
+    assert ack_packet.seq == 0
+    assert ack_packet.sack == [[3, 4]]
+    datagram_ouija_test.writer.write.assert_not_called()
+
+
 @pytest.mark.asyncio
 async def test_datagram_ouija_process_wrapped_data_not_opened(datagram_ouija_test, data_test):
     datagram_ouija_test.send_packet = AsyncMock()
@@ -237,24 +836,26 @@ async def test_datagram_ouija_process_wrapped_seq(datagram_ouija_test, data_test
 
 
 @pytest.mark.asyncio
-@pytest.mark.xfail(raises=BufOverloadError)
-async def test_datagram_ouija_process_wrapped_bufoverloaderror(datagram_ouija_test, data_test):
+async def test_datagram_ouija_process_wrapped_window(datagram_ouija_test, data_test):
     datagram_ouija_test.opened.set()
     datagram_ouija_test.send_packet = AsyncMock()
     packet = Packet(
         phase=Phase.DATA,
         ack=False,
-        seq=1,
+        seq=datagram_ouija_test.tuning.udp_capacity,
         data=data_test,
         drain=True,
     )
 
-    for _ in range(datagram_ouija_test.tuning.udp_capacity):
-        await datagram_ouija_test.process_wrapped(data=packet.binary(
-            cipher=datagram_ouija_test.tuning.cipher,
-            entropy=datagram_ouija_test.tuning.entropy,
-        ))
-        packet.seq += 1
+    await datagram_ouija_test.process_wrapped(data=packet.binary(
+        cipher=datagram_ouija_test.tuning.cipher,
+        entropy=datagram_ouija_test.tuning.entropy,
+    ))
+
+    # packet beyond receive window is dropped without closing connection
+    datagram_ouija_test.send_packet.assert_not_awaited()
+    assert not datagram_ouija_test.recv_buf
+    assert datagram_ouija_test.telemetry.recv_buf_overloads == 1
 
 
 @pytest.mark.asyncio
@@ -335,98 +936,484 @@ async def test_datagram_ouija_process_tokenerror(datagram_ouija_test):
         ack=False,
     )
 
-    await datagram_ouija_test.process(data=packet.binary(
-        cipher=datagram_ouija_test.tuning.cipher,
-        entropy=datagram_ouija_test.tuning.entropy,
-    ))
+    await datagram_ouija_test.process(data=packet.binary(
+        cipher=datagram_ouija_test.tuning.cipher,
+        entropy=datagram_ouija_test.tuning.entropy,
+    ))
+
+    datagram_ouija_test.process_wrapped.assert_awaited()
+    datagram_ouija_test.close.assert_awaited()
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_process_onopenerror(datagram_ouija_test):
+    datagram_ouija_test.process_wrapped = AsyncMock()
+    datagram_ouija_test.process_wrapped.side_effect = OnOpenError()
+    datagram_ouija_test.close = AsyncMock()
+    packet = Packet(
+        phase=Phase.OPEN,
+        ack=False,
+    )
+
+    await datagram_ouija_test.process(data=packet.binary(
+        cipher=datagram_ouija_test.tuning.cipher,
+        entropy=datagram_ouija_test.tuning.entropy,
+    ))
+
+    datagram_ouija_test.process_wrapped.assert_awaited()
+    datagram_ouija_test.close.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_process_bufoverloaderror(datagram_ouija_test):
+    datagram_ouija_test.process_wrapped = AsyncMock()
+    datagram_ouija_test.process_wrapped.side_effect = BufOverloadError()
+    datagram_ouija_test.close = AsyncMock()
+    packet = Packet(
+        phase=Phase.DATA,
+        ack=False,
+    )
+
+    await datagram_ouija_test.process(data=packet.binary(
+        cipher=datagram_ouija_test.tuning.cipher,
+        entropy=datagram_ouija_test.tuning.entropy,
+    ))
+
+    datagram_ouija_test.process_wrapped.assert_awaited()
+    datagram_ouija_test.close.assert_awaited()
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_process_decodeerror(datagram_ouija_test, data_test):
+    datagram_ouija_test.close = AsyncMock()
+
+    await datagram_ouija_test.process(data=data_test)
+
+    assert datagram_ouija_test.telemetry.processing_errors == 1
+    datagram_ouija_test.close.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_process_connectionerror(datagram_ouija_test):
+    datagram_ouija_test.process_wrapped = AsyncMock()
+    datagram_ouija_test.process_wrapped.side_effect = ConnectionError()
+    datagram_ouija_test.close = AsyncMock()
+    packet = Packet(
+        phase=Phase.CLOSE,
+        ack=False,
+    )
+
+    await datagram_ouija_test.process(data=packet.binary(
+        cipher=datagram_ouija_test.tuning.cipher,
+        entropy=datagram_ouija_test.tuning.entropy,
+    ))
+
+    datagram_ouija_test.process_wrapped.assert_awaited()
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_process_exception(datagram_ouija_test):
+    datagram_ouija_test.process_wrapped = AsyncMock()
+    datagram_ouija_test.process_wrapped.side_effect = Exception()
+    datagram_ouija_test.close = AsyncMock()
+    packet = Packet(
+        phase=Phase.CLOSE,
+        ack=False,
+    )
+
+    await datagram_ouija_test.process(data=packet.binary(
+        cipher=datagram_ouija_test.tuning.cipher,
+        entropy=datagram_ouija_test.tuning.entropy,
+    ))
+
+    datagram_ouija_test.process_wrapped.assert_awaited()
+    datagram_ouija_test.close.assert_awaited()
+
+
+def writer_test(*, writable: bool) -> MagicMock:
+    writer = MagicMock()
+    writer.drain = AsyncMock()
+    writer.transport.is_closing.return_value = False
+    writer.transport.get_write_buffer_limits.return_value = (16384, 65536)
+    writer.transport.get_write_buffer_size.return_value = 0 if writable else 65537
+    return writer
+
+
+def binary(*, ouija, packet: Packet) -> bytes:
+    return packet.binary(cipher=ouija.tuning.cipher, entropy=ouija.tuning.entropy)
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_feed_ack(datagram_ouija_test):
+    datagram_ouija_test.opened.set()
+    datagram_ouija_test.sent_seq = 2
+    datagram_ouija_test.sent_buf = {seq: Sent(data=bytes((seq,))) for seq in range(2)}
+    packet = Packet(phase=Phase.DATA, ack=True, seq=2, sack=[])
+
+    datagram_ouija_test.feed(data=binary(ouija=datagram_ouija_test, packet=packet))
+
+    # ACK is processed synchronously - no consumer is started
+    assert not datagram_ouija_test.sent_buf
+    assert datagram_ouija_test.consumer is None
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_feed_ack_lost(datagram_ouija_test):
+    datagram_ouija_test.opened.set()
+    datagram_ouija_test.send = AsyncMock()
+    datagram_ouija_test.sent_seq = 5
+    datagram_ouija_test.sent_buf = {seq: Sent(data=bytes((seq,))) for seq in range(5)}
+    packet = Packet(phase=Phase.DATA, ack=True, seq=0, sack=[[1, 4]])
+
+    datagram_ouija_test.feed(data=binary(ouija=datagram_ouija_test, packet=packet))
+
+    assert list(datagram_ouija_test.sent_buf) == [0, 4]
+    assert len(datagram_ouija_test.inbox) == 1
+
+    await asyncio.sleep(0)
+
+    # fast retransmission is run by consumer
+    datagram_ouija_test.send.assert_awaited_once_with(data=bytes((0,)))
+    assert not datagram_ouija_test.inbox
+    assert not datagram_ouija_test.consumer.done()
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_feed_data(datagram_ouija_test, data_test):
+    datagram_ouija_test.opened.set()
+    datagram_ouija_test.acknowledgement = Acknowledgement.SELECTIVE
+    datagram_ouija_test.writer = writer_test(writable=True)
+    datagram_ouija_test.on_send = Mock()
+
+    for seq in range(2):
+        packet = Packet(phase=Phase.DATA, ack=False, seq=seq, data=data_test, drain=True)
+        datagram_ouija_test.feed(data=binary(ouija=datagram_ouija_test, packet=packet))
+
+    # in-order data is written and acknowledged synchronously, writer is not drained
+    assert datagram_ouija_test.writer.write.call_count == 2
+    datagram_ouija_test.writer.drain.assert_not_awaited()
+    datagram_ouija_test.on_send.assert_called_once()
+    assert datagram_ouija_test.recv_seq == 2
+    assert not datagram_ouija_test.ack_pending
+    assert datagram_ouija_test.consumer is None
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_feed_data_paced(datagram_ouija_test, data_test):
+    datagram_ouija_test.opened.set()
+    datagram_ouija_test.acknowledgement = Acknowledgement.SELECTIVE
+    datagram_ouija_test.writer = writer_test(writable=True)
+    datagram_ouija_test.pacer = TokenBucket(rate=10000, burst=1)
+    datagram_ouija_test.on_send = Mock()
+    packet = Packet(phase=Phase.DATA, ack=False, seq=1, data=data_test, drain=False)
+    datagram_ouija_test.feed(data=binary(ouija=datagram_ouija_test, packet=packet))
+    packet = Packet(phase=Phase.DATA, ack=False, seq=0, data=data_test, drain=False)
+
+    datagram_ouija_test.feed(data=binary(ouija=datagram_ouija_test, packet=packet))
+
+    # out of order packet is processed by consumer, ACK waits for pacing
+    datagram_ouija_test.on_send.assert_not_called()
+    assert len(datagram_ouija_test.inbox) == 2
+
+    await asyncio.sleep(0.1)
+
+    assert datagram_ouija_test.writer.write.call_count == 2
+    assert datagram_ouija_test.recv_seq == 2
+    datagram_ouija_test.on_send.assert_called()
+    assert not datagram_ouija_test.inbox
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_feed_data_drain(datagram_ouija_test, data_test):
+    datagram_ouija_test.opened.set()
+    datagram_ouija_test.acknowledgement = Acknowledgement.SELECTIVE
+    datagram_ouija_test.writer = writer_test(writable=False)
+    datagram_ouija_test.send_packet = AsyncMock()
+
+    for seq in range(2):
+        packet = Packet(phase=Phase.DATA, ack=False, seq=seq, data=data_test, drain=True)
+        datagram_ouija_test.feed(data=binary(ouija=datagram_ouija_test, packet=packet))
+
+    # ACK waits for drain, next datagram is queued behind it
+    assert datagram_ouija_test.writer.write.call_count == 1
+    assert len(datagram_ouija_test.inbox) == 3
+    datagram_ouija_test.send_packet.assert_not_awaited()
+
+    await asyncio.sleep(0)
+
+    assert datagram_ouija_test.writer.write.call_count == 2
+    assert datagram_ouija_test.writer.drain.await_count == 2
+    datagram_ouija_test.send_packet.assert_awaited_once()
+    assert datagram_ouija_test.recv_seq == 2
+    assert not datagram_ouija_test.inbox
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_feed_open(datagram_ouija_test, token_test):
+    datagram_ouija_test.tuning.token = token_test
+    datagram_ouija_test.on_open = AsyncMock()
+    packet = Packet(phase=Phase.OPEN, ack=False, token=token_test, host='example.com', port=443)
+
+    datagram_ouija_test.feed(data=binary(ouija=datagram_ouija_test, packet=packet))
+    await asyncio.sleep(0)
+
+    datagram_ouija_test.on_open.assert_awaited()
+    assert datagram_ouija_test.telemetry.opened == 1
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_feed_overload(datagram_ouija_test, data_test):
+    datagram_ouija_test.inbox.extend(AsyncMock() for _ in range(datagram_ouija_test.tuning.udp_capacity))
+
+    datagram_ouija_test.feed(data=data_test)
+
+    assert len(datagram_ouija_test.inbox) == datagram_ouija_test.tuning.udp_capacity
+    assert datagram_ouija_test.telemetry.recv_buf_overloads == 1
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_feed_decodeerror(datagram_ouija_test, data_test):
+    datagram_ouija_test.close = AsyncMock()
+
+    datagram_ouija_test.feed(data=data_test)
+
+    assert datagram_ouija_test.telemetry.processing_errors == 1
+    assert datagram_ouija_test.consumer is None
+    datagram_ouija_test.close.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_feed_exception(datagram_ouija_test):
+    datagram_ouija_test.opened.set()
+    datagram_ouija_test.acknowledge = Mock(side_effect=Exception())
+    datagram_ouija_test.close = AsyncMock()
+    packet = Packet(phase=Phase.DATA, ack=True, seq=0, sack=[])
+
+    datagram_ouija_test.feed(data=binary(ouija=datagram_ouija_test, packet=packet))
+    await asyncio.sleep(0)
+
+    assert datagram_ouija_test.telemetry.processing_errors == 1
+    datagram_ouija_test.close.assert_awaited()
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_consume_connectionerror(datagram_ouija_test):
+    datagram_ouija_test.close = AsyncMock()
+    callback = AsyncMock()
+
+    datagram_ouija_test.enqueue(callback=AsyncMock(side_effect=ConnectionError()))
+    datagram_ouija_test.enqueue(callback=AsyncMock(side_effect=ConnectionError()))
+    datagram_ouija_test.enqueue(callback=callback)
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    # queued work is dropped, connection is closed in separate task, consumer goes on
+    assert datagram_ouija_test.telemetry.connection_errors == 1
+    callback.assert_not_awaited()
+    datagram_ouija_test.close.assert_awaited_once()
+    assert not datagram_ouija_test.inbox
+    assert not datagram_ouija_test.consumer.done()
+
+    datagram_ouija_test.enqueue(callback=AsyncMock(side_effect=ConnectionError()))
+    datagram_ouija_test.enqueue(callback=callback)
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    # connection is closed once
+    assert datagram_ouija_test.telemetry.connection_errors == 2
+    datagram_ouija_test.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_retransmit_wrapped(datagram_ouija_test, data_test):
+    datagram_ouija_test.send = AsyncMock()
+    datagram_ouija_test.scheduler = MagicMock()
+    datagram_ouija_test.opened.set()
+    datagram_ouija_test.rtt.sample(rtt=0.01)
+    datagram_ouija_test.sent_buf[0] = Sent(data=data_test, resent=0.0)
+
+    await datagram_ouija_test.retransmit_wrapped(seq=0)
+
+    # RTO follows sampled RTT instead of udp_timeout, backed off per retransmission
+    datagram_ouija_test.send.assert_awaited_with(data=data_test)
+    assert datagram_ouija_test.sent_buf[0].retries == 2
+    assert datagram_ouija_test.telemetry.retransmits == 1
+    assert datagram_ouija_test.telemetry.losses == 1
+    assert datagram_ouija_test.congestion.window == datagram_ouija_test.congestion.MINIMUM
+    delay = datagram_ouija_test.scheduler.schedule.call_args.kwargs['delay']
+    assert delay == datagram_ouija_test.rtt.timeout(retries=2) < datagram_ouija_test.tuning.udp_timeout
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_retransmit_wrapped_restart(datagram_ouija_test, data_test):
+    datagram_ouija_test.send = AsyncMock()
+    datagram_ouija_test.scheduler = MagicMock()
+    datagram_ouija_test.opened.set()
+    datagram_ouija_test.sent_buf[0] = Sent(data=data_test, retries=2)
+
+    await datagram_ouija_test.retransmit_wrapped(seq=0)
+
+    # packet was fast retransmitted just now - timer is restarted instead of retransmission
+    datagram_ouija_test.send.assert_not_awaited()
+    delay = datagram_ouija_test.scheduler.schedule.call_args.kwargs['delay']
+    assert 0 < delay <= datagram_ouija_test.rtt.timeout(retries=2)
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_retransmit_wrapped_paced(datagram_ouija_test, data_test):
+    async def send(*args, **kwargs):
+        datagram_ouija_test.acknowledge(packet=Packet(phase=Phase.DATA, ack=True, seq=0))
+
+    datagram_ouija_test.send = send
+    datagram_ouija_test.scheduler = MagicMock()
+    datagram_ouija_test.opened.set()
+    sent = Sent(data=data_test, resent=0.0)
+    datagram_ouija_test.sent_buf[0] = sent
+
+    await datagram_ouija_test.retransmit_wrapped(seq=0)
+
+    # packet acknowledged while retransmission was paced - no retry is counted, no timer is restarted
+    assert sent.retries == 1
+    assert datagram_ouija_test.telemetry.retransmits == 0
+    datagram_ouija_test.scheduler.schedule.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_retransmit_wrapped_acknowledged(datagram_ouija_test):
+    datagram_ouija_test.send = AsyncMock()
+    datagram_ouija_test.scheduler = MagicMock()
+    datagram_ouija_test.opened.set()
+
+    await datagram_ouija_test.retransmit_wrapped(seq=0)
+
+    datagram_ouija_test.send.assert_not_awaited()
+    datagram_ouija_test.scheduler.schedule.assert_not_called()
+
+
+@pytest.mark.asyncio
+@pytest.mark.xfail(raises=BufOverloadError)
+async def test_datagram_ouija_retransmit_wrapped_bufoverloaderror(datagram_ouija_test, data_test):
+    datagram_ouija_test.send = AsyncMock()
+    datagram_ouija_test.opened.set()
+    datagram_ouija_test.sent_buf[0] = Sent(data=data_test, timestamp=0.0)
+
+    await datagram_ouija_test.retransmit_wrapped(seq=0)
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_retransmit(datagram_ouija_test):
+    datagram_ouija_test.retransmit_wrapped = AsyncMock()
 
-    datagram_ouija_test.process_wrapped.assert_awaited()
-    datagram_ouija_test.close.assert_awaited()
+    await datagram_ouija_test.retransmit(seq=0)
+
+    datagram_ouija_test.retransmit_wrapped.assert_awaited_with(seq=0)
 
 
 @pytest.mark.asyncio
-async def test_datagram_ouija_process_onopenerror(datagram_ouija_test):
-    datagram_ouija_test.process_wrapped = AsyncMock()
-    datagram_ouija_test.process_wrapped.side_effect = OnOpenError()
+async def test_datagram_ouija_retransmit_bufoverloaderror(datagram_ouija_test, data_test):
+    datagram_ouija_test.retransmit_wrapped = AsyncMock()
+    datagram_ouija_test.retransmit_wrapped.side_effect = BufOverloadError()
     datagram_ouija_test.close = AsyncMock()
-    packet = Packet(
-        phase=Phase.OPEN,
-        ack=False,
-    )
+    datagram_ouija_test.sent_buf[1] = Sent(data=data_test)
 
-    await datagram_ouija_test.process(data=packet.binary(
-        cipher=datagram_ouija_test.tuning.cipher,
-        entropy=datagram_ouija_test.tuning.entropy,
-    ))
+    await datagram_ouija_test.retransmit(seq=0)
+    await asyncio.sleep(0)
 
-    datagram_ouija_test.process_wrapped.assert_awaited()
-    datagram_ouija_test.close.assert_not_awaited()
+    # stuck connection is closed once - retransmissions of other packets are skipped
+    assert datagram_ouija_test.telemetry.send_buf_overloads == 1
+    assert not datagram_ouija_test.sent_buf
+    datagram_ouija_test.close.assert_awaited_once()
 
 
 @pytest.mark.asyncio
-async def test_datagram_ouija_process_bufoverloaderror(datagram_ouija_test):
-    datagram_ouija_test.process_wrapped = AsyncMock()
-    datagram_ouija_test.process_wrapped.side_effect = BufOverloadError()
-    datagram_ouija_test.close = AsyncMock()
-    packet = Packet(
-        phase=Phase.DATA,
-        ack=False,
-    )
+async def test_datagram_ouija_retransmit_exception(datagram_ouija_test):
+    datagram_ouija_test.retransmit_wrapped = AsyncMock()
+    datagram_ouija_test.retransmit_wrapped.side_effect = Exception()
 
-    await datagram_ouija_test.process(data=packet.binary(
-        cipher=datagram_ouija_test.tuning.cipher,
-        entropy=datagram_ouija_test.tuning.entropy,
-    ))
+    await datagram_ouija_test.retransmit(seq=0)
 
-    datagram_ouija_test.process_wrapped.assert_awaited()
-    datagram_ouija_test.close.assert_awaited()
+    datagram_ouija_test.retransmit_wrapped.assert_awaited_with(seq=0)
+    assert datagram_ouija_test.telemetry.resending_errors == 1
 
 
 @pytest.mark.asyncio
-async def test_datagram_ouija_process_connectionerror(datagram_ouija_test):
-    datagram_ouija_test.process_wrapped = AsyncMock()
-    datagram_ouija_test.process_wrapped.side_effect = ConnectionError()
-    datagram_ouija_test.close = AsyncMock()
-    packet = Packet(
-        phase=Phase.CLOSE,
-        ack=False,
-    )
+async def test_datagram_ouija_retransmit_scheduled(datagram_ouija_test, data_test):
+    async def read(*args, **kwargs):
+        datagram_ouija_test.sync.clear()
+        return data_test
 
-    await datagram_ouija_test.process(data=packet.binary(
-        cipher=datagram_ouija_test.tuning.cipher,
-        entropy=datagram_ouija_test.tuning.entropy,
-    ))
+    datagram_ouija_test.on_serve = AsyncMock()
+    datagram_ouija_test.resend = AsyncMock()
+    datagram_ouija_test.reader.read = read
+    datagram_ouija_test.send = AsyncMock()
+    datagram_ouija_test.opened.set()
+    datagram_ouija_test.rtt.sample(rtt=0.01)
 
-    datagram_ouija_test.process_wrapped.assert_awaited()
+    await datagram_ouija_test.serve_wrapped()
+    await asyncio.sleep(0.1)
+
+    # first retransmission is due after RTO, next one after backed off RTO
+    sent = datagram_ouija_test.sent_buf[0]
+    assert sent.retries == 2
+    assert datagram_ouija_test.telemetry.retransmits == 1
+    assert len(datagram_ouija_test.scheduler) == 1
+    datagram_ouija_test.sent_buf.clear()
 
 
 @pytest.mark.asyncio
-async def test_datagram_ouija_process_exception(datagram_ouija_test):
-    datagram_ouija_test.process_wrapped = AsyncMock()
-    datagram_ouija_test.process_wrapped.side_effect = Exception()
-    datagram_ouija_test.close = AsyncMock()
-    packet = Packet(
-        phase=Phase.CLOSE,
-        ack=False,
-    )
+async def test_datagram_ouija_retransmit_cancelled(datagram_ouija_test, data_test):
+    async def read(*args, **kwargs):
+        datagram_ouija_test.sync.clear()
+        return data_test
 
-    await datagram_ouija_test.process(data=packet.binary(
-        cipher=datagram_ouija_test.tuning.cipher,
-        entropy=datagram_ouija_test.tuning.entropy,
-    ))
+    datagram_ouija_test.on_serve = AsyncMock()
+    datagram_ouija_test.resend = AsyncMock()
+    datagram_ouija_test.reader.read = read
+    datagram_ouija_test.send = AsyncMock()
+    datagram_ouija_test.opened.set()
+    datagram_ouija_test.rtt.sample(rtt=0.01)
 
-    datagram_ouija_test.process_wrapped.assert_awaited()
-    datagram_ouija_test.close.assert_awaited()
+    await datagram_ouija_test.serve_wrapped()
+    timer = datagram_ouija_test.sent_buf[0].timer
+    datagram_ouija_test.acknowledge(packet=Packet(phase=Phase.DATA, ack=True, seq=0))
+    await asyncio.sleep(0.1)
+
+    # acknowledged packet timer is cancelled - nothing is fired
+    assert timer.cancelled()
+    assert len(datagram_ouija_test.scheduler) == 0
+    assert datagram_ouija_test.telemetry.retransmits == 0
 
 
 @pytest.mark.asyncio
 async def test_datagram_ouija_resend_wrapped(datagram_ouija_test, data_test):
-    datagram_ouija_test.send = AsyncMock()
+    async def acknowledger():
+        await asyncio.sleep(0.1)
+        datagram_ouija_test.acknowledge(packet=Packet(phase=Phase.DATA, ack=True, seq=0))
+
     datagram_ouija_test.sent_buf[0] = Sent(data=data_test)
+    asyncio.create_task(acknowledger())
 
-    await datagram_ouija_test.resend_wrapped()
+    await asyncio.wait_for(datagram_ouija_test.resend_wrapped(), 1)
 
-    datagram_ouija_test.send.assert_awaited()
+    assert not datagram_ouija_test.sent_buf
+    assert not datagram_ouija_test.sync.is_set()
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_resend_wrapped_sync(datagram_ouija_test):
+    async def closer():
+        await asyncio.sleep(0.1)
+        datagram_ouija_test.wakeup.set()
+        await asyncio.sleep(0.1)
+        datagram_ouija_test.sync.clear()
+        datagram_ouija_test.wakeup.set()
+
+    datagram_ouija_test.sync.set()
+    task = asyncio.create_task(closer())
+
+    await asyncio.wait_for(datagram_ouija_test.resend_wrapped(), 1)
+
+    assert task.done()
 
 
 @pytest.mark.asyncio
@@ -483,7 +1470,7 @@ async def test_datagram_ouija_serve_wrapped(datagram_ouija_test, data_test):
     datagram_ouija_test.on_serve = AsyncMock()
     datagram_ouija_test.resend = AsyncMock()
     datagram_ouija_test.reader.read = read
-    datagram_ouija_test.send_packet = AsyncMock()
+    datagram_ouija_test.send = AsyncMock()
     datagram_ouija_test.sync.set()
     asyncio.create_task(resetter())
 
@@ -491,7 +1478,40 @@ async def test_datagram_ouija_serve_wrapped(datagram_ouija_test, data_test):
 
     datagram_ouija_test.on_serve.assert_awaited()
     datagram_ouija_test.resend.assert_awaited()
-    datagram_ouija_test.send_packet.assert_awaited()
+    datagram_ouija_test.send.assert_awaited()
+    # stored datagram is sent as is - packet is encrypted once
+    sent = [call.kwargs['data'] for call in datagram_ouija_test.send.call_args_list]
+    assert sent == [datagram_ouija_test.sent_buf[seq].data for seq in range(len(sent))]
+    datagram_ouija_test.sent_buf.clear()
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_serve_wrapped_compressor(datagram_ouija_test, data_test):
+    async def read(*args, **kwargs):
+        datagram_ouija_test.sync.clear()
+        return data_test * 100
+
+    datagram_ouija_test.on_serve = AsyncMock()
+    datagram_ouija_test.resend = AsyncMock()
+    datagram_ouija_test.reader.read = read
+    datagram_ouija_test.send = AsyncMock()
+    datagram_ouija_test.compressor = Compressor(compression=Compression.ZLIB)
+    datagram_ouija_test.sync.set()
+
+    await datagram_ouija_test.serve_wrapped()
+
+    peer = Compressor(compression=Compression.ZLIB)
+    payloads = [
+        packet.data
+        for call in datagram_ouija_test.send.call_args_list
+        for packet in Packet.packets(
+            data=call.kwargs['data'],
+            cipher=datagram_ouija_test.cipher,
+            entropy=datagram_ouija_test.tuning.entropy,
+        )
+    ]
+    assert b''.join(peer.decompress(data=payload) for payload in payloads) == data_test * 100
+    assert sum(len(payload) for payload in payloads) < len(data_test) * 100
 
 
 @pytest.mark.asyncio
@@ -515,7 +1535,7 @@ async def test_datagram_ouija_serve_wrapped_timeouterror(datagram_ouija_test, da
     datagram_ouija_test.resend = AsyncMock()
     datagram_ouija_test.reader.read = AsyncMock(return_value=data_test)
     datagram_ouija_test.reader.read.side_effect = TimeoutError()
-    datagram_ouija_test.send_packet = AsyncMock()
+    datagram_ouija_test.send = AsyncMock()
     datagram_ouija_test.sync.set()
     asyncio.create_task(resetter())
 
@@ -524,7 +1544,7 @@ async def test_datagram_ouija_serve_wrapped_timeouterror(datagram_ouija_test, da
     datagram_ouija_test.on_serve.assert_awaited()
     datagram_ouija_test.resend.assert_awaited()
     datagram_ouija_test.reader.read.assert_awaited()
-    datagram_ouija_test.send_packet.assert_not_awaited()
+    datagram_ouija_test.send.assert_not_awaited()
 
 
 @pytest.mark.asyncio
@@ -536,7 +1556,7 @@ async def test_datagram_ouija_serve_wrapped_empty(datagram_ouija_test, data_test
     datagram_ouija_test.on_serve = AsyncMock()
     datagram_ouija_test.resend = AsyncMock()
     datagram_ouija_test.reader.read = AsyncMock(return_value=b'')
-    datagram_ouija_test.send_packet = AsyncMock()
+    datagram_ouija_test.send = AsyncMock()
     datagram_ouija_test.sync.set()
     asyncio.create_task(resetter())
 
@@ -545,34 +1565,140 @@ async def test_datagram_ouija_serve_wrapped_empty(datagram_ouija_test, data_test
     datagram_ouija_test.on_serve.assert_awaited()
     datagram_ouija_test.resend.assert_awaited()
     datagram_ouija_test.reader.read.assert_awaited()
-    datagram_ouija_test.send_packet.assert_not_awaited()
+    datagram_ouija_test.send.assert_not_awaited()
 
 
 @pytest.mark.asyncio
-@pytest.mark.xfail(raises=BufOverloadError)
-async def test_datagram_ouija_serve_wrapped_bufoverloaderror(datagram_ouija_test, data_test):
-    async def resetter():
-        await asyncio.sleep(2)
-        datagram_ouija_test.sync.clear()
+async def test_datagram_ouija_serve_wrapped_window(datagram_ouija_test, data_test):
+    datagram_ouija_test.on_serve = AsyncMock()
+    datagram_ouija_test.resend = AsyncMock()
+    datagram_ouija_test.reader.read = AsyncMock(side_effect=[data_test, b''])
+    datagram_ouija_test.send = AsyncMock()
+    datagram_ouija_test.opened.set()
+    for seq in range(datagram_ouija_test.congestion.window):
+        datagram_ouija_test.sent_buf[seq] = Sent(data=data_test)
+    datagram_ouija_test.sent_seq = datagram_ouija_test.congestion.window
 
-    async def read(*args, **kwargs):
-        await asyncio.sleep(0.5)
-        return data_test
+    task = asyncio.create_task(datagram_ouija_test.serve_wrapped())
+    await asyncio.sleep(0.1)
+
+    # congestion window is full - packet waits for acknowledgement instead of overloading send buffer
+    datagram_ouija_test.send.assert_not_awaited()
+
+    datagram_ouija_test.acknowledge(packet=Packet(phase=Phase.DATA, ack=True, seq=0))
+    await asyncio.wait_for(task, 1)
 
+    datagram_ouija_test.send.assert_awaited_once()
+    assert datagram_ouija_test.telemetry.cwnd_count == 1
+    datagram_ouija_test.sent_buf.clear()
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_serve_wrapped_piggyback(datagram_ouija_test, data_test):
     datagram_ouija_test.on_serve = AsyncMock()
     datagram_ouija_test.resend = AsyncMock()
-    datagram_ouija_test.reader.read = read
-    datagram_ouija_test.send_packet = AsyncMock()
-    datagram_ouija_test.sync.set()
-    for i in range(datagram_ouija_test.tuning.udp_capacity):
-        datagram_ouija_test.sent_buf[i] = Sent(data=data_test)
-    asyncio.create_task(resetter())
+    datagram_ouija_test.reader.read = AsyncMock(side_effect=[data_test, b''])
+    datagram_ouija_test.send = AsyncMock()
+    datagram_ouija_test.opened.set()
+    datagram_ouija_test.codec = Codec.BINARY
+    datagram_ouija_test.bundling = Bundling.BUNDLE
+    datagram_ouija_test.acknowledgement = Acknowledgement.SELECTIVE
+    await datagram_ouija_test.send_ack(immediate=False)
 
     await datagram_ouija_test.serve_wrapped()
 
-    datagram_ouija_test.on_serve.assert_awaited()
-    datagram_ouija_test.resend.assert_awaited()
-    datagram_ouija_test.send_packet.assert_awaited()
+    # pending ACK rides on data packet - single datagram, delayed ACK is cancelled
+    datagram_ouija_test.send.assert_awaited_once()
+    packets = Packet.packets(
+        data=datagram_ouija_test.send.call_args.kwargs['data'],
+        cipher=datagram_ouija_test.cipher,
+        entropy=datagram_ouija_test.tuning.entropy,
+    )
+    assert [(packet.ack, packet.seq) for packet in packets] == [(True, 0), (False, 0)]
+    assert not datagram_ouija_test.ack_pending
+    assert not datagram_ouija_test.ack_timer
+    assert datagram_ouija_test.telemetry.acks_piggybacked == 1
+    datagram_ouija_test.sent_buf.clear()
+
+
+def test_datagram_ouija_piggyback(datagram_ouija_test):
+    datagram_ouija_test.bundling = Bundling.BUNDLE
+
+    assert datagram_ouija_test.piggyback(size=0) == []
+
+    datagram_ouija_test.ack_pending = 1
+    # ACK would not fit into datagram with full-size data packet
+    assert datagram_ouija_test.piggyback(size=datagram_ouija_test.tuning.udp_max_payload) == []
+    assert datagram_ouija_test.ack_pending == 1
+
+    datagram_ouija_test.bundling = Bundling.NONE
+    assert datagram_ouija_test.piggyback(size=0) == []
+
+
+def test_datagram_ouija_piggyback_limit(datagram_ouija_test):
+    datagram_ouija_test.bundling = Bundling.BUNDLE
+    datagram_ouija_test.ack_pending = 1
+    udp_max_payload = datagram_ouija_test.tuning.udp_max_payload
+    size = udp_max_payload - 2 * HEADER.size - WINDOW.size - SACK_RANGE.size * SACK_LIMIT
+
+    assert datagram_ouija_test.piggyback(size=size + 1) == []
+
+    # data frame and ACK frame with the largest SACK take exactly udp_max_payload
+    ack_packet = datagram_ouija_test.piggyback(size=size)[0]
+    ack_packet.sack = [[seq, seq + 1] for seq in range(1, SACK_LIMIT * 2, 2)]
+    data_packet = Packet(phase=Phase.DATA, ack=False, seq=0, data=b'0' * size, drain=False)
+    data = b''.join(packet.encode(codec=Codec.BINARY) for packet in (ack_packet, data_packet))
+    assert len(data) == udp_max_payload
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_serve_wrapped_fec(datagram_ouija_test, data_test):
+    datagram_ouija_test.on_serve = AsyncMock()
+    datagram_ouija_test.resend = AsyncMock()
+    datagram_ouija_test.reader.read = AsyncMock(side_effect=[data_test, b''])
+    datagram_ouija_test.send = AsyncMock()
+    datagram_ouija_test.opened.set()
+    datagram_ouija_test.fec_encoder = FecEncoder(group=4)
+
+    await datagram_ouija_test.serve_wrapped()
+
+    # parity of incomplete group is sent after the last packet of client read
+    packets = [
+        packet
+        for call in datagram_ouija_test.send.call_args_list
+        for packet in Packet.packets(
+            data=call.kwargs['data'],
+            cipher=datagram_ouija_test.cipher,
+            entropy=datagram_ouija_test.tuning.entropy,
+        )
+    ]
+    assert packets[-1].parity == datagram_ouija_test.sent_seq
+    assert all(packet.parity is None for packet in packets[:-1])
+    assert datagram_ouija_test.telemetry.fec_parities == 1
+    # group is protected from fast retransmission until parity deadline
+    assert all(sent.fec > time.monotonic() for sent in datagram_ouija_test.sent_buf.values())
+    datagram_ouija_test.sent_buf.clear()
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_wait_window(datagram_ouija_test):
+    async def opener():
+        await asyncio.sleep(0.1)
+        datagram_ouija_test.acknowledge(packet=Packet(phase=Phase.DATA, ack=True, seq=5, sack=[], window=6))
+
+    datagram_ouija_test.sync.set()
+    datagram_ouija_test.sent_seq = 5
+    datagram_ouija_test.peer_window = 5
+    task = asyncio.create_task(opener())
+
+    # peer receive window is full even though congestion window is empty
+    assert await asyncio.wait_for(datagram_ouija_test.wait_window(), 1)
+    assert task.done()
+
+    datagram_ouija_test.peer_window = 5
+    datagram_ouija_test.sync.clear()
+
+    assert not await datagram_ouija_test.wait_window()
 
 
 @pytest.mark.asyncio
@@ -662,6 +1788,53 @@ async def test_datagram_ouija_close(datagram_ouija_test):
     datagram_ouija_test.on_close.assert_awaited()
 
 
+@pytest.mark.asyncio
+async def test_datagram_ouija_close_ack_timer(datagram_ouija_test):
+    datagram_ouija_test.read_closed.set()
+    datagram_ouija_test.write_closed.set()
+    datagram_ouija_test.on_close = AsyncMock()
+    ack_timer = asyncio.get_running_loop().call_later(10, lambda: None)
+    datagram_ouija_test.ack_timer = ack_timer
+
+    await datagram_ouija_test.close()
+
+    assert ack_timer.cancelled()
+    assert not datagram_ouija_test.ack_timer
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_close_sent_buf(datagram_ouija_test, data_test):
+    datagram_ouija_test.read_closed.set()
+    datagram_ouija_test.write_closed.set()
+    datagram_ouija_test.on_close = AsyncMock()
+    timer = datagram_ouija_test.scheduler.schedule(delay=10, callback=AsyncMock())
+    datagram_ouija_test.sent_buf[0] = Sent(data=data_test, timer=timer)
+
+    await datagram_ouija_test.close()
+
+    # scheduler keeps no reference to closed connection
+    assert timer.cancelled()
+    assert not datagram_ouija_test.sent_buf
+    assert len(datagram_ouija_test.scheduler) == 0
+
+
+@pytest.mark.asyncio
+async def test_datagram_ouija_close_consumer(datagram_ouija_test):
+    datagram_ouija_test.read_closed.set()
+    datagram_ouija_test.write_closed.set()
+    datagram_ouija_test.on_close = AsyncMock()
+    datagram_ouija_test.enqueue(callback=partial(asyncio.sleep, 10))
+    await asyncio.sleep(0)
+    consumer = datagram_ouija_test.consumer
+
+    await datagram_ouija_test.close()
+    await asyncio.sleep(0)
+
+    assert consumer.cancelled()
+    assert datagram_ouija_test.consumer is None
+    assert not datagram_ouija_test.inbox
+
+
 @pytest.mark.asyncio
 async def test_datagram_ouija_close_writer_exception(datagram_ouija_test):
     datagram_ouija_test.opened.set()
@@ -797,6 +1970,160 @@ async def test_stream_ouija_forward_wrapped_empty(stream_ouija_test, data_test):
     stream_ouija_test.writer.drain.assert_not_awaited()
 
 
+def test_stream_ouija_negotiate(stream_ouija_test):
+    caps = stream_ouija_test.negotiate(caps={'framing': ['LENGTH', 'SEPARATOR'], 'cipher': ['FERNET']})
+
+    assert stream_ouija_test.framing == Framing.LENGTH
+    assert caps == {'framing': ['LENGTH'], 'cipher': ['FERNET']}
+
+
+def test_stream_ouija_negotiate_legacy(stream_ouija_test):
+    caps = stream_ouija_test.negotiate(caps=None)
+
+    assert stream_ouija_test.framing == Framing.SEPARATOR
+    assert caps == {'framing': ['SEPARATOR'], 'cipher': ['FERNET']}
+
+
+def test_stream_ouija_negotiate_salt(stream_ouija_test, data_test):
+    cipher = AESGCMCipher(key='bdDmN4VexpDvTrs6gw8xTzaFvIBobFg1Cx2McFB1RmI=')
+    stream_ouija_test.tuning.cipher = cipher
+    peer_salt = b'\x00' * 16
+
+    stream_ouija_test.negotiate(caps=stream_ouija_test.capabilities(), salt=peer_salt, initiator=True)
+
+    peer = cipher.session(salt=stream_ouija_test.salt + peer_salt, initiator=False, implicit=True)
+    encrypted = stream_ouija_test.cipher.encrypt(data=data_test)
+    assert len(encrypted) == len(data_test) + 16
+    assert peer.decrypt(data=encrypted) == data_test
+
+
+@pytest.mark.asyncio
+async def test_stream_ouija_forward_wrapped_length(stream_ouija_test, data_test):
+    stream_ouija_test.framing = Framing.LENGTH
+    frame = Message.encrypt(
+        data=data_test,
+        cipher=stream_ouija_test.tuning.cipher,
+        entropy=stream_ouija_test.tuning.entropy,
+        framing=Framing.LENGTH,
+    )
+    reader = asyncio.StreamReader()
+    reader.feed_data(frame * 2)
+    reader.feed_eof()
+    stream_ouija_test.sync.set()
+
+    await stream_ouija_test.forward_wrapped(reader=reader, writer=stream_ouija_test.writer, crypt=False)
+
+    assert stream_ouija_test.writer.write.call_count == 2
+    stream_ouija_test.writer.write.assert_called_with(data_test)
+    assert not stream_ouija_test.sync.is_set()
+
+
+@pytest.mark.asyncio
+async def test_stream_ouija_forward_wrapped_compressor(stream_ouija_test, data_test):
+    stream_ouija_test.framing = Framing.LENGTH
+    stream_ouija_test.compressor = Compressor(compression=Compression.ZLIB)
+    reader = asyncio.StreamReader()
+    reader.feed_data(data_test * 100)
+    reader.feed_eof()
+    stream_ouija_test.sync.set()
+
+    await stream_ouija_test.forward_wrapped(reader=reader, writer=stream_ouija_test.writer, crypt=True)
+
+    frame, = stream_ouija_test.writer.write.call_args.args
+    decrypted = Message.decrypt(
+        data=frame[LENGTH.size:],
+        cipher=stream_ouija_test.tuning.cipher,
+        entropy=stream_ouija_test.tuning.entropy,
+        framing=Framing.LENGTH,
+        compressor=Compressor(compression=Compression.ZLIB),
+    )
+    assert decrypted == data_test * 100
+
+
+@pytest.mark.asyncio
+async def test_stream_ouija_read_frame_length_timeouterror(stream_ouija_test, data_test):
+    stream_ouija_test.framing = Framing.LENGTH
+    stream_ouija_test.tuning.message_timeout = 0.1
+    frame = Message.encrypt(
+        data=data_test,
+        cipher=stream_ouija_test.tuning.cipher,
+        entropy=stream_ouija_test.tuning.entropy,
+        framing=Framing.LENGTH,
+    )
+    reader = asyncio.StreamReader()
+    reader.feed_data(frame[:LENGTH.size - 1])
+
+    with pytest.raises(TimeoutError):
+        await stream_ouija_test.read_frame(reader=reader)
+
+    reader.feed_data(frame[LENGTH.size - 1:])
+
+    assert await stream_ouija_test.read_frame(reader=reader) == frame[LENGTH.size:]
+
+
+@pytest.mark.asyncio
+async def test_stream_ouija_read_frame_length_large(stream_ouija_test):
+    stream_ouija_test.framing = Framing.LENGTH
+    data = bytes(range(256)) * 1024
+    stream_ouija_test.tuning.tcp_buffer = len(data)
+    frame = Message.encrypt(
+        data=data,
+        cipher=stream_ouija_test.tuning.cipher,
+        entropy=stream_ouija_test.tuning.entropy,
+        framing=Framing.LENGTH,
+    )
+    reader = asyncio.StreamReader()
+    reader.feed_data(frame)
+
+    body = await stream_ouija_test.read_frame(reader=reader)
+
+    assert len(body) > 2 ** 16
+    assert Message.decrypt(
+        data=body,
+        cipher=stream_ouija_test.tuning.cipher,
+        entropy=stream_ouija_test.tuning.entropy,
+        framing=Framing.LENGTH,
+    ) == data
+
+
+@pytest.mark.asyncio
+async def test_stream_ouija_read_frame_length_limit(stream_ouija_test):
+    stream_ouija_test.framing = Framing.LENGTH
+    reader = asyncio.StreamReader()
+    reader.feed_data(LENGTH.pack(2 ** 32 - 1))
+
+    # peer-controlled length is rejected before body is read
+    with pytest.raises(DecodeError):
+        await stream_ouija_test.read_frame(reader=reader)
+
+
+@pytest.mark.asyncio
+async def test_stream_ouija_read_frame_length_body_timeouterror(stream_ouija_test, data_test):
+    stream_ouija_test.framing = Framing.LENGTH
+    stream_ouija_test.tuning.tcp_timeout = 0.1
+    reader = asyncio.StreamReader()
+    reader.feed_data(LENGTH.pack(len(data_test)) + data_test[:-1])
+
+    # frame body is partially consumed - frame timeout is fatal, not retried
+    with pytest.raises(DecodeError):
+        await stream_ouija_test.read_frame(reader=reader)
+
+
+@pytest.mark.asyncio
+async def test_stream_ouija_forward_wrapped_length_limit(stream_ouija_test):
+    stream_ouija_test.framing = Framing.LENGTH
+    stream_ouija_test.close = AsyncMock()
+    reader = asyncio.StreamReader()
+    reader.feed_data(LENGTH.pack(2 ** 32 - 1))
+    stream_ouija_test.sync.set()
+
+    await stream_ouija_test.forward(reader=reader, writer=stream_ouija_test.writer, crypt=False)
+
+    stream_ouija_test.writer.write.assert_not_called()
+    assert stream_ouija_test.telemetry.processing_errors == 1
+    stream_ouija_test.close.assert_awaited()
+
+
 @pytest.mark.asyncio
 async def test_stream_ouija_forward(stream_ouija_test):
     stream_ouija_test.forward_wrapped = AsyncMock()
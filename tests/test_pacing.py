@@ -0,0 +1,55 @@
+import pytest
+
+from ouija.pacing import TokenBucket
+
+
+def test_token_bucket(mocker):
+    monotonic = mocker.patch('ouija.pacing.time.monotonic', return_value=100.0)
+    bucket = TokenBucket(rate=1000.0, burst=2000.0)
+
+    assert bucket.reserve(size=1500) == 0.0
+    assert bucket.reserve(size=1500) == pytest.approx(1.0)
+
+    # waiting datagram has borrowed tokens - next one waits for both
+    assert bucket.reserve(size=500) == pytest.approx(1.5)
+
+    monotonic.return_value = 110.0
+
+    assert bucket.reserve(size=500) == 0.0
+    assert bucket.tokens == 1500.0
+
+
+def test_token_bucket_refund(mocker):
+    mocker.patch('ouija.pacing.time.monotonic', return_value=100.0)
+    bucket = TokenBucket(rate=1000.0, burst=2000.0)
+
+    bucket.reserve(size=3000)
+    bucket.refund(size=3000)
+
+    assert bucket.tokens == 2000.0
+
+
+def test_token_bucket_delay(mocker):
+    monotonic = mocker.patch('ouija.pacing.time.monotonic', return_value=100.0)
+    bucket = TokenBucket(rate=1000.0, burst=2000.0)
+
+    bucket.reserve(size=3000)
+
+    # delay is peeked - tokens are not taken
+    assert bucket.delay() == pytest.approx(1.0)
+    assert bucket.delay() == pytest.approx(1.0)
+
+    monotonic.return_value = 100.5
+
+    assert bucket.delay() == pytest.approx(0.5)
+    assert TokenBucket(rate=None, burst=2000.0).delay() == 0.0
+
+
+def test_token_bucket_unlimited():
+    bucket = TokenBucket(rate=None, burst=2000.0)
+
+    assert bucket.reserve(size=10 ** 9) == 0.0
+
+    bucket.refund(size=10 ** 9)
+
+    assert bucket.tokens == 2000.0
@@ -3,6 +3,7 @@ from unittest.mock import Mock, AsyncMock
 import pytest
 from pytest_mock import MockerFixture
 
+from ouija import Packet, Phase
 from ouija.proxy import Proxy
 
 
@@ -80,23 +81,66 @@ def test_datagram_proxy_connection_made(datagram_proxy_test):
     assert datagram_proxy_test.transport == mock
 
 
-@pytest.mark.asyncio
-async def test_datagram_proxy_datagram_received_async(datagram_proxy_test, datagram_link_test, data_test):
+def test_datagram_proxy_datagram_received(datagram_proxy_test, datagram_link_test, data_test):
     datagram_proxy_test.links = {('127.0.0.1', 60000): datagram_link_test}
-    datagram_link_test.process = AsyncMock()
+    datagram_link_test.feed = Mock()
 
-    await datagram_proxy_test.datagram_received_async(data=data_test, addr=('127.0.0.1', 60000))
+    datagram_proxy_test.datagram_received(data_test, ('127.0.0.1', 60000))
 
-    datagram_link_test.process.assert_awaited()
+    datagram_link_test.feed.assert_called_with(data=data_test)
 
 
-@pytest.mark.asyncio
-async def test_datagram_proxy_datagram_received(datagram_proxy_test, data_test):
-    datagram_proxy_test.datagram_received_async = AsyncMock()
+def test_datagram_proxy_datagram_received_cid(datagram_proxy_test, datagram_link_test, data_test):
+    datagram_proxy_test.tuning.udp_cid = True
+    datagram_proxy_test.links = {b'\x01' * 8: datagram_link_test}
+    datagram_link_test.feed = Mock()
 
-    datagram_proxy_test.datagram_received(data_test, ('127.0.0.1', 60000))
+    datagram_proxy_test.datagram_received(b'\x01' * 8 + data_test, ('127.0.0.1', 60000))
+
+    datagram_link_test.feed.assert_called_with(data=data_test)
+
+
+def test_datagram_proxy_datagram_received_rebind(datagram_proxy_test, datagram_link_test, data_test):
+    datagram_proxy_test.tuning.udp_cid = True
+    datagram_proxy_test.links = {b'\x01' * 8: datagram_link_test}
+    datagram_link_test.rebind = Mock()
+
+    datagram_proxy_test.datagram_received(b'\x01' * 8 + data_test, ('127.0.0.2', 60001))
+
+    datagram_link_test.rebind.assert_called_with(data=data_test, addr=('127.0.0.2', 60001))
+
+
+def test_datagram_proxy_datagram_received_open(datagram_proxy_test, token_test, mocker: MockerFixture):
+    dispatch = mocker.patch('ouija.proxy.DatagramLink.dispatch')
+    feed = mocker.patch('ouija.proxy.DatagramLink.feed')
+    packet = Packet(phase=Phase.OPEN, ack=False, token=token_test, host='example.com', port=443)
+    data = packet.binary(cipher=datagram_proxy_test.tuning.cipher, entropy=datagram_proxy_test.tuning.entropy)
 
-    datagram_proxy_test.datagram_received_async.assert_called()
+    datagram_proxy_test.datagram_received(data, ('127.0.0.1', 60000))
+    datagram_proxy_test.datagram_received(data, ('127.0.0.1', 60000))
+
+    # open packet decoded by proxy is passed to link, open retry is processed by the same link
+    assert list(datagram_proxy_test.links) == [('127.0.0.1', 60000)]
+    assert dispatch.call_args.kwargs['packets'][0].host == 'example.com'
+    feed.assert_called_once_with(data=data)
+
+
+def test_datagram_proxy_datagram_received_unknown(datagram_proxy_test, token_test):
+    packets = (
+        Packet(phase=Phase.DATA, ack=False, seq=0, data=b'data', drain=True),
+        Packet(phase=Phase.OPEN, ack=True, token=token_test),
+        Packet(phase=Phase.OPEN, ack=False, token='wrong', host='example.com', port=443),
+    )
+
+    for packet in packets:
+        data = packet.binary(cipher=datagram_proxy_test.tuning.cipher, entropy=datagram_proxy_test.tuning.entropy)
+        datagram_proxy_test.datagram_received(data, ('127.0.0.1', 60000))
+    datagram_proxy_test.datagram_received(b'garbage', ('127.0.0.1', 60000))
+
+    # no link is allocated for datagrams other than valid open packet
+    assert not datagram_proxy_test.links
+    assert datagram_proxy_test.telemetry.token_errors == 1
+    assert datagram_proxy_test.telemetry.processing_errors == 1
 
 
 @pytest.mark.asyncio
@@ -117,3 +161,13 @@ async def test_datagram_proxy_serve(datagram_proxy_test, mocker: MockerFixture):
     await datagram_proxy_test.serve()
 
     mocked_loop.create_datagram_endpoint.assert_awaited()
+
+
+@pytest.mark.asyncio
+async def test_datagram_proxy_serve_batch(datagram_proxy_test, mocker: MockerFixture):
+    mocked_create_datagram_endpoint = mocker.patch('ouija.proxy.create_datagram_endpoint', new_callable=AsyncMock)
+    datagram_proxy_test.tuning.udp_batch = True
+
+    await datagram_proxy_test.serve()
+
+    mocked_create_datagram_endpoint.assert_awaited()
@@ -1,4 +1,5 @@
-from unittest.mock import AsyncMock
+import asyncio
+from unittest.mock import Mock, AsyncMock
 
 import pytest
 from pytest_mock import MockerFixture
@@ -143,3 +144,60 @@ async def test_relay_serve(datagram_relay_test, mocker: MockerFixture):
     await datagram_relay_test.serve()
 
     mocked_asyncio.start_server.assert_awaited()
+
+
+def test_datagram_relay_connection_made(datagram_relay_test):
+    mock = Mock()
+    datagram_relay_test.connection_made(mock)
+
+    assert datagram_relay_test.transport == mock
+
+
+def test_datagram_relay_datagram_received(datagram_relay_test, datagram_connector_test, data_test):
+    datagram_connector_test.datagram_received = Mock()
+    datagram_relay_test.routes[datagram_connector_test.cid] = datagram_connector_test
+
+    datagram_relay_test.datagram_received(datagram_connector_test.cid + data_test, ('127.0.0.1', 50000))
+    datagram_relay_test.datagram_received(b'\x00' * 8 + data_test, ('127.0.0.1', 50000))
+
+    # datagram with unknown connection ID is dropped
+    datagram_connector_test.datagram_received.assert_called_once_with(data_test, ('127.0.0.1', 50000))
+
+
+@pytest.mark.asyncio
+async def test_datagram_relay_connection_lost(datagram_relay_test, datagram_connector_test):
+    datagram_connector_test.close = AsyncMock()
+    datagram_relay_test.routes[datagram_connector_test.cid] = datagram_connector_test
+
+    datagram_relay_test.connection_lost(Exception())
+    await asyncio.sleep(0)
+
+    datagram_connector_test.close.assert_awaited()
+
+
+@pytest.mark.asyncio
+async def test_datagram_relay_serve_cid(datagram_relay_test, mocker: MockerFixture):
+    mocked_asyncio = mocker.patch('ouija.relay.asyncio')
+    mocked_asyncio.start_server = AsyncMock()
+    mocked_loop = AsyncMock()
+    mocked_asyncio.get_event_loop = lambda: mocked_loop
+    datagram_relay_test.tuning.udp_cid = True
+
+    await datagram_relay_test.serve()
+
+    mocked_loop.create_datagram_endpoint.assert_awaited()
+    mocked_asyncio.start_server.assert_awaited()
+
+
+@pytest.mark.asyncio
+async def test_datagram_relay_serve_batch(datagram_relay_test, mocker: MockerFixture):
+    mocked_asyncio = mocker.patch('ouija.relay.asyncio')
+    mocked_asyncio.start_server = AsyncMock()
+    mocked_create_datagram_endpoint = mocker.patch('ouija.relay.create_datagram_endpoint', new_callable=AsyncMock)
+    datagram_relay_test.tuning.udp_cid = True
+    datagram_relay_test.tuning.udp_batch = True
+
+    await datagram_relay_test.serve()
+
+    mocked_create_datagram_endpoint.assert_awaited()
+    mocked_asyncio.start_server.assert_awaited()
@@ -0,0 +1,93 @@
+import random
+
+from ouija.data import Received
+from ouija.reorder import ReorderBuffer
+
+
+def test_reorder_buffer(data_test):
+    buf = ReorderBuffer(capacity=4)
+
+    assert not buf
+    assert list(buf.keys(start=0)) == []
+
+    buf.put(seq=3, received=Received(data=data_test, drain=False))
+    buf.put(seq=1, received=Received(data=data_test, drain=True))
+    buf.put(seq=1, received=Received(data=data_test, drain=True))
+
+    assert len(buf) == 2
+    assert 1 in buf
+    assert 2 not in buf
+    assert 5 not in buf
+    assert list(buf.keys(start=0)) == [1, 3]
+    assert buf.get(seq=1).drain
+    assert buf.get(seq=5) is None
+
+    assert buf.pop(seq=0) is None
+    assert buf.pop(seq=1).drain
+    assert buf.pop(seq=1) is None
+    assert len(buf) == 1
+
+
+def test_reorder_buffer_wrap(data_test):
+    buf = ReorderBuffer(capacity=4)
+
+    buf.put(seq=3, received=Received(data=data_test, drain=False))
+    assert buf.pop(seq=3)
+
+    # seq 5 reuses slot of seq 1, window starts at next expected seq
+    buf.put(seq=5, received=Received(data=data_test, drain=False))
+    buf.put(seq=6, received=Received(data=data_test, drain=False))
+
+    assert 1 not in buf
+    assert 5 in buf
+    assert list(buf.keys(start=4)) == [5, 6]
+    assert buf.pop(seq=1) is None
+    assert buf.pop(seq=5)
+
+
+def test_reorder_buffer_overwrite(data_test):
+    buf = ReorderBuffer(capacity=4)
+
+    for seq in range(10):
+        buf.put(seq=seq, received=Received(data=data_test, drain=False))
+
+    # older packets are overwritten, count is bounded by capacity
+    assert len(buf) == 4
+    assert list(buf.keys(start=6)) == [6, 7, 8, 9]
+    assert 5 not in buf
+
+
+def test_reorder_buffer_ranges(data_test):
+    buf = ReorderBuffer(capacity=16)
+
+    for seq in (5, 3, 7, 4, 9, 10, 12):
+        buf.put(seq=seq, received=Received(data=data_test, drain=False))
+
+    assert buf.ranges(start=0, limit=16) == [[3, 6], [7, 8], [9, 11], [12, 13]]
+    assert buf.ranges(start=4, limit=2) == [[4, 6], [7, 8]]
+
+    # pop shrinks, splits and drops ranges
+    buf.pop(seq=3)
+    buf.pop(seq=10)
+    buf.pop(seq=7)
+    buf.put(seq=6, received=Received(data=data_test, drain=False))
+    assert buf.ranges(start=0, limit=16) == [[4, 7], [9, 10], [12, 13]]
+    assert list(buf.keys(start=0)) == [4, 5, 6, 9, 12]
+
+
+def test_reorder_buffer_ranges_random(data_test):
+    buf = ReorderBuffer(capacity=32)
+    rng = random.Random(0)
+    buffered = set()
+
+    for _ in range(1000):
+        seq = rng.randrange(64)
+        if rng.random() < 0.5:
+            buf.put(seq=seq, received=Received(data=data_test, drain=False))
+            buffered = {s for s in buffered if s % 32 != seq % 32} | {seq}
+        else:
+            buf.pop(seq=seq)
+            buffered.discard(seq)
+
+        assert list(buf.keys(start=0)) == sorted(buffered)
+        assert len(buf) == len(buffered)
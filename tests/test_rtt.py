@@ -0,0 +1,37 @@
+import pytest
+
+from ouija.rtt import RTTEstimator
+
+
+def test_rtt_estimator():
+    rtt = RTTEstimator(initial=2.0, minimum=0.05, maximum=10.0)
+
+    assert rtt.rto == 2.0
+
+    rtt.sample(rtt=0.1)
+
+    assert rtt.srtt == 0.1
+    assert rtt.rttvar == 0.05
+    assert rtt.rto == pytest.approx(0.3)
+
+    rtt.sample(rtt=0.2)
+
+    assert rtt.srtt == pytest.approx(0.1125)
+    assert rtt.rttvar == pytest.approx(0.0625)
+    assert rtt.rto == pytest.approx(0.3625)
+
+
+def test_rtt_estimator_bounds():
+    rtt = RTTEstimator(initial=20.0, minimum=0.05, maximum=10.0)
+
+    assert rtt.rto == 10.0
+
+    rtt.sample(rtt=0.001)
+
+    assert rtt.rto == 0.05
+
+
+def test_rtt_estimator_timeout():
+    rtt = RTTEstimator(initial=1.0, minimum=0.05, maximum=10.0)
+
+    assert [rtt.timeout(retries=retries) for retries in range(1, 6)] == [1.0, 2.0, 4.0, 8.0, 10.0]
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from ouija.scheduler import Scheduler
+
+
+@pytest.mark.asyncio
+async def test_scheduler_order():
+    scheduler = Scheduler()
+    fired = []
+
+    async def callback(*, name):
+        fired.append(name)
+
+    scheduler.schedule(delay=0.1, callback=lambda: callback(name='late'))
+    scheduler.schedule(delay=0.02, callback=lambda: callback(name='early'))
+    scheduler.schedule(delay=0.02, callback=lambda: callback(name='tie'))
+
+    await asyncio.sleep(0.05)
+    assert fired == ['early', 'tie']
+    assert len(scheduler) == 1
+
+    await asyncio.sleep(0.1)
+    assert fired == ['early', 'tie', 'late']
+    assert len(scheduler) == 0
+    assert scheduler.timer is None
+
+
+@pytest.mark.asyncio
+async def test_scheduler_rearm():
+    scheduler = Scheduler()
+
+    async def callback():
+        pass
+
+    scheduler.schedule(delay=1.0, callback=callback)
+    timer = scheduler.timer
+    scheduler.schedule(delay=0.5, callback=callback)
+
+    assert timer.cancelled()
+    assert scheduler.timer.when() < timer.when()
+
+    scheduler.schedule(delay=2.0, callback=callback)
+
+    assert scheduler.timer.when() < timer.when()
+    scheduler.timer.cancel()
+
+
+@pytest.mark.asyncio
+async def test_scheduler_exception():
+    scheduler = Scheduler()
+    fired = []
+
+    async def failure():
+        raise Exception
+
+    async def success():
+        fired.append(True)
+
+    scheduler.schedule(delay=0.01, callback=failure)
+    scheduler.schedule(delay=0.01, callback=success)
+
+    await asyncio.sleep(0.05)
+    assert fired == [True]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_cancel():
+    scheduler = Scheduler()
+    fired = []
+
+    async def callback(*, name):
+        fired.append(name)
+
+    timer = scheduler.schedule(delay=0.01, callback=lambda: callback(name='cancelled'))
+    scheduler.schedule(delay=0.01, callback=lambda: callback(name='fired'))
+    scheduler.cancel(timer=timer)
+    scheduler.cancel(timer=timer)
+
+    assert timer.cancelled()
+    assert len(scheduler) == 1
+
+    await asyncio.sleep(0.05)
+    assert fired == ['fired']
+    assert len(scheduler) == 0
+    assert not scheduler.heap
+
+
+@pytest.mark.asyncio
+async def test_scheduler_compact():
+    scheduler = Scheduler()
+
+    async def callback():
+        pass
+
+    timers = [scheduler.schedule(delay=10, callback=callback) for _ in range(Scheduler.COMPACT * 2)]
+    for timer in timers[1:]:
+        scheduler.cancel(timer=timer)
+
+    # cancelled timers are dropped from heap without waiting for their deadlines
+    assert len(scheduler) == 1
+    assert len(scheduler.heap) < Scheduler.COMPACT
+    scheduler.timer.cancel()
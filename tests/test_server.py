@@ -5,6 +5,7 @@ from unittest.mock import AsyncMock
 import pytest
 from pytest_mock import MockerFixture
 
+from ouija import AESGCMCipher, ChaCha20Poly1305Cipher, Compression
 from ouija.server import main_async
 
 
@@ -56,6 +57,27 @@ async def test_datagram_relay(tmp_path, config_datagram_relay_dict_test, mocker:
     datagram_relay_test.serve.assert_awaited()
 
 
+@pytest.mark.asyncio
+async def test_stream_relay_ciphers(tmp_path, config_stream_relay_dict_test, mocker: MockerFixture, stream_relay_test):
+    mocked_stream_relay = mocker.patch('ouija.server.StreamRelay')
+    mocked_stream_relay.return_value = stream_relay_test
+    stream_relay_test.debug = AsyncMock()
+    stream_relay_test.serve = AsyncMock()
+    config_stream_relay_dict_test['cipher'] = 'CHACHA20POLY1305'
+    config_stream_relay_dict_test['ciphers'] = ['AESGCM']
+    config_stream_relay_dict_test['compression'] = 'ZLIB'
+    path = tmp_path / 'config.json'
+    path.write_text(data=json.dumps(config_stream_relay_dict_test))
+    sys.argv = [None, str(path)]
+
+    await main_async()
+
+    tuning = mocked_stream_relay.call_args.kwargs['tuning']
+    assert isinstance(tuning.cipher, ChaCha20Poly1305Cipher)
+    assert [type(cipher) for cipher in tuning.ciphers] == [AESGCMCipher]
+    assert tuning.compression == Compression.ZLIB
+
+
 @pytest.mark.asyncio
 async def test_datagram_proxy(tmp_path, config_datagram_proxy_dict_test, mocker: MockerFixture, datagram_proxy_test):
     mocked_datagram_proxy = mocker.patch('ouija.server.DatagramProxy')
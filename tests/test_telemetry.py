@@ -1,5 +1,7 @@
 import datetime
 
+import pytest
+
 from pytest_mock import MockerFixture
 
 
@@ -39,6 +41,36 @@ def test_telemetry_recv(telemetry_test, data_test, entropy_test):
     assert telemetry_test.max_payload_size == 9
 
 
+def test_telemetry_entropy(telemetry_test, entropy_test):
+    telemetry_test.send(data=b'ab', entropy=entropy_test)
+    telemetry_test.recv(data=b'aaaa', entropy=entropy_test)
+
+    assert telemetry_test.min_entropy == 0.0
+    assert telemetry_test.max_entropy == 1.0
+    assert telemetry_test.entropy_count == 2
+    assert telemetry_test.entropy_histogram[ord('a')] == 5
+    assert telemetry_test.running_entropy == pytest.approx(0.6500224)
+
+
+def test_telemetry_entropy_sampling(telemetry_test, data_test, entropy_test):
+    telemetry_test.entropy_sampling = 2
+
+    for _ in range(4):
+        telemetry_test.send(data=data_test, entropy=entropy_test)
+
+    assert telemetry_test.entropy_count == 2
+
+
+def test_telemetry_entropy_budget(telemetry_test, data_test, entropy_test):
+    telemetry_test.entropy_budget = len(data_test) * 2
+
+    for _ in range(4):
+        telemetry_test.send(data=data_test, entropy=entropy_test)
+
+    assert telemetry_test.entropy_count == 2
+    assert telemetry_test.entropy_window_bytes == len(data_test) * 2
+
+
 def test_telemetry_processing_error(telemetry_test):
     telemetry_test.processing_error()
 
@@ -87,6 +119,68 @@ def test_telemetry_recv_buf_overload(telemetry_test):
     assert telemetry_test.recv_buf_overloads == 1
 
 
+def test_telemetry_ack_saved(telemetry_test):
+    telemetry_test.ack_saved(count=3)
+
+    assert telemetry_test.acks_saved == 3
+
+
+def test_telemetry_ack_piggybacked(telemetry_test):
+    telemetry_test.ack_piggybacked()
+
+    assert telemetry_test.acks_piggybacked == 1
+
+
+def test_telemetry_rtt(telemetry_test):
+    telemetry_test.rtt(rtt=0.02)
+    telemetry_test.rtt(rtt=0.04)
+
+    assert telemetry_test.min_rtt == 0.02
+    assert telemetry_test.max_rtt == 0.04
+    assert telemetry_test.avg_rtt == pytest.approx(0.03)
+
+
+def test_telemetry_retransmit(telemetry_test):
+    telemetry_test.retransmit()
+
+    assert telemetry_test.retransmits == 1
+
+
+def test_telemetry_fast_retransmit(telemetry_test):
+    telemetry_test.fast_retransmit()
+
+    assert telemetry_test.fast_retransmits == 1
+
+
+def test_telemetry_loss(telemetry_test):
+    telemetry_test.loss()
+
+    assert telemetry_test.losses == 1
+
+
+def test_telemetry_cwnd(telemetry_test):
+    telemetry_test.cwnd(cwnd=4.0)
+    telemetry_test.cwnd(cwnd=10.0)
+
+    assert telemetry_test.min_cwnd == 4.0
+    assert telemetry_test.max_cwnd == 10.0
+    assert telemetry_test.avg_cwnd == 7.0
+
+
+def test_telemetry_pace(telemetry_test):
+    telemetry_test.pace(delay=0.01)
+    telemetry_test.pace(delay=0.03)
+
+    assert telemetry_test.paced == 2
+    assert telemetry_test.avg_pacing_delay == pytest.approx(0.02)
+
+
+def test_telemetry_pacing_hold(telemetry_test):
+    telemetry_test.pacing_hold()
+
+    assert telemetry_test.pacing_holds == 1
+
+
 def test_telemetry(telemetry_test, mocker: MockerFixture):
     timestamp = datetime.datetime.now()
     mocked_datetime = mocker.patch('ouija.telemetry.datetime')
@@ -100,6 +194,15 @@ def test_telemetry(telemetry_test, mocker: MockerFixture):
         f'\tmin|avg|max payload size: ' \
         f'0|0|0\n' \
         f'\tmin|avg|max entropy: 0.0000|0.0000|0.0000\n' \
+        f'\trunning entropy: 0.0000\n' \
+        f'\tacks saved|piggybacked: 0|0\n' \
+        f'\tmin|avg|max rtt, ms: 0.0|0.0|0.0\n' \
+        f'\tretransmits|fast retransmits|losses: ' \
+        f'0|0|0\n' \
+        f'\tfec parities|recovered: 0|0\n' \
+        f'\tmin|avg|max cwnd: 0.0|0.0|0.0\n' \
+        f'\tpaced|pacing holds: 0|0\n' \
+        f'\tavg pacing delay, ms: 0.0\n' \
         f'\ttoken errors: 0\n' \
         f'\tprocessing|resending errors: 0|0\n' \
         f'\ttimeout|connection|serving errors: ' \